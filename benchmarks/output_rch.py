@@ -0,0 +1,77 @@
+"""
+Time of reading a daily output.rch with pandas.read_fwf, the reader used before the fixed width
+parser, and with read_output_rch.
+
+    python -m swatpython.benchmarks.output_rch --years 20 --reaches 20
+"""
+import os
+import time
+import argparse
+import tempfile
+import numpy
+import pandas as pd
+from swatpython.operationalsystem import OperationalSystem
+from swatpython.outputvariables import SWAT2012_RCH_VARIABLES
+from swatpython.swat2012rev670.swat2012rev670 import SWAT2012rev670
+
+# Layout given to pandas.read_fwf by the old reader
+WIDTHS = [7, 4, 9, 6] + [12] * 47
+
+
+def write_output_rch(path, years, reaches, seed=0):
+    """ Writes a synthetic daily output.rch with all variables, like SWAT2012 """
+    random = numpy.random.default_rng(seed)
+    names = ['AREAkm2'] + [header for _, header in SWAT2012_RCH_VARIABLES]
+    line = ' '.join(['REACH %5d %8d %5d'] + ['%11.4E'] * len(names)) + '\n'
+    with open(path, 'w') as fo:
+        fo.write(''.join(' SWAT line ' + str(i) + '\n' for i in range(8)))
+        fo.write('       RCH      GIS   MON' + ''.join('%12s' % name for name in names) + '\n')
+        for year in range(years):
+            values = random.lognormal(0, 3, (365, reaches, len(names)))
+            for day in range(365):
+                fo.write(''.join(line % ((reach + 1, reach + 1, day + 1) + tuple(values[day, reach]))
+                                 for reach in range(reaches)))
+
+
+def best_time(function, repeat):
+    """ Shortest time of repeat calls, in seconds """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, default=20, help="simulated years")
+    parser.add_argument('--reaches', type=int, default=20, help="number of reaches")
+    parser.add_argument('--repeat', type=int, default=3, help="runs of each reader, the best is reported")
+    arguments = parser.parse_args()
+
+    module = SWAT2012rev670(OperationalSystem.LINUX)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'output.rch')
+        write_output_rch(path, arguments.years, arguments.reaches)
+        size = os.path.getsize(path) / 1024 ** 2
+        print("output.rch: %d lines, %.1f MB" % (arguments.years * 365 * arguments.reaches, size))
+
+        if not module.read_output_rch(path).equals(pd.read_fwf(path, widths=WIDTHS, header=8, index_col=None)):
+            raise AssertionError("read_output_rch and read_fwf returned different frames")
+        results = [
+            ('pandas.read_fwf', best_time(lambda: pd.read_fwf(path, widths=WIDTHS, header=8, index_col=None),
+                                          arguments.repeat)),
+            ('read_output_rch', best_time(lambda: module.read_output_rch(path), arguments.repeat)),
+            ('read_output_rch compact', best_time(lambda: module.read_output_rch(path, compact=True),
+                                                  arguments.repeat)),
+            ('read_output_rch 2 columns', best_time(lambda: module.read_output_rch(
+                path, columns=['FLOW_OUTcms', 'TOT Nkg']), arguments.repeat)),
+        ]
+    baseline = results[0][1]
+    for name, seconds in results:
+        print("%-26s %8.3f s %8.1f MB/s %6.1fx" % (name, seconds, size / seconds, baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Throughput of write_precipitation_daily compared with numpy.savetxt, the writer used before the
+vectorized rendering. Both files are checked to be identical.
+
+    python -m swatpython.benchmarks.precipitation --years 30 --gauges 50
+"""
+import os
+import time
+import argparse
+import tempfile
+import numpy
+import pandas as pd
+from swatpython.operationalsystem import OperationalSystem
+from swatpython.swat2012rev670.swat2012rev670 import SWAT2012rev670
+
+
+def precipitation(years, gauges, seed=0):
+    """ Synthetic daily precipitation, with the -99 of missing values """
+    random = numpy.random.default_rng(seed)
+    names = ['pcp' + str(i) for i in range(1, gauges + 1)]
+    info = pd.DataFrame([['Station'] + names, ['Lati'] + [-23.5] * gauges, ['Long'] + [-47.1] * gauges,
+                         ['Elev'] + [600] * gauges])
+    days = years * 365
+    values = numpy.round(random.gamma(0.4, 12.0, (days, gauges)), 1)
+    values[random.random(values.shape) < 0.01] = -99.0
+    dataframe = pd.DataFrame(values, columns=names)
+    dataframe.insert(0, 'day', numpy.tile(numpy.arange(1, 366), years))
+    dataframe.insert(0, 'year', numpy.repeat(numpy.arange(1980, 1980 + years), 365))
+    return info, dataframe
+
+
+def savetxt_precipitation_daily(module, filename, info, dataframe):
+    with open(filename, "w") as fo:
+        param_count = module._write_precipitation_info(fo, info)
+        numpy.savetxt(fo, dataframe.to_numpy(), fmt="%4i%03i" + "%05.1f" * param_count)
+
+
+def best_time(function, repeat):
+    """ Shortest time of repeat calls, in seconds """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, default=30, help="years of daily data")
+    parser.add_argument('--gauges', type=int, default=50, help="number of gauges")
+    parser.add_argument('--repeat', type=int, default=3, help="runs of each writer, the best is reported")
+    arguments = parser.parse_args()
+
+    module = SWAT2012rev670(OperationalSystem.LINUX)
+    info, dataframe = precipitation(arguments.years, arguments.gauges)
+    with tempfile.TemporaryDirectory() as folder:
+        old = os.path.join(folder, 'old.pcp')
+        new = os.path.join(folder, 'new.pcp')
+        results = [
+            ('numpy.savetxt', best_time(lambda: savetxt_precipitation_daily(module, old, info, dataframe),
+                                        arguments.repeat)),
+            ('write_precipitation_daily', best_time(lambda: module.write_precipitation_daily(new, info, dataframe),
+                                                    arguments.repeat)),
+        ]
+        with open(old, 'rb') as fo_old, open(new, 'rb') as fo_new:
+            if fo_old.read() != fo_new.read():
+                raise AssertionError("write_precipitation_daily and numpy.savetxt wrote different files")
+        size = os.path.getsize(new) / 1024 ** 2
+    print("pcp file: %d lines, %d gauges, %.1f MB" % (len(dataframe), arguments.gauges, size))
+    baseline = results[0][1]
+    for name, seconds in results:
+        print("%-26s %8.3f s %8.1f MB/s %6.1fx" % (name, seconds, size / seconds, baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
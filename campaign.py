@@ -0,0 +1,301 @@
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+import numpy
+from swatpython.ensemble import AsyncRunner
+from swatpython.execution import OUTPUT_DISCARD
+
+logger = logging.getLogger(__name__)
+
+# Status of a run in the manifest
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Runs read from the manifest at a time
+BATCH_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    parameters TEXT NOT NULL,
+    status TEXT NOT NULL,
+    return_code INTEGER,
+    wall_time REAL,
+    error TEXT,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS runs_status ON runs (status, id);
+CREATE TABLE IF NOT EXISTS results (
+    run INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    dtype TEXT NOT NULL,
+    shape TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (run, name)
+);
+"""
+
+
+class Campaign(object):
+    """
+    Calibration or sensitivity campaign kept in a SQLite file: the parameter set of each run,
+    its status and the results extracted from its outputs. Every finished run is committed
+    as soon as it ends, so nothing is kept in memory and a campaign interrupted by a crash or
+    a reboot continues from the unfinished runs when run is called again.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path : str
+            SQLite file of the campaign. It is created if it does not exist
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+
+    def add(self, parameter_sets):
+        """
+        Adds runs to the campaign
+
+        Parameters
+        ----------
+        parameter_sets : iterable of dict
+            SUFI-2 parameter names and values of each run, see SWAT.apply_parameters
+
+        Returns
+        -------
+        list with the ids of the new runs
+        """
+        ids = []
+        with self.connection:
+            for parameters in parameter_sets:
+                cursor = self.connection.execute("INSERT INTO runs (parameters, status, updated) VALUES (?, ?, ?)",
+                                                 (json.dumps(dict(parameters)), PENDING, time.time()))
+                ids.append(cursor.lastrowid)
+        logger.debug("Added " + str(len(ids)) + " runs to campaign: " + self.path)
+        return ids
+
+    def status(self):
+        """ Number of runs by status """
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        for status, count in self.connection.execute("SELECT status, COUNT(*) FROM runs GROUP BY status"):
+            counts[status] = count
+        return counts
+
+    def parameters(self, run):
+        """ Parameter set of a run """
+        row = self.connection.execute("SELECT parameters FROM runs WHERE id = ?", (run,)).fetchone()
+        if row is None:
+            raise ValueError("Unknown run: " + str(run))
+        return json.loads(row[0])
+
+    def unfinished(self, retry_failed=False):
+        """
+        Runs that did not finish, read from the manifest in batches. Runs left running by an
+        interrupted campaign are included
+
+        Parameters
+        ----------
+        retry_failed : bool
+            also return the runs that failed
+
+        Returns
+        -------
+        generator of (id, parameters)
+        """
+        statuses = [PENDING, RUNNING] + ([FAILED] if retry_failed else [])
+        query = ("SELECT id, parameters FROM runs WHERE status IN (" + ", ".join("?" * len(statuses)) +
+                 ") AND id > ? ORDER BY id LIMIT ?")
+        last = 0
+        while True:
+            rows = self.connection.execute(query, statuses + [last, BATCH_SIZE]).fetchall()
+            if not rows:
+                return
+            for run, parameters in rows:
+                yield run, json.loads(parameters)
+            last = rows[-1][0]
+
+    def record(self, run, result, values=None):
+        """
+        Stores the outcome of a run
+
+        Parameters
+        ----------
+        run : int
+            run id
+        result : EnsembleResult
+            outcome of the execution
+        values : dict, optional
+            results extracted from the outputs, name to number or numpy array
+        """
+        error = None
+        if result.error is not None:
+            error = repr(result.error)
+        elif result.timed_out:
+            error = 'timed out'
+        status = DONE if result.success else FAILED
+        with self.connection:
+            self.connection.execute("UPDATE runs SET status = ?, return_code = ?, wall_time = ?, error = ?, "
+                                    "updated = ? WHERE id = ?",
+                                    (status, result.return_code, result.wall_time, error, time.time(), run))
+            for name, value in (values or {}).items():
+                value = numpy.asarray(value, order='C')
+                self.connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                                        (run, name, value.dtype.str, json.dumps(value.shape), value.tobytes()))
+
+    def results(self, name):
+        """
+        Values of a result for all runs that stored it
+
+        Parameters
+        ----------
+        name : str
+            name of the result, as returned by the extract function
+
+        Returns
+        -------
+        generator of (run id, value)
+        """
+        cursor = self.connection.execute("SELECT run, dtype, shape, data FROM results WHERE name = ? ORDER BY run",
+                                         (name,))
+        for run, dtype, shape, data in cursor:
+            value = numpy.frombuffer(data, dtype=dtype).reshape(json.loads(shape))
+            yield run, (value[()] if value.ndim == 0 else value)
+
+    def run(self, swat, extract=None, max_workers=None, timeout=None, root=None, output=OUTPUT_DISCARD,
+            retry_failed=False):
+        """
+        Executes the unfinished runs and waits until they finish, see run_async
+
+        Returns
+        -------
+        dictionary with the number of runs by status at the end
+        """
+        loop = asyncio.new_event_loop()
+        task = loop.create_task(self.run_async(swat, extract=extract, max_workers=max_workers, timeout=timeout,
+                                               root=root, output=output, retry_failed=retry_failed))
+        try:
+            return loop.run_until_complete(task)
+        except BaseException:
+            # Interrupted: the runs are cancelled, which kills SWAT and removes the workspaces
+            all_tasks = getattr(asyncio, 'all_tasks', None) or asyncio.Task.all_tasks
+            tasks = [item for item in all_tasks(loop) if not item.done()]
+            for item in tasks:
+                item.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            raise
+        finally:
+            loop.close()
+
+    async def run_async(self, swat, extract=None, max_workers=None, timeout=None, root=None,
+                        output=OUTPUT_DISCARD, retry_failed=False):
+        """
+        Coroutine that executes the unfinished runs. Each worker has its own workspace of the
+        project, where the parameter sets are written before each run
+
+        Parameters
+        ----------
+        swat : SWAT
+            swat object with the project folder of the campaign
+        extract : callable, optional
+            receives the folder of a successful run and returns a dictionary of results,
+            name to number or numpy array, like the flow of a reach
+        max_workers : int, optional
+            maximum number of simultaneous runs (default is the number of cpus)
+        timeout : float, optional
+            maximum time in seconds for each run. Runs exceeding it are killed and fail
+        root : str, optional
+            folder where the workspaces are created (default is the system temporary folder)
+        output : str, OutputHandler, list of OutputHandler or callable
+            what is done with the output of each run, see AsyncRunner.run
+        retry_failed : bool
+            also execute the runs that failed before
+
+        Returns
+        -------
+        dictionary with the number of runs by status at the end
+        """
+        runner = AsyncRunner(swat.wrapper, max_workers=max_workers, timeout=timeout)
+        runs = self.unfinished(retry_failed)
+        workspaces = []
+        try:
+            for _ in range(runner.max_workers):
+                workspaces.append(swat.create_workspace(root=root))
+            await asyncio.gather(*[self._worker(swat, runner, workspace.path, runs, extract, output)
+                                   for workspace in workspaces])
+        finally:
+            for workspace in workspaces:
+                workspace.cleanup()
+        return self.status()
+
+    def execute(self, executor, retry_failed=False):
+        """
+        Executes the unfinished runs with an executor, like the workers of a QueueExecutor in
+        other machines, and records the results as they arrive
+
+        Parameters
+        ----------
+        executor : Executor
+            executor of the runs, see swatpython.executors. Its extract function gives the
+            results stored
+        retry_failed : bool
+            also execute the runs that failed before
+
+        Returns
+        -------
+        dictionary with the number of runs by status at the end
+        """
+        for run, result, values in executor.map(self._started(self.unfinished(retry_failed))):
+            self.record(run, result, values)
+            logger.debug("Campaign run " + str(run) + " finished: " + repr(result))
+        return self.status()
+
+    def _started(self, runs):
+        # Runs are marked when the executor takes them, so the manifest shows the runs in progress
+        for run, parameters in runs:
+            with self.connection:
+                self.connection.execute("UPDATE runs SET status = ?, updated = ? WHERE id = ?",
+                                        (RUNNING, time.time(), run))
+            yield run, parameters
+
+    async def _worker(self, swat, runner, folder, runs, extract, output):
+        # The generator is shared by the workers, each takes the next run when it is free
+        for run, parameters in runs:
+            with swat.telemetry.span('campaign_run', run=run, folder=folder) as span:
+                with self.connection:
+                    self.connection.execute("UPDATE runs SET status = ?, updated = ? WHERE id = ?",
+                                            (RUNNING, time.time(), run))
+                start = time.perf_counter()
+                swat.apply_parameters(parameters, folder=folder)
+                span['apply_time'] = time.perf_counter() - start
+                result = await runner.run(folder, output=output)
+                span.update(return_code=result.return_code, wall_time=result.wall_time, timed_out=result.timed_out)
+                values = None
+                if result.success and extract is not None:
+                    start = time.perf_counter()
+                    try:
+                        values = extract(folder)
+                    except Exception as error:
+                        logger.error("Could not extract the results of campaign run " + str(run) + ": " + repr(error))
+                        result.error = error
+                    span['extract_time'] = time.perf_counter() - start
+                self.record(run, result, values)
+            logger.debug("Campaign run " + str(run) + " finished: " + repr(result))
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
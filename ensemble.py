@@ -0,0 +1,233 @@
+import os
+import time
+import logging
+from collections import deque
+from swatpython.execution import OUTPUT_DISCARD, ProgressOutput, execute_async, poll, kill
+from swatpython.lazyimport import LazyModule
+
+asyncio = LazyModule('asyncio')
+
+logger = logging.getLogger(__name__)
+
+
+class EnsembleResult(object):
+    """
+    Outcome of a single SWAT execution inside an ensemble.
+
+    Attributes
+    ----------
+    folder : str
+        project folder where SWAT was executed
+    return_code : int
+        process return code (None when the process could not be started)
+    wall_time : float
+        elapsed time in seconds, from launch until the process finished
+    timed_out : bool
+        True when the run was killed because it exceeded the timeout
+    error : Exception
+        exception raised while launching the run, if any
+    usage : dict
+        resources used by the process, see swatpython.execution.wait. Empty when the system
+        does not report them
+    """
+
+    def __init__(self, folder, return_code=None, wall_time=0.0, timed_out=False, error=None, usage=None):
+        self.folder = folder
+        self.return_code = return_code
+        self.wall_time = wall_time
+        self.timed_out = timed_out
+        self.error = error
+        self.usage = {} if usage is None else usage
+
+    @property
+    def success(self) -> bool:
+        return self.return_code == 0 and not self.timed_out and self.error is None
+
+    def __repr__(self):
+        return "EnsembleResult(folder=%r, return_code=%r, wall_time=%.3f, timed_out=%r)" % (
+            self.folder, self.return_code, self.wall_time, self.timed_out)
+
+
+class EnsembleRunner(object):
+    """
+    Runs many SWAT project folders concurrently. Each folder is launched with the module
+    async_run, so SWAT itself runs in a child process, and at most max_workers processes
+    are alive at the same time. Results are yielded as soon as each run finishes.
+    """
+
+    def __init__(self, wrapper, max_workers=None, timeout=None, poll_interval=0.05):
+        """
+        Parameters
+        ----------
+        wrapper : ModuleInterface
+            swat module used to launch the runs
+        max_workers : int, optional
+            maximum number of simultaneous runs (default is the number of cpus)
+        timeout : float, optional
+            maximum time in seconds for each run. Runs exceeding it are killed
+        poll_interval : float
+            time in seconds between checks of the running processes
+        """
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.wrapper = wrapper
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+    def run(self, folders):
+        """
+        Runs SWAT in every folder, yielding one EnsembleResult per folder in completion order.
+
+        Parameters
+        ----------
+        folders : iterable of str
+            project folders. Each folder must be independent, as SWAT writes its
+            outputs inside it
+
+        Returns
+        -------
+        generator of EnsembleResult
+        """
+        pending = deque(folders)
+        running = []
+        try:
+            while pending or running:
+                while pending and len(running) < self.max_workers:
+                    folder = pending.popleft()
+                    start = time.monotonic()
+                    try:
+                        process = self.wrapper.async_run(folder)
+                    except Exception as error:
+                        logger.error("Could not start SWAT in folder: " + str(folder))
+                        yield EnsembleResult(folder, error=error)
+                        continue
+                    logger.debug("Started SWAT in folder: " + str(folder))
+                    running.append((folder, process, start))
+
+                finished = []
+                now = time.monotonic()
+                for item in running:
+                    folder, process, start = item
+                    usage = {}
+                    return_code = poll(process, usage)
+                    if return_code is not None:
+                        finished.append((item, EnsembleResult(folder, return_code, now - start, usage=usage)))
+                    elif self.timeout is not None and now - start > self.timeout:
+                        logger.warning("SWAT run timed out in folder: " + str(folder))
+                        return_code = kill(process)
+                        finished.append((item, EnsembleResult(folder, return_code, now - start, timed_out=True)))
+
+                for item, result in finished:
+                    running.remove(item)
+                    yield result
+
+                if running and not finished:
+                    time.sleep(self.poll_interval)
+        finally:
+            # Generator closed before the end: do not leave orphan processes behind
+            for folder, process, start in running:
+                if process.poll() is None:
+                    logger.debug("Killing SWAT run in folder: " + str(folder))
+                    kill(process)
+
+
+class AsyncRunner(object):
+    """
+    Runs SWAT with asyncio. Runs are coroutines, so a single event loop can drive hundreds of
+    them, and a semaphore keeps at most max_workers SWAT processes alive at the same time.
+    Cancelling a run kills its process.
+
+    On Windows the event loop must support subprocesses (ProactorEventLoop, the default since
+    python 3.8).
+    """
+
+    def __init__(self, wrapper, max_workers=None, timeout=None):
+        """
+        Parameters
+        ----------
+        wrapper : ModuleInterface
+            swat module that provides the executable
+        max_workers : int, optional
+            maximum number of simultaneous runs (default is the number of cpus)
+        timeout : float, optional
+            maximum time in seconds for each run. Runs exceeding it are killed
+        """
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.wrapper = wrapper
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._semaphore = None
+
+    async def execute(self, folder, output=OUTPUT_DISCARD, progress=None):
+        """
+        Coroutine that runs SWAT in folder, waiting for a free slot first
+
+        Parameters
+        ----------
+        folder : str
+            project folder
+        output : str, OutputHandler or list of OutputHandler
+            what is done with the output, see swatpython.execution.output_handlers
+        progress : callable, optional
+            called with (year, day) while the simulation advances
+
+        Returns
+        -------
+        return code of SWAT. asyncio.TimeoutError is raised when the run exceeds the timeout
+        """
+        if self._semaphore is None:
+            # Created here, so it belongs to the running event loop
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        if progress is not None:
+            output = [output, ProgressOutput(progress)]
+        async with self._semaphore:
+            logger.debug("Started SWAT in folder: " + str(folder))
+            command = [self.wrapper.get_executable()]
+            return await asyncio.wait_for(execute_async(command, folder, output=output), self.timeout)
+
+    async def run(self, folder, output=OUTPUT_DISCARD, progress=None):
+        """
+        Coroutine that runs SWAT in folder, like execute, and returns an EnsembleResult
+        instead of raising errors
+
+        Parameters
+        ----------
+        folder : str
+            project folder
+        output : str, OutputHandler, list of OutputHandler or callable
+            what is done with the output. A callable receives the folder and returns the
+            output, like a log file inside the folder
+        progress : callable, optional
+            called with (folder, year, day) while the simulation advances
+        """
+        if callable(output):
+            output = output(folder)
+        if progress is not None:
+            callback = progress
+            progress = lambda year, day: callback(folder, year, day)
+        start = time.monotonic()
+        try:
+            return_code = await self.execute(folder, output=output, progress=progress)
+        except asyncio.TimeoutError:
+            logger.warning("SWAT run timed out in folder: " + str(folder))
+            return EnsembleResult(folder, wall_time=time.monotonic() - start, timed_out=True)
+        except (OSError, ValueError) as error:
+            logger.error("Could not start SWAT in folder: " + str(folder))
+            return EnsembleResult(folder, error=error)
+        return EnsembleResult(folder, return_code, time.monotonic() - start)
+
+    async def run_all(self, folders, output=OUTPUT_DISCARD, progress=None):
+        """
+        Coroutine that runs SWAT in every folder, at most max_workers at the same time
+
+        Returns
+        -------
+        list of EnsembleResult, in the order of folders
+        """
+        return await asyncio.gather(*[self.run(folder, output=output, progress=progress) for folder in folders])
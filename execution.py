@@ -0,0 +1,398 @@
+import os
+import re
+import sys
+import stat
+import time
+import signal
+import logging
+import subprocess
+from collections import deque
+from swatpython.lazyimport import LazyModule
+
+asyncio = LazyModule('asyncio')
+
+logger = logging.getLogger(__name__)
+
+# Output modes of run
+OUTPUT_CONSOLE = 'console'
+OUTPUT_DISCARD = 'discard'
+
+# Size of the blocks read from the output of SWAT
+READ_SIZE = 65536
+
+# Executables already checked by ensure_executable
+_checked_executables = set()
+
+# Progress line printed by SWAT for each simulated day, like " Executing year/day: 2000   1"
+PROGRESS = re.compile(rb"Executing year/day\D*(\d+)\D+(\d+)")
+
+# Time in seconds that kill waits for the processes of a killed run to disappear
+KILL_TIMEOUT = 5.0
+
+
+class OutputHandler(object):
+    """
+    Receives the output of SWAT (stdout and stderr) in blocks of bytes, not line by line,
+    so it costs very little even with one progress line for each simulated day.
+    """
+
+    def write(self, data):
+        """ Receives a block of the output """
+        raise NotImplementedError
+
+    def close(self):
+        """ Called after the process finished """
+        pass
+
+
+class ConsoleOutput(OutputHandler):
+    """ Copies the output to sys.stdout, the default of run """
+
+    def write(self, data):
+        sys.stdout.write(data.decode(errors='replace'))
+        sys.stdout.flush()
+
+
+class LogFileOutput(OutputHandler):
+    """
+    Writes the output to a log file. When it is the only handler the file is given to the
+    process, which writes it directly, without any processing in python.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path : str
+            log file, overwritten if it exists
+        """
+        self.path = path
+        self.file = None
+
+    def open(self):
+        self.file = open(self.path, 'wb')
+        return self.file
+
+    def write(self, data):
+        if self.file is None:
+            self.open()
+        self.file.write(data)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class TailOutput(OutputHandler):
+    """ Keeps the last lines of the output, to report errors """
+
+    def __init__(self, lines=100):
+        """
+        Parameters
+        ----------
+        lines : int
+            maximum number of lines kept
+        """
+        self.lines = deque(maxlen=lines)
+        self._partial = b''
+
+    def write(self, data):
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()
+        # Only the lines that fit in the buffer are decoded
+        for line in lines[-self.lines.maxlen:]:
+            self.lines.append(line.rstrip(b'\r').decode(errors='replace'))
+
+    def close(self):
+        if self._partial:
+            self.lines.append(self._partial.rstrip(b'\r').decode(errors='replace'))
+            self._partial = b''
+
+    def text(self) -> str:
+        return '\n'.join(self.lines)
+
+
+class ProgressOutput(OutputHandler):
+    """
+    Calls callback(year, day) with the progress of the simulation. It is called once for
+    each block of output, with the last day executed.
+    """
+
+    def __init__(self, callback):
+        """
+        Parameters
+        ----------
+        callback : callable
+            receives the year and the day of the year being simulated
+        """
+        self.callback = callback
+        self._partial = b''
+
+    def write(self, data):
+        data = self._partial + data
+        end = data.rfind(b'\n') + 1
+        self._partial = data[end:]
+        progress = None
+        for progress in PROGRESS.finditer(data, 0, end):
+            pass
+        if progress is not None:
+            self.callback(int(progress.group(1)), int(progress.group(2)))
+
+
+def output_handlers(output):
+    """
+    List of handlers of an output mode
+
+    Parameters
+    ----------
+    output : str, OutputHandler or list of OutputHandler
+        'console' copies the output to sys.stdout, 'discard' (or None) ignores it and any
+        other str is the path of a log file. Handlers can be combined in a list
+    """
+    if output is None or output == OUTPUT_DISCARD:
+        return []
+    if output == OUTPUT_CONSOLE:
+        return [ConsoleOutput()]
+    if isinstance(output, str):
+        return [LogFileOutput(output)]
+    if isinstance(output, OutputHandler):
+        return [output]
+    handlers = []
+    for item in output:
+        handlers.extend(output_handlers(item))
+    return handlers
+
+
+def ensure_executable(path):
+    """
+    Adds the execution permission to path when it is missing, like in the bundled binaries of
+    a copy that lost its permissions. Each path is checked only once per process, and files
+    that are already executable are never changed, so read only installations work.
+
+    Returns
+    -------
+    path
+    """
+    if path in _checked_executables:
+        return path
+    if os.name == 'posix' and os.path.isfile(path) and not os.access(path, os.X_OK):
+        mode = os.stat(path).st_mode
+        try:
+            os.chmod(path, mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+            logger.debug("Execution permission set: " + path)
+        except OSError as error:
+            logger.warning("Could not set the execution permission of " + path + ": " + str(error))
+    _checked_executables.add(path)
+    return path
+
+
+def execute(command, cwd, output=OUTPUT_CONSOLE, usage=None, **arguments) -> int:
+    """
+    Runs SWAT, handles its output and waits until it finishes
+
+    Parameters
+    ----------
+    command : list of str
+        executable and arguments
+    cwd : str
+        project folder
+    output : str, OutputHandler or list of OutputHandler
+        what is done with the output, see output_handlers
+    usage : dict, optional
+        filled with the resources used by the process, see wait
+    arguments :
+        other arguments of subprocess.Popen
+
+    Returns
+    -------
+    return code of the process
+    """
+    handlers = output_handlers(output)
+    if not handlers:
+        process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                   **arguments)
+        return _wait(process, usage)
+    if len(handlers) == 1 and isinstance(handlers[0], LogFileOutput):
+        handler = handlers[0]
+        try:
+            process = subprocess.Popen(command, cwd=cwd, stdout=handler.open(), stderr=subprocess.STDOUT,
+                                       **arguments)
+            return _wait(process, usage)
+        finally:
+            handler.close()
+
+    process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **arguments)
+    try:
+        while True:
+            data = process.stdout.read1(READ_SIZE)
+            if not data:
+                break
+            for handler in handlers:
+                handler.write(data)
+    except BaseException:
+        # Interrupted or failed handler, SWAT does not keep running alone
+        process.kill()
+        raise
+    finally:
+        process.stdout.close()
+        return_code = wait(process, usage)
+        for handler in handlers:
+            handler.close()
+    logger.debug("SWAT finished with return code " + str(return_code))
+    return return_code
+
+
+async def execute_async(command, cwd, output=OUTPUT_DISCARD, **arguments) -> int:
+    """
+    Coroutine that runs SWAT, handles its output and waits until it finishes, without
+    blocking the event loop. If the coroutine is cancelled SWAT is killed.
+
+    Parameters
+    ----------
+    command : list of str
+        executable and arguments
+    cwd : str
+        project folder
+    output : str, OutputHandler or list of OutputHandler
+        what is done with the output, see output_handlers. The default is to discard it
+    arguments :
+        other arguments of asyncio.create_subprocess_exec
+
+    Returns
+    -------
+    return code of the process
+    """
+    handlers = output_handlers(output)
+    log_file = len(handlers) == 1 and isinstance(handlers[0], LogFileOutput)
+    if not handlers:
+        stdout, stderr = subprocess.DEVNULL, subprocess.DEVNULL
+    elif log_file:
+        stdout, stderr = handlers[0].open(), subprocess.STDOUT
+    else:
+        stdout, stderr = subprocess.PIPE, subprocess.STDOUT
+    try:
+        process = await asyncio.create_subprocess_exec(*command, cwd=cwd, stdout=stdout, stderr=stderr, **arguments)
+        try:
+            if stdout == subprocess.PIPE:
+                while True:
+                    data = await process.stdout.read(READ_SIZE)
+                    if not data:
+                        break
+                    for handler in handlers:
+                        handler.write(data)
+            return_code = await process.wait()
+        except BaseException:
+            # Cancelled, timed out or failed handler, SWAT does not keep running alone
+            if process.returncode is None:
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+                await process.wait()
+            raise
+    finally:
+        for handler in handlers:
+            handler.close()
+    logger.debug("SWAT finished with return code " + str(return_code))
+    return return_code
+
+
+def wait(process, usage=None) -> int:
+    """
+    Waits for a subprocess.Popen process and returns its return code
+
+    Parameters
+    ----------
+    process : subprocess.Popen
+    usage : dict, optional
+        filled with the resources used by the process, where the system reports them (not on
+        Windows): user_time and system_time in seconds, max_rss in bytes, read_blocks,
+        written_blocks and the number of voluntary and involuntary context switches
+    """
+    if usage is None or not hasattr(os, 'wait4'):
+        return process.wait()
+    return _wait4(process, usage, 0)
+
+
+def poll(process, usage=None):
+    """ Return code of the process, None while it runs. usage is filled as in wait """
+    if usage is None or not hasattr(os, 'wait4'):
+        return process.poll()
+    return _wait4(process, usage, os.WNOHANG)
+
+
+def kill(process, timeout=KILL_TIMEOUT):
+    """
+    Kills a SWAT process and waits until it is gone. A process started in its own session,
+    like the ones of async_run on linux, is killed with its whole process group, so a custom
+    executable that is a script does not leave SWAT running alone, writing in the project.
+
+    Parameters
+    ----------
+    process : subprocess.Popen
+    timeout : float
+        maximum time in seconds waiting for the other processes of the group
+
+    Returns
+    -------
+    return code of the process
+    """
+    if process.poll() is not None:
+        # Already collected, its pid may belong to another process now
+        return process.returncode
+    group = False
+    if os.name == 'posix':
+        try:
+            # Only a group leader has a group with its own pid
+            os.killpg(process.pid, signal.SIGKILL)
+            group = True
+        except (ProcessLookupError, PermissionError):
+            pass
+    if not group:
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+    return_code = process.wait()
+    if group:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                os.killpg(process.pid, 0)
+            except (ProcessLookupError, PermissionError):
+                break
+            if time.monotonic() > deadline:
+                logger.warning("Processes of the killed SWAT run " + str(process.pid) + " are still alive")
+                break
+            time.sleep(0.01)
+    return return_code
+
+
+def _wait4(process, usage, options):
+    if process.returncode is not None:
+        return process.returncode
+    try:
+        pid, status, resources = os.wait4(process.pid, options)
+    except ChildProcessError:
+        # Already collected by someone else, there is no usage to report
+        return process.wait() if options == 0 else process.poll()
+    if pid == 0:
+        return None
+    process.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    # ru_maxrss is in kilobytes, except on macOS
+    max_rss = resources.ru_maxrss if sys.platform == 'darwin' else resources.ru_maxrss * 1024
+    usage.update(user_time=resources.ru_utime, system_time=resources.ru_stime, max_rss=max_rss,
+                 read_blocks=resources.ru_inblock, written_blocks=resources.ru_oublock,
+                 voluntary_switches=resources.ru_nvcsw, involuntary_switches=resources.ru_nivcsw)
+    return process.returncode
+
+
+def _wait(process, usage=None):
+    """ Waits for the process, killing it if the wait is interrupted """
+    try:
+        return wait(process, usage)
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
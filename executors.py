@@ -0,0 +1,388 @@
+import os
+import time
+import queue
+import socket
+import logging
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+from swatpython.ensemble import EnsembleResult
+from swatpython.execution import poll, kill
+
+logger = logging.getLogger(__name__)
+
+# Time in seconds between checks of a running SWAT process
+POLL_INTERVAL = 0.05
+
+# Times a task is given to workers that disconnect before it fails
+MAX_ATTEMPTS = 3
+
+
+class Executor(ABC):
+    """
+    Runs parameter sets of a SWAT project and returns the results extracted from the outputs.
+    The tasks are read from the iterable in the thread that iterates map, only when there is
+    a free worker, so they can come from a database cursor or a generator of any size.
+    """
+
+    @abstractmethod
+    def map(self, tasks):
+        """
+        Runs the tasks, yielding each result as soon as it is available
+
+        Parameters
+        ----------
+        tasks : iterable of (id, parameters)
+            id of the task and SUFI-2 parameter names and values, see SWAT.apply_parameters
+
+        Returns
+        -------
+        generator of (id, EnsembleResult, values), in completion order. values is the
+        dictionary returned by the extract function, None when the run failed
+        """
+        pass
+
+    def close(self):
+        """ Stops the executor and releases its resources """
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def run_task(swat, folder, parameters, extract=None, timeout=None, stop=None, lock=None):
+    """
+    Applies a parameter set to a workspace, runs SWAT in it and extracts the results. Errors
+    do not raise, they are returned in the EnsembleResult
+
+    Parameters
+    ----------
+    swat : SWAT
+        swat object with the project folder
+    folder : str
+        workspace of the project where SWAT runs
+    parameters : dict
+        SUFI-2 parameter names and values
+    extract : callable, optional
+        receives the folder of a successful run and returns a dictionary of results
+    timeout : float, optional
+        maximum time in seconds of the run, it is killed after it
+    stop : threading.Event, optional
+        kills the run when set
+    lock : threading.Lock, optional
+        held while the parameters are applied, as the parameter engine of swat is shared
+
+    Returns
+    -------
+    (EnsembleResult, values)
+    """
+    try:
+        if lock is None:
+            swat.apply_parameters(parameters, folder=folder)
+        else:
+            with lock:
+                swat.apply_parameters(parameters, folder=folder)
+        process = swat.wrapper.async_run(folder)
+    except Exception as error:
+        logger.error("Could not start SWAT in folder " + folder + ": " + repr(error))
+        return EnsembleResult(folder, error=error), None
+    start = time.monotonic()
+    usage = {}
+    try:
+        while True:
+            return_code = poll(process, usage)
+            if return_code is not None:
+                break
+            if timeout is not None and time.monotonic() - start > timeout:
+                logger.warning("SWAT run timed out in folder: " + folder)
+                return_code = kill(process)
+                return EnsembleResult(folder, return_code, time.monotonic() - start, timed_out=True), None
+            if stop is not None and stop.is_set():
+                return_code = kill(process)
+                return EnsembleResult(folder, return_code, time.monotonic() - start,
+                                      error=RuntimeError("Executor stopped")), None
+            time.sleep(POLL_INTERVAL)
+    except BaseException:
+        kill(process)
+        raise
+    result = EnsembleResult(folder, return_code, time.monotonic() - start, usage=usage)
+    values = None
+    if result.success and extract is not None:
+        try:
+            values = extract(folder)
+        except Exception as error:
+            logger.error("Could not extract the results in folder " + folder + ": " + repr(error))
+            result.error = error
+    return result, values
+
+
+class LocalExecutor(Executor):
+    """
+    Runs the tasks in processes of this machine, each worker in its own workspace of the
+    project. The workspaces are created on the first map and reused until close.
+    """
+
+    def __init__(self, swat, extract=None, max_workers=None, timeout=None, root=None):
+        """
+        Parameters
+        ----------
+        swat : SWAT
+            swat object with the project folder
+        extract : callable, optional
+            receives the folder of a successful run and returns a dictionary of results,
+            name to number or numpy array
+        max_workers : int, optional
+            maximum number of simultaneous runs (default is the number of cpus)
+        timeout : float, optional
+            maximum time in seconds for each run
+        root : str, optional
+            folder where the workspaces are created (default is the system temporary folder)
+        """
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.swat = swat
+        self.extract = extract
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.root = root
+        self.workspaces = []
+        self._lock = threading.Lock()
+
+    def map(self, tasks):
+        if not self.workspaces:
+            self.workspaces = [self.swat.create_workspace(root=self.root) for _ in range(self.max_workers)]
+        free = [workspace.path for workspace in self.workspaces]
+        stop = threading.Event()
+        tasks = iter(tasks)
+        running = {}
+        exhausted = False
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            try:
+                while True:
+                    while free and not exhausted:
+                        try:
+                            task, parameters = next(tasks)
+                        except StopIteration:
+                            exhausted = True
+                            break
+                        folder = free.pop()
+                        future = pool.submit(run_task, self.swat, folder, parameters, self.extract, self.timeout,
+                                             stop, self._lock)
+                        running[future] = (task, folder)
+                    if not running:
+                        return
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        task, folder = running.pop(future)
+                        free.append(folder)
+                        result, values = future.result()
+                        yield task, result, values
+            finally:
+                # Generator closed or failed: the runs still alive are killed
+                stop.set()
+
+    def close(self):
+        for workspace in self.workspaces:
+            workspace.cleanup()
+        self.workspaces = []
+
+
+class QueueExecutor(Executor):
+    """
+    Coordinator of a distributed queue: workers on this or other machines connect to it over
+    TCP (see QueueWorker), receive parameter sets, run SWAT in their own copy of the project
+    and send back only the values of their extract function. Workers can join and leave at
+    any time; the task of a worker that disconnects goes back to the queue.
+
+    Messages are pickled by multiprocessing.connection, so the authkey must be secret and the
+    port must not be open to untrusted networks.
+    """
+
+    def __init__(self, address=('localhost', 0), authkey=None):
+        """
+        Parameters
+        ----------
+        address : (str, int)
+            host and port where the workers connect. Port 0 picks a free port, see the
+            attribute address. Use ('0.0.0.0', port) to accept other machines
+        authkey : bytes
+            shared secret of the coordinator and the workers
+        """
+        if not authkey:
+            raise ValueError("An authkey is required for the queue")
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+        self.workers = 0
+        self._tasks = queue.Queue()
+        self._results = queue.Queue()
+        self._closed = threading.Event()
+        self._lock = threading.Lock()
+        self._accepter = threading.Thread(target=self._accept, daemon=True)
+        self._accepter.start()
+        logger.debug("Queue coordinator listening on: " + str(self.address))
+
+    def map(self, tasks):
+        tasks = iter(tasks)
+        outstanding = 0
+        exhausted = False
+        while True:
+            # One task waiting for each connected worker, so a free worker never waits for map
+            while not exhausted and outstanding < 2 * max(1, self.workers):
+                try:
+                    task, parameters = next(tasks)
+                except StopIteration:
+                    exhausted = True
+                    break
+                self._tasks.put([task, parameters, 0])
+                outstanding += 1
+            if outstanding == 0:
+                return
+            try:
+                item = self._results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            outstanding -= 1
+            yield item
+
+    def close(self):
+        self._closed.set()
+        # A connection wakes the accepting thread, closing the listener does not on linux
+        try:
+            socket.create_connection(self.address, timeout=1).close()
+        except OSError:
+            pass
+        self._accepter.join()
+        self.listener.close()
+
+    def _accept(self):
+        while not self._closed.is_set():
+            try:
+                connection = self.listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                # Listener closed, or a client that failed the authentication
+                continue
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection):
+        task = None
+        name = None
+        with self._lock:
+            self.workers += 1
+        try:
+            name = connection.recv()
+            logger.debug("Worker connected: " + str(name))
+            while True:
+                task = None
+                while task is None:
+                    if self._closed.is_set():
+                        connection.send(('stop',))
+                        return
+                    try:
+                        task = self._tasks.get(timeout=0.2)
+                    except queue.Empty:
+                        pass
+                connection.send(('task', task[0], task[1]))
+                fields, values = connection.recv()
+                error = fields.pop('error')
+                result = EnsembleResult(str(name) + ':' + fields.pop('folder'),
+                                        error=None if error is None else RuntimeError(error), **fields)
+                self._results.put((task[0], result, values))
+        except (OSError, EOFError) as error:
+            logger.warning("Worker " + str(name) + " disconnected: " + repr(error))
+            if task is not None:
+                self._requeue(task, error)
+        finally:
+            with self._lock:
+                self.workers -= 1
+            connection.close()
+
+    def _requeue(self, task, error):
+        task[2] += 1
+        if task[2] < MAX_ATTEMPTS:
+            self._tasks.put(task)
+        else:
+            logger.error("Task " + str(task[0]) + " lost by " + str(MAX_ATTEMPTS) + " workers")
+            self._results.put((task[0], EnsembleResult(None, error=error), None))
+
+
+class QueueWorker(object):
+    """
+    Worker of a QueueExecutor. It creates a workspace of the project and runs the tasks sent
+    by the coordinator until the coordinator stops or disconnects. Start one worker for each
+    cpu, in each machine, like:
+
+        swat = SWAT(SWATVersion.SWAT2012REV670)
+        swat.set_project_folder('/data/TxtInOut')
+        QueueWorker(swat, ('coordinator', 6000), b'secret', extract=read_flow).serve()
+
+    The extract function runs in the worker, so only its values travel over the network.
+    """
+
+    def __init__(self, swat, address, authkey, extract=None, timeout=None, root=None, name=None):
+        """
+        Parameters
+        ----------
+        swat : SWAT
+            swat object with the project folder
+        address : (str, int)
+            host and port of the coordinator
+        authkey : bytes
+            shared secret of the coordinator and the workers
+        extract : callable, optional
+            receives the folder of a successful run and returns a dictionary of results,
+            name to number or numpy array
+        timeout : float, optional
+            maximum time in seconds for each run
+        root : str, optional
+            folder where the workspace is created (default is the system temporary folder)
+        name : str, optional
+            name of the worker in the logs of the coordinator, host:pid by default
+        """
+        self.swat = swat
+        self.address = address
+        self.authkey = authkey
+        self.extract = extract
+        self.timeout = timeout
+        self.root = root
+        self.name = socket.gethostname() + ':' + str(os.getpid()) if name is None else name
+
+    def serve(self):
+        """
+        Runs tasks until the coordinator stops
+
+        Returns
+        -------
+        number of tasks run
+        """
+        count = 0
+        connection = Client(self.address, authkey=self.authkey)
+        try:
+            with self.swat.create_workspace(root=self.root) as workspace:
+                connection.send(self.name)
+                while True:
+                    try:
+                        message = connection.recv()
+                    except EOFError:
+                        break
+                    if message[0] == 'stop':
+                        break
+                    _, task, parameters = message
+                    with self.swat.telemetry.span('queue_task', task=task, folder=workspace.path) as span:
+                        result, values = run_task(self.swat, workspace.path, parameters, self.extract, self.timeout)
+                        span.update(return_code=result.return_code, wall_time=result.wall_time)
+                    fields = {'folder': result.folder, 'return_code': result.return_code,
+                              'wall_time': result.wall_time, 'timed_out': result.timed_out, 'usage': result.usage,
+                              'error': None if result.error is None else repr(result.error)}
+                    connection.send((fields, values))
+                    count += 1
+        finally:
+            connection.close()
+        logger.debug("Worker " + self.name + " finished " + str(count) + " tasks")
+        return count
@@ -0,0 +1,235 @@
+import re
+import os
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# First value of a line, the same separators used by the other readers
+TOKEN = re.compile(r"[^\s\,!?;'\"]+")
+
+# Values of file.cio changed only for a run (see SWAT.run), recorded next to the outputs of the
+# run. The name matches the output patterns, so the record goes with the outputs to the project
+# folder, when they are collected from the staging folder, and to the run cache
+RUN_VALUES_FILE = 'output.cio.json'
+
+# Kinds of lines of file.cio
+SKIP = 'skip'        # title or comment line
+INT = 'int'          # integer, first value of the line
+FLOAT = 'float'      # float, first value of the line
+TEXT = 'text'        # text, first value of the line
+NAME = 'name'        # file name in the first 12 characters
+FILES = 'files'      # file names in fields of 13 characters
+INTS = 'ints'        # list of integers in fields of 4 characters
+
+SWAT2012_FILE_CIO = [
+    (None, SKIP), (None, SKIP), (None, SKIP), (None, SKIP), (None, SKIP), (None, SKIP),
+    ('FIGFILE', TEXT), ('NBYR', INT), ('IYR', INT), ('IDAF', INT), ('IDAL', INT),
+    (None, SKIP),
+    ('IGEN', INT), ('PCPSIM', INT), ('IDT', INT), ('IDIST', INT), ('REXP', FLOAT), ('NRGAGE', INT),
+    ('NRTOT', INT), ('NRGFIL', INT), ('TMPSIM', INT), ('NTGAGE', INT), ('NTTOT', INT), ('NTGFIL', INT),
+    ('SLRSIM', INT), ('NSTOT', INT), ('RHSIM', INT), ('NHTOT', INT), ('WNDSIM', INT), ('NWTOT', INT),
+    ('FCSTYR', INT), ('FCSDAY', INT), ('FCSTCYCLES', INT),
+    (None, SKIP),
+    ('RFILE1_6', FILES), ('RFILE7_12', FILES), ('RFILE13_18', FILES),
+    (None, SKIP),
+    ('TFILE1_6', FILES), ('TFILE7_12', FILES), ('TFILE13_18', FILES),
+    ('SLRFILE', NAME), ('RHFILE', NAME), ('WNDFILE', NAME), ('FCSTFILE', NAME),
+    (None, SKIP),
+    ('BSNFILE', NAME),
+    (None, SKIP),
+    ('PLANTDB', NAME), ('TILLDB', NAME), ('PESTDB', NAME), ('FERTDB', NAME), ('URBAMDB', NAME),
+    (None, SKIP),
+    ('ISPROJ', INT), ('ICLB', INT), ('CALFILE', NAME),
+    (None, SKIP),
+    ('IPRINT', INT), ('NYSKIP', INT), ('ILOG', INT), ('IPRP', INT),
+    (None, SKIP), (None, SKIP),
+    ('IPDVAR', INTS),
+    (None, SKIP),
+    ('IPDVAB', INTS),
+    (None, SKIP),
+    ('IPDVAS', INTS),
+    (None, SKIP),
+    ('IPDHRU', INTS),
+    (None, SKIP),
+    ('ATMOFILE', NAME), ('IPHR', INT), ('ISTO', INT), ('ISOL', INT), ('I_SUBW', INT), ('SEPTDB', NAME),
+    ('IA_B', INT), ('IHUMUS', INT), ('ITEMP', INT), ('ISNOW', INT), ('IMGT', INT), ('IWTR', INT),
+    ('ICALEN', INT),
+]
+
+
+class FileCioLayout(object):
+    """
+    Reader and writer of file.cio driven by a layout table, a list of (key, kind) with one
+    entry per line of the file. The writer changes only the lines of the modified values,
+    all other lines are kept exactly as they are.
+    """
+
+    def __init__(self, layout):
+        """
+        Parameters
+        ----------
+        layout : list of (str, str)
+            key and kind of each line, like SWAT2012_FILE_CIO
+        """
+        self.layout = layout
+        self.lines = {key: (number, kind) for number, (key, kind) in enumerate(layout) if kind != SKIP}
+
+    def read(self, filename):
+        """
+        Reads file.cio
+
+        Parameters
+        ----------
+        filename : path to file.cio
+
+        Returns
+        -------
+        dictionary with the values of the file
+        """
+        with open(filename, "r", newline="") as fo:
+            lines = fo.readlines()
+        return self.parse(lines)
+
+    def parse(self, lines):
+        """ Values of the lines of a file.cio. Keys after the end of the file are missing """
+        values = {}
+        for number, (key, kind) in enumerate(self.layout):
+            if number >= len(lines):
+                break
+            if kind != SKIP:
+                values[key] = parse_value(lines[number], kind)
+        return values
+
+    def write(self, filename, values):
+        """
+        Changes values of file.cio. Only the lines of values different from the file are
+        rewritten.
+
+        Parameters
+        ----------
+        filename : path to file.cio
+        values : dict
+            new values, with the keys returned by read
+
+        Returns
+        -------
+        list with the keys that were changed
+        """
+        unknown = [key for key in values if key not in self.lines]
+        if unknown:
+            raise ValueError("Unknown file.cio keys: " + ", ".join(unknown))
+        with open(filename, "r", newline="") as fo:
+            lines = fo.readlines()
+        changed = []
+        for key, value in values.items():
+            number, kind = self.lines[key]
+            if number >= len(lines):
+                raise ValueError("file.cio has no line for " + key + ": " + filename)
+            if parse_value(lines[number], kind) == value:
+                continue
+            lines[number] = render_value(lines[number], kind, value)
+            changed.append(key)
+        if changed:
+            temporary = filename + '.tmp'
+            with open(temporary, "w", newline="") as fo:
+                fo.writelines(lines)
+            os.replace(temporary, filename)
+            logger.debug("file.cio changed: " + ", ".join(changed))
+        return changed
+
+
+def parse_value(line, kind):
+    """ Value of one line of file.cio """
+    if kind == NAME:
+        return line[0:12].strip()
+    if kind == FILES:
+        names = [line[i:i + 13].strip() for i in range(0, len(line.rstrip('\r\n')), 13)]
+        return [name for name in names if name != '']
+    if kind == INTS:
+        return [int(i) for i in TOKEN.findall(line)]
+    token = TOKEN.search(line).group()
+    if kind == INT:
+        return int(token)
+    if kind == FLOAT:
+        return float(token)
+    return token
+
+
+def render_value(line, kind, value):
+    """
+    New text of a line of file.cio with value. The description after the value is kept and
+    the value is right aligned where the previous value was
+    """
+    ending = line[len(line.rstrip('\r\n')):]
+    if kind == NAME:
+        value = str(value)
+        if len(value) > 12:
+            raise ValueError("File names in file.cio have at most 12 characters: " + value)
+        return value.ljust(12) + line[12:]
+    if kind == FILES:
+        value = [str(name) for name in value]
+        for name in value:
+            if len(name) > 12:
+                raise ValueError("File names in file.cio have at most 12 characters: " + name)
+        return ''.join(name.ljust(13) for name in value).rstrip() + ending
+    if kind == INTS:
+        return ''.join('%4i' % i for i in value) + ending
+    match = TOKEN.search(line)
+    token = match.group()
+    if kind == FLOAT:
+        decimals = len(token.split('.')[1]) if '.' in token else 3
+        text = '%.*f' % (decimals, value)
+    elif kind == INT:
+        text = str(int(value))
+    else:
+        # Text is left aligned: the blanks after it absorb the change of length
+        text = str(value)
+        rest = line[match.end():]
+        blanks = len(rest) - len(rest.lstrip(' '))
+        difference = len(text) - len(token)
+        if difference > 0:
+            rest = rest[min(difference, max(blanks - 1, 0)):]
+        else:
+            rest = ' ' * -difference + rest
+        return line[:match.start()] + text + rest
+    prefix = line[:match.start()]
+    if prefix.strip() == '':
+        # Right aligned in the same columns, using the blanks before the old value if needed
+        return text.rjust(match.end()) + line[match.end():]
+    return prefix + text + line[match.end():]
+
+
+def write_run_values(folder, values):
+    """
+    Records the file.cio values in effect for a run that are not in the file.cio of the folder.
+    Without values the record of a previous run is removed
+
+    Parameters
+    ----------
+    folder : str
+        folder where SWAT runs
+    values : dict
+        values changed only for the run, like the ones returned by print_settings
+    """
+    path = os.path.join(folder, RUN_VALUES_FILE)
+    if not values:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    temporary = path + '.tmp'
+    with open(temporary, "w") as fo:
+        json.dump(values, fo, sort_keys=True)
+    os.replace(temporary, path)
+
+
+def read_run_values(folder) -> dict:
+    """
+    file.cio values recorded by write_run_values for the outputs in folder, empty when the
+    outputs were written with the file.cio of the folder
+    """
+    try:
+        with open(os.path.join(folder, RUN_VALUES_FILE), "r") as fo:
+            return json.load(fo)
+    except FileNotFoundError:
+        return {}
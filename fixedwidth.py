@@ -0,0 +1,669 @@
+import os
+import re
+import mmap
+import logging
+from contextlib import contextmanager
+from swatpython.lazyimport import LazyModule
+
+numpy = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+logger = logging.getLogger(__name__)
+
+NEWLINE = ord('\n')
+CARRIAGE_RETURN = ord('\r')
+SPACE = ord(' ')
+
+# Lines copied at once when the lines of a file have different lengths
+LINES_PER_BLOCK = 65536
+
+# Fortran drops the 'E' of exponents with three digits: 0.1234-100
+FORTRAN_EXPONENT = re.compile(rb'(\d)([+-]\d{3})\s*$')
+
+# Python writes nan and inf with the zeros of a zero padded format: 00nan, -0inf
+PADDED_NON_FINITE = re.compile(rb'^\s*([+-]?)0*(?=nan|inf)', re.IGNORECASE)
+
+
+class FixedWidthLayout(object):
+    """
+    Fast reader for the fixed width tables written by SWAT.
+
+    The file is memory mapped and the data lines are viewed as a 2D byte matrix, one row per
+    line. Each field is a column slice of that matrix, converted at once by numpy, so there
+    is no python work per line or per value. With the 'str', 'int' and 'float' kinds the result
+    is the same DataFrame returned by pandas.read_fwf with the same widths.
+
+    Fields that start after the end of the header line are not in the file and are ignored,
+    so one layout can be used for files with some of the last columns missing.
+    """
+
+    def __init__(self, widths, kinds, header=None, header_widths=None, names=None, skiprows=0):
+        """
+        Parameters
+        ----------
+        widths : list of int
+            width of each field
+        kinds : list of str
+            type of each field: 'str', 'int' or 'float'. 'int' fields with decimal values
+            are returned as float, like pandas does. Compact types are 'category' (strings),
+            'int32' and 'float32'
+        header : int, optional
+            line number (starting at 0) with the column names. Data starts on the next line.
+            Lines before it are ignored. When None, data starts on the first line
+        header_widths : list of int, optional
+            width of each column name in the header line, when different from the data
+        names : list of str, optional
+            column names, for files without header
+        skiprows : int
+            lines ignored before the data, for files without header
+        """
+        if len(widths) != len(kinds):
+            raise ValueError("widths and kinds must have the same length")
+        if header_widths is not None and len(header_widths) != len(widths):
+            raise ValueError("header_widths and widths must have the same length")
+        if names is not None and len(names) != len(widths):
+            raise ValueError("names and widths must have the same length")
+        self.widths = list(widths)
+        self.kinds = list(kinds)
+        self.header = header
+        self.names = None if names is None else list(names)
+        self.skiprows = skiprows
+        self.header_widths = self.widths if header_widths is None else list(header_widths)
+        self.starts = _starts(self.widths)
+        self.header_starts = _starts(self.header_widths)
+
+    def read(self, filename, columns=None, row_filter=None, row_index=None) -> 'pd.DataFrame':
+        """
+        Reads the file. Only the requested columns and rows are converted, the remaining
+        fields are never parsed.
+
+        Parameters
+        ----------
+        filename : path to the file
+        columns : list of str, optional
+            names of the columns to read (default is all columns)
+        row_filter : callable, optional
+            function receiving a Lines object and returning a boolean array with the
+            lines to keep
+        row_index : callable, optional
+            function receiving a Lines object and returning the index of the lines, like a
+            DatetimeIndex. It receives all the lines, before row_filter
+
+        Returns
+        -------
+        DataFrame with one column per field
+        """
+        with open(filename, 'rb') as fo:
+            if self._file_size(fo) == 0:
+                return self._empty_dataframe([])
+            with memory_map(fo) as mm:
+                names, offset = self._read_header(mm)
+                buffer = numpy.frombuffer(mm, dtype=numpy.uint8, offset=offset)
+                lines = Lines(self, names, line_matrix(buffer))
+                dataframe = self._dataframe(lines, columns, row_filter, row_index)
+                # Views of the map must be released before it is closed
+                del buffer, lines
+                return dataframe
+
+    def iter_read(self, filename, chunksize, columns=None, row_filter=None, row_index=None):
+        """
+        Reads the file in chunks of at most chunksize lines, so the memory used does not
+        depend on the file size
+
+        Parameters
+        ----------
+        filename : path to the file
+        chunksize : int
+            number of lines of each chunk
+        columns : list of str, optional
+            names of the columns to read (default is all columns)
+        row_filter : callable, optional
+            function receiving a Lines object and returning a boolean array with the
+            lines to keep. It is called once per chunk, in the file order
+        row_index : callable, optional
+            function receiving a Lines object and returning the index of the lines. It is
+            called once per chunk, in the file order, before row_filter
+
+        Returns
+        -------
+        generator of DataFrame. Without row_index the index continues from one chunk to the next
+        """
+        if chunksize < 1:
+            raise ValueError("chunksize must be at least 1")
+        with open(filename, 'rb') as fo:
+            if self._file_size(fo) == 0:
+                return
+            with memory_map(fo) as mm:
+                names, offset = self._read_header(mm)
+                rows = 0
+                for start, end in self._blocks(mm, offset, chunksize):
+                    buffer = numpy.frombuffer(mm, dtype=numpy.uint8, count=end - start, offset=start)
+                    lines = Lines(self, names, line_matrix(buffer))
+                    dataframe = self._dataframe(lines, columns, row_filter, row_index)
+                    del buffer, lines
+                    if len(dataframe) == 0:
+                        continue
+                    if row_index is None:
+                        dataframe.index = pd.RangeIndex(rows, rows + len(dataframe))
+                    rows += len(dataframe)
+                    yield dataframe
+
+    def follow(self, filename, columns=None, row_filter=None, row_index=None):
+        """
+        Reader of a file that is still being written, like the outputs of a running SWAT.
+        See Follower
+
+        Parameters
+        ----------
+        filename : path to the file, it may not exist yet
+        columns, row_filter, row_index : same as iter_read
+
+        Returns
+        -------
+        Follower
+        """
+        return Follower(self, filename, columns, row_filter, row_index)
+
+    def _blocks(self, mm, offset, chunksize):
+        """ Byte intervals (start, end) of blocks with about chunksize complete lines """
+        size = len(mm)
+        first_line = mm.find(b'\n', offset)
+        line_length = (first_line if first_line >= 0 else size) - offset + 1
+        block_size = max(chunksize * line_length, 1)
+        while offset < size:
+            end = min(offset + block_size, size)
+            if end < size:
+                # The block ends at a line break
+                line_break = mm.find(b'\n', end - 1)
+                end = size if line_break < 0 else line_break + 1
+            yield offset, end
+            offset = end
+
+    def column_names(self, header_line):
+        """
+        Names of the columns in the header line. Fields after the end of the header line
+        get None
+        """
+        if self.names is not None:
+            return list(self.names)
+        names = []
+        header_length = len(header_line.rstrip())
+        for i, (start, width) in enumerate(zip(self.header_starts, self.header_widths)):
+            if self.header is not None and start >= header_length:
+                names.append(None)
+                continue
+            name = header_line[start:start + width].strip()
+            names.append(name if name != '' else 'Unnamed: ' + str(i))
+        return names
+
+    def _file_size(self, fo):
+        fo.seek(0, 2)
+        size = fo.tell()
+        fo.seek(0)
+        return size
+
+    def _read_header(self, mm):
+        """ Skips the lines before the data, returning the column names and the data offset """
+        offset = 0
+        header_line = ''
+        skip = self.skiprows if self.header is None else self.header + 1
+        for i in range(skip):
+            end = mm.find(b'\n', offset)
+            if end < 0:
+                end = len(mm)
+            if i == self.header:
+                header_line = mm[offset:end].decode('latin-1').rstrip('\r')
+            offset = min(end + 1, len(mm))
+        return self.column_names(header_line), offset
+
+    def _dataframe(self, lines, columns=None, row_filter=None, row_index=None):
+        if columns is None:
+            selected = [i for i, name in enumerate(lines.names) if name is not None]
+        else:
+            unknown = [name for name in columns if name not in lines.names]
+            if unknown:
+                raise ValueError("Columns not found in file: " + ", ".join(unknown))
+            selected = [i for i, name in enumerate(lines.names) if name in columns]
+        names = [lines.names[i] for i in selected]
+
+        # Blank lines are ignored, like pandas does
+        blank = lines.blank()
+        if blank.any():
+            lines = lines.subset(~blank)
+        index = None
+        if row_index is not None and len(lines):
+            index = row_index(lines)
+        if row_filter is not None and len(lines):
+            mask = row_filter(lines)
+            lines = lines.subset(mask)
+            if index is not None:
+                index = index[mask]
+        if len(lines) == 0:
+            return self._empty_dataframe(names)
+
+        data = {}
+        for first, count in self._groups(selected):
+            start, width, kind = self.starts[first], self.widths[first], self.kinds[first]
+            if count == 1:
+                data[lines.names[first]] = convert(field(lines.matrix, start, width), kind)
+                continue
+            # Consecutive float fields are converted in a single call
+            block = convert(field(lines.matrix, start, width, count), kind)
+            for i in range(count):
+                data[lines.names[first + i]] = block[:, i]
+        return pd.DataFrame(data, columns=names, index=index)
+
+    def _groups(self, selected):
+        """ Groups of consecutive float fields with the same width and type, as (first field, count) """
+        groups = []
+        previous = None
+        for i in selected:
+            width, kind = self.widths[i], self.kinds[i]
+            if (groups and previous == i - 1 and kind in ('float', 'float32') and self.kinds[previous] == kind and
+                    self.widths[previous] == width):
+                groups[-1][1] += 1
+            else:
+                groups.append([i, 1])
+            previous = i
+        return groups
+
+    def _empty_dataframe(self, names):
+        return pd.DataFrame(columns=names)
+
+
+class Follower(object):
+    """
+    Reads the lines appended to a fixed width file since the previous read. Each read parses
+    only the new complete lines, so following a file while it grows costs the same as reading
+    it once. A file that shrinks or is replaced, like an output file of a previous run
+    truncated by SWAT, is read again from the start.
+    """
+
+    def __init__(self, layout, filename, columns=None, row_filter=None, row_index=None):
+        self.layout = layout
+        self.filename = filename
+        self.columns = columns
+        self.row_filter = row_filter
+        self.row_index = row_index
+        self.names = None
+        self.offset = 0
+        self.rows = 0
+        self._identity = None
+
+    def read(self) -> 'pd.DataFrame':
+        """
+        Reads the new complete lines
+
+        Returns
+        -------
+        DataFrame with the new lines, empty when there are none. Without row_index the index
+        continues from one read to the next
+        """
+        try:
+            with open(self.filename, 'rb') as fo:
+                stat = os.fstat(fo.fileno())
+                identity = (stat.st_dev, stat.st_ino)
+                if identity != self._identity or stat.st_size < self.offset:
+                    self._identity = identity
+                    self.names = None
+                    self.offset = 0
+                    self.rows = 0
+                if self.names is None and not self._read_header(fo):
+                    return self.layout._empty_dataframe([])
+                fo.seek(self.offset)
+                data = fo.read(stat.st_size - self.offset)
+        except FileNotFoundError:
+            return self.layout._empty_dataframe([])
+        # The last line may still be incomplete
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return self.layout._empty_dataframe([])
+        self.offset += end
+        buffer = numpy.frombuffer(data, dtype=numpy.uint8, count=end)
+        dataframe = self.layout._dataframe(Lines(self.layout, self.names, line_matrix(buffer)), self.columns,
+                                           self.row_filter, self.row_index)
+        if self.row_index is None:
+            dataframe.index = pd.RangeIndex(self.rows, self.rows + len(dataframe))
+        self.rows += len(dataframe)
+        return dataframe
+
+    def _read_header(self, fo):
+        """ Reads the column names when all the lines before the data are written """
+        skip = self.layout.skiprows if self.layout.header is None else self.layout.header + 1
+        fo.seek(0)
+        lines = []
+        for _ in range(skip):
+            line = fo.readline()
+            if not line.endswith(b'\n'):
+                return False
+            lines.append(line)
+        header_line = ''
+        if self.layout.header is not None:
+            header_line = lines[self.layout.header].decode('latin-1').rstrip('\r\n')
+        self.names = self.layout.column_names(header_line)
+        self.offset = fo.tell()
+        return True
+
+
+class Lines(object):
+    """
+    Data lines of a fixed width file, used to select lines before the columns are converted
+    """
+
+    def __init__(self, layout, names, matrix):
+        self.layout = layout
+        self.names = names
+        self.matrix = matrix
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def text(self, name):
+        """ Raw bytes of the column name, as a numpy bytes array """
+        i = self.names.index(name)
+        return field(self.matrix, self.layout.starts[i], self.layout.widths[i])
+
+    def values(self, name):
+        """ Values of the column name, converted to the column type """
+        i = self.names.index(name)
+        return convert(self.text(name), self.layout.kinds[i])
+
+    def blank(self):
+        """ Boolean array with the blank lines """
+        blank = numpy.zeros(len(self.matrix), dtype=bool)
+        if self.matrix.shape[1] == 0:
+            blank[:] = True
+            return blank
+        # Only lines starting with a blank are fully checked
+        candidates = numpy.flatnonzero(self.matrix[:, 0] == SPACE)
+        blank[candidates] = (self.matrix[candidates] == SPACE).all(axis=1)
+        return blank
+
+    def subset(self, mask):
+        """ New Lines object with only the lines where mask is True """
+        return Lines(self.layout, self.names, self.matrix[mask])
+
+
+@contextmanager
+def memory_map(fo):
+    """
+    Read only memory map of an open file. If numpy views of the map are still alive when it
+    is closed, which happens when an exception traceback references them, the map is left
+    to be closed by the garbage collector instead of hiding the original error.
+    """
+    mm = mmap.mmap(fo.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        yield mm
+    finally:
+        try:
+            mm.close()
+        except BufferError:
+            pass
+
+
+def line_matrix(buffer):
+    """
+    Views a buffer of text lines as a 2D byte matrix with one row per line.
+
+    When all lines have the same length, which is the case for SWAT outputs, the matrix is
+    a view of the buffer and nothing is copied. Otherwise the lines are copied into a matrix
+    padded with spaces.
+
+    Parameters
+    ----------
+    buffer : numpy uint8 array
+
+    Returns
+    -------
+    2D numpy uint8 array
+    """
+    # Trailing blank lines are ignored
+    end = len(buffer)
+    while end > 0 and buffer[end - 1] in (NEWLINE, CARRIAGE_RETURN, SPACE):
+        end -= 1
+    if end == 0:
+        return numpy.zeros((0, 0), dtype=numpy.uint8)
+    # The last line is kept complete, up to its line break
+    line_break = numpy.flatnonzero(buffer[end:] == NEWLINE)
+    if len(line_break):
+        end += int(line_break[0])
+    else:
+        end = len(buffer)
+    buffer = buffer[:end]
+
+    newlines = numpy.flatnonzero(buffer == NEWLINE)
+    count = len(newlines) + 1
+    length = int(newlines[0]) if len(newlines) else end
+    if end == count * (length + 1) - 1 and (newlines == numpy.arange(1, count) * (length + 1) - 1).all():
+        matrix = numpy.lib.stride_tricks.as_strided(buffer, shape=(count, length), strides=(length + 1, 1),
+                                                    writeable=False)
+        if length > 0 and (matrix[:, -1] == CARRIAGE_RETURN).all():
+            # Windows line breaks
+            matrix = matrix[:, :-1]
+        if not (matrix == CARRIAGE_RETURN).any():
+            return matrix
+
+    # Lines with different lengths: copy them to a matrix padded with spaces
+    starts = numpy.concatenate([[0], newlines + 1])
+    lengths = numpy.append(newlines, end) - starts
+    matrix = numpy.full((count, int(lengths.max())), SPACE, dtype=numpy.uint8)
+    for first in range(0, count, LINES_PER_BLOCK):
+        block = slice(first, first + LINES_PER_BLOCK)
+        block_lengths = lengths[block]
+        rows = numpy.repeat(numpy.arange(first, first + len(block_lengths)), block_lengths)
+        columns = numpy.arange(int(block_lengths.sum())) - numpy.repeat(numpy.cumsum(block_lengths) - block_lengths,
+                                                                         block_lengths)
+        matrix[rows, columns] = buffer[numpy.repeat(starts[block], block_lengths) + columns]
+    matrix[matrix == CARRIAGE_RETURN] = SPACE
+    return matrix
+
+
+def field(matrix, start, width, count=None):
+    """
+    Extracts one fixed width field of all lines, or a block of consecutive fields with
+    the same width
+
+    Parameters
+    ----------
+    matrix : 2D uint8 array, as returned by line_matrix
+    start : first character of the field
+    width : field width
+    count : int, optional
+        number of consecutive fields to extract
+
+    Returns
+    -------
+    numpy bytes array (dtype S<width>), with shape (lines,) or (lines, count)
+    """
+    size = width * (1 if count is None else count)
+    columns = matrix[:, start:start + size]
+    if columns.shape[1] < size:
+        # Lines shorter than the layout: missing characters are blank
+        padded = numpy.full((len(matrix), size), SPACE, dtype=numpy.uint8)
+        padded[:, :columns.shape[1]] = columns
+        columns = padded
+    values = numpy.ascontiguousarray(columns).view('S' + str(width))
+    if count is None:
+        return values.reshape(len(matrix))
+    return values
+
+
+def convert(values, kind):
+    """
+    Converts a bytes array extracted with field to the type of the field
+
+    Parameters
+    ----------
+    values : numpy bytes array
+    kind : 'str', 'category', 'int', 'int32', 'float' or 'float32'
+
+    Returns
+    -------
+    numpy array, or pandas Categorical for 'category'
+    """
+    if kind == 'str':
+        return numpy.char.strip(values).astype(str).astype(object)
+    if kind == 'category':
+        # Each distinct value is decoded only once
+        unique, codes = numpy.unique(values, return_inverse=True)
+        names = numpy.char.strip(unique).astype(str)
+        categories, remap = numpy.unique(names, return_inverse=True)
+        return pd.Categorical.from_codes(remap.reshape(-1)[codes.reshape(-1)], categories=categories)
+    float_type = numpy.float32 if kind in ('int32', 'float32') else numpy.float64
+    if kind in ('int', 'int32'):
+        try:
+            return values.astype(numpy.int64 if kind == 'int' else numpy.int32)
+        except ValueError:
+            pass
+    try:
+        return values.astype(float_type)
+    except ValueError:
+        return _convert_slow(values).astype(float_type)
+
+
+def _starts(widths):
+    return numpy.concatenate([[0], numpy.cumsum(widths)[:-1]]).astype(int).tolist()
+
+
+def _convert_slow(values):
+    """ Conversion of fields that numpy can not parse: blanks, Fortran exponents and padded nan """
+    shape = values.shape
+    # One more character for the missing exponent letter
+    values = values.astype('S' + str(values.itemsize + 1)).reshape(-1)
+    values[numpy.char.strip(values) == b''] = b'nan'
+    unsigned = numpy.char.lstrip(values, b' +-')
+    candidates = ((numpy.char.find(unsigned, b'E') < 0) & (numpy.char.find(unsigned, b'e') < 0) &
+                  ((numpy.char.find(unsigned, b'-') >= 0) | (numpy.char.find(unsigned, b'+') >= 0)))
+    for i in numpy.flatnonzero(candidates):
+        values[i] = FORTRAN_EXPONENT.sub(rb'\1E\2', values[i])
+    for i in numpy.flatnonzero(numpy.char.find(numpy.char.lower(values), b'n') >= 0):
+        values[i] = PADDED_NON_FINITE.sub(rb'\1', values[i])
+    return values.astype(numpy.float64).reshape(shape)
+
+
+def render_int(values, width, zero_pad=False):
+    """
+    Renders integers as a 2D byte matrix with one row per value, like the format '%<width>i'
+    (or '%0<width>i' with zero_pad). Decimal values are truncated, like python does.
+
+    Parameters
+    ----------
+    values : numpy array
+    width : field width
+    zero_pad : bool
+        fill with zeros instead of spaces
+
+    Returns
+    -------
+    2D uint8 array, or None when some value does not fit in width or is not finite
+    """
+    values = numpy.asarray(values)
+    if values.dtype.kind == 'f':
+        if not numpy.isfinite(values).all():
+            return None
+        values = values.astype(numpy.int64)
+    values = values.astype(numpy.int64)
+    negative = values < 0
+    magnitude = numpy.abs(values)
+    digits = width - negative.astype(numpy.int64)
+    if (magnitude >= 10 ** digits.astype(numpy.float64)).any():
+        return None
+    return _render_digits(magnitude, negative, width, 0, zero_pad)
+
+
+def render_fixed(values, width, decimals, zero_pad=False):
+    """
+    Renders floats as a 2D byte matrix with one row per value, with the same characters of
+    the format '%<width>.<decimals>f' (or '%0<width>.<decimals>f' with zero_pad).
+
+    Values are rounded with numpy. Values too close to a rounding tie, where the binary
+    representation decides the result, and nan and inf are formatted by python, so the output
+    is always identical to the python format.
+
+    Parameters
+    ----------
+    values : numpy array
+    width : field width
+    decimals : number of decimals
+    zero_pad : bool
+        fill with zeros instead of spaces
+
+    Returns
+    -------
+    2D uint8 array, or None when some value does not fit in width
+    """
+    values = numpy.asarray(values, dtype=numpy.float64)
+    finite = numpy.isfinite(values)
+    scale = 10 ** decimals
+    scaled = numpy.abs(numpy.where(finite, values, 0.0)) * scale
+    units = numpy.floor(scaled + 0.5)
+    negative = numpy.signbit(values)
+    integer_digits = width - decimals - (1 if decimals else 0) - negative.astype(numpy.int64)
+    if (units >= scale * 10.0 ** integer_digits).any():
+        return None
+    matrix = _render_digits(units.astype(numpy.int64), negative, width, decimals, zero_pad)
+
+    # Ties are decided by the exact binary value and nan and inf have no digits: python formats them
+    fraction = scaled - numpy.floor(scaled)
+    ties = numpy.flatnonzero((numpy.abs(fraction - 0.5) < 1e-6) | ~finite)
+    if len(ties):
+        text_format = '%' + ('0' if zero_pad else '') + str(width) + '.' + str(decimals) + 'f'
+        for i in ties:
+            text = (text_format % values[i]).encode()
+            if len(text) != width:
+                return None
+            matrix[i] = numpy.frombuffer(text, dtype=numpy.uint8)
+    return matrix
+
+
+def _render_digits(units, negative, width, decimals, zero_pad):
+    """ Renders non negative integers (value * 10 ** decimals) as fixed point numbers """
+    count = len(units)
+    integer_end = width - decimals - (1 if decimals else 0)
+    matrix = numpy.full((count, width), ord('0'), dtype=numpy.uint8)
+    remaining = units.copy()
+    for position in range(width - 1, -1, -1):
+        if decimals and position == integer_end:
+            matrix[:, position] = ord('.')
+            continue
+        matrix[:, position] += (remaining % 10).astype(numpy.uint8)
+        remaining //= 10
+    if zero_pad:
+        matrix[negative, 0] = ord('-')
+        return matrix
+    # Blanks before the integer part, which has at least one digit
+    integer = units // 10 ** decimals
+    digits = numpy.ones(count, dtype=numpy.int64)
+    for power in range(1, integer_end):
+        digits += integer >= 10 ** power
+    first_digit = integer_end - digits
+    matrix[numpy.arange(width)[None, :] < first_digit[:, None]] = SPACE
+    rows = numpy.flatnonzero(negative)
+    matrix[rows, first_digit[rows] - 1] = ord('-')
+    return matrix
+
+
+def join_fields(fields, newline=os.linesep):
+    """
+    Joins rendered fields (see render_int and render_fixed) in lines
+
+    Parameters
+    ----------
+    fields : list of 2D uint8 arrays with the same number of rows
+    newline : str
+        line break added to each line
+
+    Returns
+    -------
+    bytes with all lines
+    """
+    newline = newline.encode()
+    count = len(fields[0])
+    width = sum(f.shape[1] for f in fields) + len(newline)
+    matrix = numpy.empty((count, width), dtype=numpy.uint8)
+    position = 0
+    for f in fields:
+        matrix[:, position:position + f.shape[1]] = f
+        position += f.shape[1]
+    matrix[:, position:] = numpy.frombuffer(newline, dtype=numpy.uint8)
+    return matrix.tobytes()
@@ -0,0 +1,27 @@
+import importlib
+
+
+class LazyModule(object):
+    """
+    Stands for a module that is imported on the first access to one of its attributes.
+    numpy, pandas and asyncio are only needed by some operations, and importing them takes
+    most of the time of importing swatpython, which matters for worker processes started
+    for a single task.
+
+    Use it at module level, like pd = LazyModule('pandas'). Annotations that refer to the
+    module must be strings, or they would import it when the function is defined.
+    """
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def __getattr__(self, attribute):
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__dict__['_name'])
+            self.__dict__['_module'] = module
+        return getattr(module, attribute)
+
+    def __repr__(self):
+        return "LazyModule(" + repr(self.__dict__['_name']) + ")"
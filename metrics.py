@@ -0,0 +1,107 @@
+import numpy
+
+# Metrics computed by evaluate
+METRICS = ['NSE', 'KGE', 'PBIAS', 'R2', 'RSR']
+
+# Runs evaluated at a time, limits the memory of the temporary arrays
+CHUNK_RUNS = 512
+
+
+def evaluate(simulated, observed, warmup=0, metrics=None):
+    """
+    Objective functions of an ensemble of runs, computed for all runs at once
+
+    Parameters
+    ----------
+    simulated : array
+        (runs, time) or (runs, reaches, time) block with the simulated series. The values must
+        be finite
+    observed : array
+        (time,) observed series, used for every reach, or (reaches, time) with one series per
+        reach. Missing observations are NaN and are left out of all the metrics
+    warmup : int
+        number of time steps ignored at the start of the series
+    metrics : list of str
+        metrics returned, all of METRICS by default
+
+    Returns
+    -------
+    dictionary with an array of shape (runs,) or (runs, reaches) for each metric. PBIAS is
+    positive when the model underestimates, as in SWAT-CUP. Series without observations or
+    with constant observations give NaN
+    """
+    simulated = numpy.asarray(simulated, dtype=float)
+    observed = numpy.asarray(observed, dtype=float)
+    if simulated.ndim not in (2, 3):
+        raise ValueError("simulated must be (runs, time) or (runs, reaches, time), not " + str(simulated.shape))
+    if observed.shape != simulated.shape[-1:] and observed.shape != simulated.shape[1:]:
+        raise ValueError("observed " + str(observed.shape) + " does not match simulated " + str(simulated.shape))
+    metrics = METRICS if metrics is None else metrics
+    unknown = [name for name in metrics if name not in METRICS]
+    if unknown:
+        raise ValueError("Unknown metrics: " + ", ".join(unknown))
+    if warmup:
+        simulated = simulated[..., warmup:]
+        observed = observed[..., warmup:]
+
+    # The observed terms are the same for every run
+    mask = numpy.isfinite(observed)
+    count = mask.sum(axis=-1)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        observed_mean = numpy.where(mask, observed, 0).sum(axis=-1) / count
+        observed_deviation = numpy.where(mask, observed - observed_mean[..., None], 0)
+        observed_ss = numpy.einsum('...t,...t->...', observed_deviation, observed_deviation)
+        # Constant observations have no variance to explain
+        observed_ss = numpy.where(observed_ss > 0, observed_ss, numpy.nan)
+
+        results = {name: numpy.empty(simulated.shape[:-1]) for name in metrics}
+        weights = mask.astype(float)
+        for start in range(0, len(simulated), CHUNK_RUNS):
+            block = simulated[start:start + CHUNK_RUNS]
+            simulated_mean = numpy.einsum('...t,...t->...', block, weights) / count
+            # One temporary per chunk: the simulated deviations, zero where there is no observation
+            deviation = block - simulated_mean[..., None]
+            deviation *= weights
+            simulated_ss = numpy.einsum('...t,...t->...', deviation, deviation)
+            cross = numpy.einsum('...t,...t->...', deviation, observed_deviation)
+            # Sum of squared errors from the sums above, since the deviations add up to zero
+            bias = simulated_mean - observed_mean
+            sse = simulated_ss + observed_ss - 2 * cross + count * bias ** 2
+
+            r = cross / numpy.sqrt(simulated_ss * observed_ss)
+            chunk = {
+                'NSE': lambda: 1 - sse / observed_ss,
+                'KGE': lambda: 1 - numpy.sqrt((r - 1) ** 2 + (numpy.sqrt(simulated_ss / observed_ss) - 1) ** 2
+                                              + (simulated_mean / observed_mean - 1) ** 2),
+                'PBIAS': lambda: -100 * bias / observed_mean,
+                'R2': lambda: r ** 2,
+                'RSR': lambda: numpy.sqrt(sse / observed_ss),
+            }
+            for name in metrics:
+                results[name][start:start + CHUNK_RUNS] = chunk[name]()
+    return results
+
+
+def nse(simulated, observed, warmup=0):
+    """ Nash-Sutcliffe efficiency, see evaluate """
+    return evaluate(simulated, observed, warmup, ['NSE'])['NSE']
+
+
+def kge(simulated, observed, warmup=0):
+    """ Kling-Gupta efficiency (2009), see evaluate """
+    return evaluate(simulated, observed, warmup, ['KGE'])['KGE']
+
+
+def pbias(simulated, observed, warmup=0):
+    """ Percent bias, positive when the model underestimates, see evaluate """
+    return evaluate(simulated, observed, warmup, ['PBIAS'])['PBIAS']
+
+
+def r2(simulated, observed, warmup=0):
+    """ Coefficient of determination, the square of the Pearson correlation, see evaluate """
+    return evaluate(simulated, observed, warmup, ['R2'])['R2']
+
+
+def rsr(simulated, observed, warmup=0):
+    """ RMSE divided by the standard deviation of the observations, see evaluate """
+    return evaluate(simulated, observed, warmup, ['RSR'])['RSR']
@@ -1,7 +1,9 @@
 import inspect
 from abc import ABC, abstractmethod
 from typing import Tuple
-import pandas as pd
+from swatpython.lazyimport import LazyModule
+
+pd = LazyModule('pandas')
 
 
 class ModuleInterface(ABC):
@@ -28,20 +30,30 @@ class ModuleInterface(ABC):
         pass
 
     @abstractmethod
-    def run(self, path):
+    def run(self, path, output='console', usage=None):
         """
-        runs the swat program inside path
+        runs the swat program inside path and waits until it finishes
         :param path: where to run swat
+        :param output: what is done with the swat output: 'console', 'discard', path of a log
+        file, OutputHandler or list of OutputHandler (see swatpython.execution)
+        :param usage: optional dictionary, filled with the resources used by the process
         :return: return code
         """
         pass
 
+    def get_executable(self) -> str:
+        """
+        path of the swat executable used by the module
+        """
+        self._not_implemented_error()
+
     @abstractmethod
     def async_run(self, path):
         """
         runs swat in async mode
         :param path:
-        :return: the process object
+        :return: the process object. It is stopped with swatpython.execution.kill, which also
+        kills its process group when the process leads one
         """
         pass
 
@@ -53,17 +65,40 @@ class ModuleInterface(ABC):
         """
         self._not_implemented_error()
 
+    def write_file_cio(self, filename, values):
+        """
+        change values of the file.cio, rewriting only the lines that changed
+        :param filename: path to the file to be changed
+        :param values: dictionary with the new values, same keys of read_file_cio
+        :return: list with the keys that were changed
+        """
+        self._not_implemented_error()
+
+    def print_settings(self, outputs=None, print_step=None, skip_years=None, print_hrus=None):
+        """
+        file.cio values that select what swat writes in the output files
+        :param outputs: dictionary {'rch', 'sub' or 'hru': list of variable names}
+        :param print_step: 'daily', 'monthly' or 'yearly'
+        :param skip_years: warm up years without output
+        :param print_hrus: list of hrus printed in output.hru
+        :return: dictionary for write_file_cio
+        """
+        self._not_implemented_error()
+
 
-    def read_precipitation_daily(self, filename: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    def read_precipitation_daily(self, filename: str, dates=False, compact=False) -> Tuple['pd.DataFrame',
+                                                                                          'pd.DataFrame']:
         """
         Reads the pcp files
         Parameters
         ----------
         filename
+        dates : when True, the index is a DatetimeIndex with the date of each line
+        compact : when True, year and day are int32 and the values float32
         """
         self._not_implemented_error()
 
-    def write_precipitation_daily(self, filename: str, info: pd.DataFrame, dataframe: pd.DataFrame) -> None:
+    def write_precipitation_daily(self, filename: str, info: 'pd.DataFrame', dataframe: 'pd.DataFrame') -> None:
         """
         Write to a pcp file
         Parameters
@@ -74,16 +109,19 @@ class ModuleInterface(ABC):
         """
         self._not_implemented_error()
 
-    def read_precipitation_sub_daily(self, filename: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    def read_precipitation_sub_daily(self, filename: str, chunksize: int = None, dates=False,
+                                     compact=False) -> Tuple['pd.DataFrame', 'pd.DataFrame']:
         """
         Reads a sub daily pcp file
         Parameters
         ----------
         filename
+        chunksize : when informed, the data is returned as a generator of dataframes
+        dates, compact : same as read_precipitation_daily
         """
         self._not_implemented_error()
 
-    def write_precipitation_sub_daily(self, filename: str, info: pd.DataFrame, dataframe: pd.DataFrame) -> None:
+    def write_precipitation_sub_daily(self, filename: str, info: 'pd.DataFrame', dataframe: 'pd.DataFrame') -> None:
         """
         Write a sub daily pcp file
         Parameters
@@ -94,13 +132,94 @@ class ModuleInterface(ABC):
         """
         self._not_implemented_error()
 
-    def read_output_rch(self, filename: str) -> pd.DataFrame:
+    def read_output_rch(self, filename: str, columns=None, reaches=None, start=None, end=None,
+                        file_cio=None, dates=False, compact=False) -> 'pd.DataFrame':
         """
-        Reads the file output.rch
+        Reads the file output.rch. Only the requested columns, reaches and dates are parsed.
         Parameters
         ----------
         filename
-        dataframe
+        columns : names of the variables to read
+        reaches : reaches to read
+        start : first date to read
+        end : last date to read
+        file_cio : file.cio values in effect when the file was written, used to compute the dates
+        dates : when True, the index is a DatetimeIndex with the date of each line
+        compact : when True, ids are category/int32 and the values float32
+        """
+        self._not_implemented_error()
+
+    def iter_output_rch(self, filename: str, chunksize: int = 100000, columns=None, reaches=None, start=None,
+                        end=None, file_cio=None, dates=False, compact=False):
+        """
+        Reads the file output.rch in chunks of at most chunksize lines
+        Parameters
+        ----------
+        filename
+        chunksize
+        columns, reaches, start, end, file_cio, dates, compact : same as read_output_rch
+        """
+        self._not_implemented_error()
+
+    def follow_output_rch(self, filename: str, columns=None, reaches=None, start=None, end=None, file_cio=None):
+        """
+        Follows the file output.rch while swat writes it, each read returns the new lines
+        Parameters
+        ----------
+        filename
+        columns, reaches, start, end, file_cio : same as read_output_rch
+        """
+        self._not_implemented_error()
+
+    def read_output_sub(self, filename: str, columns=None, subbasins=None, start=None, end=None,
+                        file_cio=None, dates=False) -> 'pd.DataFrame':
+        """
+        Reads the file output.sub
+        Parameters
+        ----------
+        filename
+        columns : names of the variables to read
+        subbasins : subbasins to read
+        start, end, file_cio, dates : same as read_output_rch
+        """
+        self._not_implemented_error()
+
+    def read_output_hru(self, filename: str, columns=None, hrus=None, subbasins=None, start=None, end=None,
+                        file_cio=None, dates=False) -> 'pd.DataFrame':
+        """
+        Reads the file output.hru
+        Parameters
+        ----------
+        filename
+        columns : names of the variables to read
+        hrus : hrus to read
+        subbasins : subbasins to read
+        start, end, file_cio, dates : same as read_output_rch
+        """
+        self._not_implemented_error()
+
+    def iter_output_hru(self, filename: str, chunksize: int = 100000, columns=None, hrus=None, subbasins=None,
+                        start=None, end=None, file_cio=None, dates=False):
+        """
+        Reads the file output.hru in chunks of at most chunksize lines
+        Parameters
+        ----------
+        filename
+        chunksize
+        columns, hrus, subbasins, start, end, file_cio, dates : same as read_output_hru
+        """
+        self._not_implemented_error()
+
+    def read_output_rsv(self, filename: str, columns=None, reservoirs=None, start=None, end=None,
+                        file_cio=None, dates=False) -> 'pd.DataFrame':
+        """
+        Reads the file output.rsv
+        Parameters
+        ----------
+        filename
+        columns : names of the variables to read
+        reservoirs : reservoirs to read
+        start, end, file_cio, dates : same as read_output_rch
         """
         self._not_implemented_error()
 
@@ -0,0 +1,148 @@
+import time
+import logging
+from swatpython.execution import kill
+from swatpython.lazyimport import LazyModule
+
+numpy = LazyModule('numpy')
+pd = LazyModule('pandas')
+metrics = LazyModule('swatpython.metrics')
+
+logger = logging.getLogger(__name__)
+
+# Time in seconds between reads of the output while SWAT runs
+MONITOR_INTERVAL = 1.0
+
+
+class OutputMonitor(object):
+    """
+    Follows an output file while SWAT writes it and kills the run when a predicate says it is
+    hopeless, like a calibration run that is already far from the observations after the
+    first years. Only the new lines are parsed at each check (see fixedwidth.Follower).
+
+    Attributes
+    ----------
+    stopped : bool
+        True when the run was killed by the predicate
+    return_code : int
+        return code of SWAT, after watch
+    """
+
+    def __init__(self, follower, predicate):
+        """
+        Parameters
+        ----------
+        follower : Follower
+            reader of the output, like the one returned by follow_output_rch of the module
+        predicate : callable
+            receives the DataFrame with all the lines read so far and returns True to stop
+            the run. See nse_below and pbias_beyond
+        """
+        self.follower = follower
+        self.predicate = predicate
+        self.stopped = False
+        self.return_code = None
+        self._frames = []
+        self._data = None
+
+    @property
+    def data(self) -> 'pd.DataFrame':
+        """ Lines of the output read so far """
+        if self._data is None:
+            if not self._frames:
+                return pd.DataFrame()
+            self._data = pd.concat(self._frames) if len(self._frames) > 1 else self._frames[0]
+            self._frames = [self._data]
+        return self._data
+
+    def check(self) -> bool:
+        """ Reads the new lines and returns the predicate, False when there are no new lines """
+        rows = self.follower.rows
+        frame = self.follower.read()
+        if self.follower.rows < rows + len(frame):
+            # The file was replaced, it is read again from the start
+            self._frames = []
+        if len(frame) == 0:
+            return False
+        self._frames.append(frame)
+        self._data = None
+        return bool(self.predicate(self.data))
+
+    def watch(self, process, interval=MONITOR_INTERVAL):
+        """
+        Checks the output until the process finishes, killing it when the predicate is True.
+        The process and its process group are gone when watch returns (see execution.kill)
+
+        Parameters
+        ----------
+        process : subprocess.Popen
+            running SWAT, like SWAT.async_process
+        interval : float
+            time in seconds between checks
+
+        Returns
+        -------
+        return code of the process
+        """
+        while process.poll() is None:
+            if self.check():
+                logger.debug("Stopping hopeless SWAT run after " + str(len(self.data)) + " output lines")
+                kill(process)
+                self.stopped = True
+                break
+            time.sleep(interval)
+        self.return_code = process.wait()
+        if not self.stopped:
+            # Lines written after the last check
+            self.check()
+        return self.return_code
+
+
+def nse_below(observed, threshold, column='FLOW_OUTcms', reach=1, minimum=365, warmup=0):
+    """
+    Predicate for OutputMonitor: True when the Nash-Sutcliffe efficiency of the series
+    simulated so far, against the same steps of the observed series, is below threshold.
+    The output must have one line per time step for the reach, like a daily output.rch
+
+    Parameters
+    ----------
+    observed : array
+        observed series, from the first printed step. Missing values are NaN
+    threshold : float
+        NSE that stops the run
+    column : str
+        column of the output
+    reach : int
+        reach compared
+    minimum : int
+        steps simulated before the first evaluation, after the warmup
+    warmup : int
+        steps ignored at the start of the series
+    """
+    observed = numpy.asarray(observed, dtype=float)
+
+    def predicate(data):
+        simulated = _series(data, column, reach)[:len(observed)]
+        if len(simulated) - warmup < minimum:
+            return False
+        return metrics.nse(simulated[None], observed[:len(simulated)], warmup)[0] < threshold
+    return predicate
+
+
+def pbias_beyond(observed, limit, column='FLOW_OUTcms', reach=1, minimum=365, warmup=0):
+    """
+    Predicate for OutputMonitor: True when the absolute percent bias (volume balance error)
+    of the series simulated so far is larger than limit. The other parameters are the same
+    of nse_below
+    """
+    observed = numpy.asarray(observed, dtype=float)
+
+    def predicate(data):
+        simulated = _series(data, column, reach)[:len(observed)]
+        if len(simulated) - warmup < minimum:
+            return False
+        return abs(metrics.pbias(simulated[None], observed[:len(simulated)], warmup)[0]) > limit
+    return predicate
+
+
+def _series(data, column, reach):
+    return data[column].to_numpy(dtype=float)[data['RCH'].to_numpy() == reach]
@@ -0,0 +1,138 @@
+import os
+import glob
+import pickle
+import hashlib
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+CACHE_EXTENSION = '.pkl'
+
+
+class OutputCache(object):
+    """
+    Disk cache of parsed SWAT files.
+
+    Each entry stores the object returned by a reader (DataFrames or tuples of DataFrames)
+    in pickle binary format, which loads much faster than parsing the text file again.
+    Entries are keyed by the file path, the reader and its arguments, and by the file size
+    and modification time, so an entry is never used after SWAT rewrites the file. When the
+    cache grows over max_size bytes, the least recently used entries are removed.
+    """
+
+    def __init__(self, directory, max_size=1024 ** 3):
+        """
+        Parameters
+        ----------
+        directory : str
+            folder where the entries are stored. It is created if it does not exist
+        max_size : int
+            maximum size of the cache in bytes
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, filename, reader, arguments, function):
+        """
+        Returns the cached result of reading filename, calling function to read it when
+        there is no valid entry
+
+        Parameters
+        ----------
+        filename : str
+            path of the file read
+        reader : str
+            name of the reader, part of the key
+        arguments : dict
+            arguments of the reader, part of the key. Their repr must identify them
+        function : callable
+            reads the file when the entry is missing, without arguments
+
+        Returns
+        -------
+        the result of function
+        """
+        source, fingerprint = self._key(filename, reader, arguments)
+        path = self._entry_path(source, fingerprint)
+        try:
+            with open(path, 'rb') as fo:
+                result = pickle.load(fo)
+            # Modification time of the entry is used as last access for eviction
+            os.utime(path)
+            self.hits += 1
+            logger.debug("Cache hit: " + filename)
+            return result
+        except (OSError, EOFError, pickle.UnpicklingError):
+            pass
+        self.misses += 1
+        logger.debug("Cache miss: " + filename)
+        self._remove_stale(source)
+        result = function()
+        self._store(path, result)
+        self.evict()
+        return result
+
+    def evict(self):
+        """ Removes the least recently used entries until the cache fits in max_size """
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(CACHE_EXTENSION):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        """ Removes all entries """
+        for path in glob.glob(os.path.join(self.directory, '*' + CACHE_EXTENSION)):
+            self._remove(path)
+
+    def _key(self, filename, reader, arguments):
+        """
+        Key of an entry: source identifies the file, reader and arguments, and fingerprint
+        identifies the contents of the file
+        """
+        filename = os.path.abspath(filename)
+        stat = os.stat(filename)
+        source = hashlib.sha1(repr((filename, reader, sorted(arguments.items()))).encode()).hexdigest()
+        fingerprint = hashlib.sha1(repr((stat.st_size, stat.st_mtime_ns)).encode()).hexdigest()
+        return source, fingerprint
+
+    def _entry_path(self, source, fingerprint):
+        return os.path.join(self.directory, source + '-' + fingerprint[:16] + CACHE_EXTENSION)
+
+    def _remove_stale(self, source):
+        """ Removes entries of previous versions of the file """
+        for path in glob.glob(os.path.join(self.directory, source + '-*' + CACHE_EXTENSION)):
+            self._remove(path)
+
+    def _store(self, path, result):
+        # Written to a temporary file first, so other processes never read a partial entry
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as fo:
+                pickle.dump(result, fo, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, path)
+        except Exception:
+            self._remove(temporary)
+            raise
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,155 @@
+from swatpython.lazyimport import LazyModule
+
+numpy = LazyModule('numpy')
+
+# Values of IPRINT in file.cio
+PRINT_MONTHLY = 0
+PRINT_DAILY = 1
+PRINT_YEARLY = 2
+
+
+def first_print_year(file_cio) -> int:
+    """
+    First year printed in the output files: the first simulated year plus the skipped years
+
+    Parameters
+    ----------
+    file_cio : dictionary returned by read_file_cio
+    """
+    return file_cio['IYR'] + file_cio['NYSKIP']
+
+
+class OutputCalendar(object):
+    """
+    Computes the date of each line of an output file (output.rch, output.sub, ...) from its
+    MON column. All lines are processed at once, there is no loop over the lines. The
+    calendar keeps the current year between calls, so a file can be processed in chunks.
+
+    SWAT writes in the MON column the day of the year for daily printouts, the month for
+    monthly printouts and the year for yearly printouts. Monthly printouts also have yearly
+    totals, with the year in MON, and all printouts end with the average of the simulation,
+    with the number of years, as a decimal number, in MON. Those summary lines get NaT.
+    """
+
+    def __init__(self, iprint, first_year):
+        """
+        Parameters
+        ----------
+        iprint : int
+            IPRINT of file.cio: 0 monthly, 1 daily, 2 yearly
+        first_year : int
+            first printed year, see first_print_year
+        """
+        if iprint not in (PRINT_MONTHLY, PRINT_DAILY, PRINT_YEARLY):
+            raise ValueError("Dates are not available for IPRINT = " + str(iprint))
+        self.iprint = iprint
+        self.year = first_year
+        self.last_step = None
+
+    def dates(self, mon, summary):
+        """
+        Parameters
+        ----------
+        mon : numpy int array
+            values of the MON column
+        summary : numpy bool array
+            True for the lines with a decimal number in MON (averages of the simulation)
+
+        Returns
+        -------
+        numpy datetime64[D] array. Daily lines get the day, monthly lines the first day of the
+        month and yearly lines the first day of the year
+        """
+        mon = numpy.asarray(mon).astype(numpy.int64)
+        dates = numpy.full(len(mon), numpy.datetime64('NaT'), dtype='datetime64[D]')
+        if self.iprint == PRINT_YEARLY:
+            valid = ~summary
+            dates[valid] = _years(mon[valid]).astype('datetime64[D]')
+            return dates
+        if self.iprint == PRINT_MONTHLY:
+            valid = ~summary & (mon <= 12)
+        else:
+            valid = ~summary
+
+        steps = mon[valid]
+        if len(steps) == 0:
+            return dates
+        previous = steps[0] if self.last_step is None else self.last_step
+        # A new year starts when the day (or month) goes back
+        years = self.year + numpy.cumsum(numpy.diff(numpy.concatenate([[previous], steps])) < 0)
+        self.year = int(years[-1])
+        self.last_step = steps[-1]
+        if self.iprint == PRINT_MONTHLY:
+            months = (years - 1970) * 12 + (steps - 1)
+            dates[valid] = months.astype('datetime64[M]').astype('datetime64[D]')
+        else:
+            dates[valid] = _years(years).astype('datetime64[D]') + (steps - 1)
+        return dates
+
+
+def output_dates(mon, summary, iprint, first_year):
+    """
+    Dates of the lines of a whole output file. See OutputCalendar
+
+    Parameters
+    ----------
+    mon : numpy int array
+        values of the MON column
+    summary : numpy bool array
+        True for the lines with a decimal number in MON
+    iprint : int
+        IPRINT of file.cio: 0 monthly, 1 daily, 2 yearly
+    first_year : int
+        first printed year, see first_print_year
+
+    Returns
+    -------
+    numpy datetime64[D] array
+    """
+    return OutputCalendar(iprint, first_year).dates(mon, summary)
+
+
+def julian_dates(years, days, hours=None, minutes=None):
+    """
+    Dates from the year and the day of the year of each line, like the lines of the
+    precipitation and temperature files
+
+    Parameters
+    ----------
+    years : numpy int array
+    days : numpy int array
+        day of the year, 1 to 366
+    hours : numpy int array, optional
+    minutes : numpy int array, optional
+
+    Returns
+    -------
+    numpy datetime64[D] array, or datetime64[m] with hours and minutes
+    """
+    dates = _years(years).astype('datetime64[D]') + (numpy.asarray(days) - 1)
+    if hours is None:
+        return dates
+    minutes = 0 if minutes is None else numpy.asarray(minutes)
+    return dates.astype('datetime64[m]') + (numpy.asarray(hours) * 60 + minutes)
+
+
+def date_mask(dates, start=None, end=None):
+    """
+    Boolean array with the dates inside the closed interval [start, end]. NaT is never inside.
+
+    Parameters
+    ----------
+    dates : numpy datetime64 array
+    start : date, str or datetime64, optional
+    end : date, str or datetime64, optional
+    """
+    mask = ~numpy.isnat(dates)
+    if start is not None:
+        mask &= dates >= numpy.datetime64(start, 'D')
+    if end is not None:
+        mask &= dates <= numpy.datetime64(end, 'D')
+    return mask
+
+
+def _years(years):
+    return (numpy.asarray(years) - 1970).astype('datetime64[Y]')
@@ -0,0 +1,87 @@
+# Variables of the output files of SWAT2012, in the order of the print codes of file.cio
+# (IPDVAR for output.rch, IPDVAB for output.sub and IPDVAS for output.hru). Each variable has
+# its name and the name in the header of the output file, with the units.
+
+SWAT2012_RCH_VARIABLES = [
+    ('FLOW_IN', 'FLOW_INcms'), ('FLOW_OUT', 'FLOW_OUTcms'), ('EVAP', 'EVAPcms'), ('TLOSS', 'TLOSScms'),
+    ('SED_IN', 'SED_INtons'), ('SED_OUT', 'SED_OUTtons'), ('SEDCONC', 'SEDCONCmg/kg'),
+    ('ORGN_IN', 'ORGN_INkg'), ('ORGN_OUT', 'ORGN_OUTkg'), ('ORGP_IN', 'ORGP_INkg'), ('ORGP_OUT', 'ORGP_OUTkg'),
+    ('NO3_IN', 'NO3_INkg'), ('NO3_OUT', 'NO3_OUTkg'), ('NH4_IN', 'NH4_INkg'), ('NH4_OUT', 'NH4_OUTkg'),
+    ('NO2_IN', 'NO2_INkg'), ('NO2_OUT', 'NO2_OUTkg'), ('MINP_IN', 'MINP_INkg'), ('MINP_OUT', 'MINP_OUTkg'),
+    ('CHLA_IN', 'CHLA_INkg'), ('CHLA_OUT', 'CHLA_OUTkg'), ('CBOD_IN', 'CBOD_INkg'), ('CBOD_OUT', 'CBOD_OUTkg'),
+    ('DISOX_IN', 'DISOX_INkg'), ('DISOX_OUT', 'DISOX_OUTkg'), ('SOLPST_IN', 'SOLPST_INmg'),
+    ('SOLPST_OUT', 'SOLPST_OUTmg'), ('SORPST_IN', 'SORPST_INmg'), ('SORPST_OUT', 'SORPST_OUTmg'),
+    ('REACTPST', 'REACTPSTmg'), ('VOLPST', 'VOLPSTmg'), ('SETTLPST', 'SETTLPSTmg'), ('RESUSP_PST', 'RESUSP_PSTmg'),
+    ('DIFFUSEPST', 'DIFFUSEPSTmg'), ('REACBEDPST', 'REACBEDPSTmg'), ('BURYPST', 'BURYPSTmg'),
+    ('BED_PST', 'BED_PSTmg'), ('BACTP_OUT', 'BACTP_OUTct'), ('BACTLP_OUT', 'BACTLP_OUTct'),
+    ('CMETAL#1', 'CMETAL#1kg'), ('CMETAL#2', 'CMETAL#2kg'), ('CMETAL#3', 'CMETAL#3kg'), ('TOT N', 'TOT Nkg'),
+    ('TOT P', 'TOT Pkg'), ('NO3CONC', 'NO3ConcMg/l'), ('WTMP', 'WTMPdegc'),
+]
+
+SWAT2012_SUB_VARIABLES = [
+    ('PRECIP', 'PRECIPmm'), ('SNOMELT', 'SNOMELTmm'), ('PET', 'PETmm'), ('ET', 'ETmm'), ('SW', 'SWmm'),
+    ('PERC', 'PERCmm'), ('SURQ', 'SURQmm'), ('GW_Q', 'GW_Qmm'), ('WYLD', 'WYLDmm'), ('SYLD', 'SYLDt/ha'),
+    ('ORGN', 'ORGNkg/ha'), ('ORGP', 'ORGPkg/ha'), ('NSURQ', 'NSURQkg/ha'), ('SOLP', 'SOLPkg/ha'),
+    ('SEDP', 'SEDPkg/ha'), ('LAT Q', 'LAT Q(mm)'), ('LATNO3', 'LATNO3kg/h'), ('GWNO3', 'GWNO3kg/ha'),
+    ('CHOLA', 'CHOLAmic/L'), ('CBODU', 'CBODU mg/L'), ('DOXQ', 'DOXQ mg/L'), ('TNO3', 'TNO3kg/ha'),
+    ('QTILE', 'QTILEmm'), ('TVAP', 'TVAPkg/ha'),
+]
+
+SWAT2012_HRU_VARIABLES = [
+    ('PRECIP', 'PRECIPmm'), ('SNOFALL', 'SNOFALLmm'), ('SNOMELT', 'SNOMELTmm'), ('IRR', 'IRRmm'),
+    ('PET', 'PETmm'), ('ET', 'ETmm'), ('SW_INIT', 'SW_INITmm'), ('SW_END', 'SW_ENDmm'), ('PERC', 'PERCmm'),
+    ('GW_RCHG', 'GW_RCHGmm'), ('DA_RCHG', 'DA_RCHGmm'), ('REVAP', 'REVAPmm'), ('SA_IRR', 'SA_IRRmm'),
+    ('DA_IRR', 'DA_IRRmm'), ('SA_ST', 'SA_STmm'), ('DA_ST', 'DA_STmm'), ('SURQ_GEN', 'SURQ_GENmm'),
+    ('SURQ_CNT', 'SURQ_CNTmm'), ('TLOSS', 'TLOSSmm'), ('LATQGEN', 'LATQGENmm'), ('GW_Q', 'GW_Qmm'),
+    ('WYLD', 'WYLDmm'), ('DAILYCN', 'DAILYCN'), ('TMP_AV', 'TMP_AVdgC'), ('TMP_MX', 'TMP_MXdgC'),
+    ('TMP_MN', 'TMP_MNdgC'), ('SOL_TMP', 'SOL_TMPdgC'), ('SOLAR', 'SOLARMJ/m2'), ('SYLD', 'SYLDt/ha'),
+    ('USLE', 'USLEt/ha'), ('N_APP', 'N_APPkg/ha'), ('P_APP', 'P_APPkg/ha'), ('NAUTO', 'NAUTOkg/ha'),
+    ('PAUTO', 'PAUTOkg/ha'), ('NGRZ', 'NGRZkg/ha'), ('PGRZ', 'PGRZkg/ha'), ('NCFRT', 'NCFRTkg/ha'),
+    ('PCFRT', 'PCFRTkg/ha'), ('NRAIN', 'NRAINkg/ha'), ('NFIX', 'NFIXkg/ha'), ('F-MN', 'F-MNkg/ha'),
+    ('A-MN', 'A-MNkg/ha'), ('A-SN', 'A-SNkg/ha'), ('F-MP', 'F-MPkg/ha'), ('AO-LP', 'AO-LPkg/ha'),
+    ('L-AP', 'L-APkg/ha'), ('A-SP', 'A-SPkg/ha'), ('DNIT', 'DNITkg/ha'), ('NUP', 'NUPkg/ha'),
+    ('PUP', 'PUPkg/ha'), ('ORGN', 'ORGNkg/ha'), ('ORGP', 'ORGPkg/ha'), ('SEDP', 'SEDPkg/ha'),
+    ('NSURQ', 'NSURQkg/ha'), ('NLATQ', 'NLATQkg/ha'), ('NO3L', 'NO3Lkg/ha'), ('NO3GW', 'NO3GWkg/ha'),
+    ('SOLP', 'SOLPkg/ha'), ('P_GW', 'P_GWkg/ha'), ('W_STRS', 'W_STRS'), ('TMP_STRS', 'TMP_STRS'),
+    ('N_STRS', 'N_STRS'), ('P_STRS', 'P_STRS'), ('BIOM', 'BIOMt/ha'), ('LAI', 'LAI'), ('YLD', 'YLDt/ha'),
+    ('BACTP', 'BACTPct'), ('BACTLP', 'BACTLPct'), ('WTAB CLI', 'WTAB CLIm'), ('WTAB SOL', 'WTAB SOLm'),
+    ('SNO', 'SNOmm'), ('CMUP', 'CMUPkg/ha'), ('CMTOT', 'CMTOTkg/ha'), ('QTILE', 'QTILEmm'),
+    ('TNO3', 'TNO3kg/ha'), ('LNO3', 'LNO3kg/ha'), ('GW_Q_D', 'GW_Q_Dmm'), ('LATQCNT', 'LATQCNTmm'),
+    ('TVAP', 'TVAPkg/ha'),
+]
+
+# Values of IPRINT in file.cio
+PRINT_STEPS = {'monthly': 0, 'daily': 1, 'yearly': 2}
+
+# Number of print codes of each list of file.cio
+PRINT_CODE_COUNT = {'IPDVAR': 20, 'IPDVAB': 15, 'IPDVAS': 20, 'IPDHRU': 20}
+
+
+def print_codes(variables, names, count=20):
+    """
+    Print codes of file.cio of the variables
+
+    Parameters
+    ----------
+    variables : list of (str, str)
+        variables of the output file, like SWAT2012_RCH_VARIABLES
+    names : list of str
+        names of the variables, with or without units (ex: 'FLOW_OUT' or 'FLOW_OUTcms')
+    count : int
+        maximum number of variables, see PRINT_CODE_COUNT
+
+    Returns
+    -------
+    list of int with count codes, in the order of the file and zero in the free fields
+    """
+    codes = {}
+    for code, (name, header) in enumerate(variables):
+        codes[name.upper()] = code + 1
+        codes[header.upper()] = code + 1
+    unknown = [name for name in names if name.upper() not in codes]
+    if unknown:
+        raise ValueError("Unknown output variables: " + ", ".join(unknown))
+    selected = sorted(set(codes[name.upper()] for name in names))
+    if len(selected) > count:
+        raise ValueError("At most " + str(count) + " output variables can be selected")
+    return selected + [0] * (count - len(selected))
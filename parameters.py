@@ -0,0 +1,483 @@
+import os
+import re
+import stat
+import fnmatch
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from swatpython.workspace import OUTPUT_PATTERNS
+
+logger = logging.getLogger(__name__)
+
+# Values, with the same separators used by the other readers
+TOKEN = re.compile(r"[^\s\,!?;'\"]+")
+# Parameter name after the | of a line, like "      0.0500    | OV_N : Manning's n ..."
+FIELD_NAME = re.compile(r"\|\s*([A-Za-z][A-Za-z0-9_]*)")
+# Filters in the title line of HRU files, like "Subbasin:1 HRU:1 Luse:AGRL Soil: 1234 Slope: 0-9999"
+TITLE = re.compile(r"(Subbasin|Luse|Soil|Slope)\s*:\s*(\S+)")
+# Parameter and file extension of a SUFI-2 name, like SOL_AWC(1-2).sol
+PARAMETER = re.compile(r"^(\w+?)(?:\(([\d,\- ]*)\))?\.(\w+)$")
+FIELD = re.compile(r"^(\w+?)(?:\(([\d,\- ]*)\))?$")
+
+# v__ replaces the value, r__ multiplies it by (1 + change) and a__ adds the change
+METHODS = ('v', 'r', 'a')
+
+# Lines (starting at 0) of the values of .sol files
+SOL_VALUES = {'SOL_ZMX': 3, 'ANION_EXCL': 4, 'SOL_CRK': 5}
+SOL_LAYERS = {'SOL_Z': 7, 'SOL_BD': 8, 'SOL_AWC': 9, 'SOL_K': 10, 'SOL_CBN': 11, 'CLAY': 12, 'SILT': 13,
+              'SAND': 14, 'ROCK': 15, 'SOL_ALB': 16, 'USLE_K': 17, 'SOL_EC': 18, 'SOL_CAL': 19, 'SOL_PH': 20}
+SOL_HYDROLOGIC_GROUP = 2
+SOL_TEXTURE = 6
+# Layers are read by SWAT with format (27x,15f12.2)
+SOL_FIRST_COLUMN = 27
+SOL_LAYER_WIDTH = 12
+
+# Free format values are written with at least this number of decimals, so small relative
+# changes are not lost by rounding
+MINIMUM_DECIMALS = 4
+
+
+class ParameterChange(object):
+    """
+    One parameter of a parameter set, with the SUFI-2 name syntax:
+
+        x__<parameter>.<extension>__<hydrogrp>__<soltext>__<landuse>__<subbasin>__<slope>
+
+    where x is v (replace), r (relative) or a (absolute change). The filters are optional and
+    accept lists separated by commas, subbasins also accept ranges like 1-10. Layers of .sol
+    parameters are selected with SOL_AWC(1) or SOL_AWC(1-3), all layers are changed otherwise.
+    """
+
+    def __init__(self, name, value):
+        """
+        Parameters
+        ----------
+        name : str
+            SUFI-2 name, like r__CN2.mgt or v__ALPHA_BF.gw____FRST
+        value : float
+            new value, relative change or absolute change
+        """
+        parts = name.split('__')
+        if len(parts) < 2 or len(parts) > 7 or parts[0].lower() not in METHODS:
+            raise ValueError("Invalid parameter name: " + name)
+        match = PARAMETER.match(parts[1].strip())
+        if match is None:
+            raise ValueError("Invalid parameter name: " + name)
+        self.name = name
+        self.method = parts[0].lower()
+        self.field = match.group(1).upper()
+        self.layers = _numbers(match.group(2))
+        self.extension = match.group(3).lower()
+        self.value = float(value)
+        if self.layers is not None and self.extension != 'sol':
+            raise ValueError("Layers are only valid for .sol parameters: " + name)
+        filters = parts[2:] + [''] * (7 - len(parts))
+        self.hydrogrp = _texts(filters[0])
+        self.soltext = _texts(filters[1])
+        self.landuse = _texts(filters[2])
+        self.subbasins = _numbers(filters[3])
+        self.slope = _texts(filters[4])
+
+    def new_value(self, value):
+        """ Value after the change, value is the value of the original file """
+        if self.method == 'v':
+            return self.value
+        if self.method == 'r':
+            return value * (1 + self.value)
+        return value + self.value
+
+
+class InputFile(object):
+    """
+    Lines of a SWAT input file and the position of its values. The positions are found once
+    and then any number of parameter sets are rendered from the original lines.
+    """
+
+    def __init__(self, name, lines):
+        self.name = name
+        self.extension = os.path.splitext(name)[1][1:].lower()
+        self.lines = lines
+        self.info = dict(TITLE.findall(lines[0])) if lines else {}
+        self._fields = {}
+        self._offsets = None
+
+    def fields(self, field, layers=None, template=None):
+        """
+        Positions of the values of a parameter, a list of tuples
+        (line, first column, last column, decimals, value). .sol parameters have one tuple
+        for each layer. Returns an empty list if the file does not have the parameter
+
+        Parameters
+        ----------
+        field : str
+            parameter name
+        layers : set of int, optional
+            layers of .sol parameters, starting at 1
+        template : dict, optional
+            line of each parameter in other files with the same extension, shared by them
+            so the lines are usually not searched
+        """
+        if field not in self._fields:
+            if self.extension == 'sol':
+                self._fields[field] = self._sol_fields(field)
+            else:
+                self._fields[field] = self._named_fields(field, template)
+        fields = self._fields[field]
+        if layers is None:
+            return [position for layer, position in fields]
+        return [position for layer, position in fields if layer in layers]
+
+    def render(self, values):
+        """
+        New text of the lines with changed values, a dict with the line numbers as keys
+
+        Parameters
+        ----------
+        values : dict
+            new value of each position returned by fields
+        """
+        lines = {}
+        # Right to left, so the columns of the other values of the line are still valid
+        for position in sorted(values, key=lambda p: (p[0], -p[1])):
+            number, first, last, decimals, value = position
+            line = lines.get(number, self.lines[number])
+            text = _format(values[position], decimals, last - first)
+            lines[number] = line[:first] + text.rjust(last - first) + line[last:]
+        return lines
+
+    def text(self, lines):
+        """ Text of the file with the lines returned by render """
+        return ''.join([lines.get(i, line) for i, line in enumerate(self.lines)])
+
+    def offsets(self):
+        """ Position in the file of the start of each line """
+        if self._offsets is None:
+            self._offsets = [0]
+            for line in self.lines:
+                self._offsets.append(self._offsets[-1] + len(line))
+        return self._offsets
+
+    def update(self, lines):
+        """ Changes the original lines, after the file was changed permanently """
+        self.lines = [lines.get(i, line) for i, line in enumerate(self.lines)]
+        self._fields = {}
+        self._offsets = None
+
+    def _named_fields(self, field, template):
+        number = None if template is None else template.get(field)
+        if number is None or number >= len(self.lines) or not self._is_named(self.lines[number], field):
+            number = None
+            for i, line in enumerate(self.lines):
+                if self._is_named(line, field):
+                    number = i
+                    break
+            if number is None:
+                return []
+            if template is not None:
+                template[field] = number
+        line = self.lines[number]
+        position = _position(number, line, 0, line.index('|'), MINIMUM_DECIMALS)
+        return [] if position is None else [(None, position)]
+
+    @staticmethod
+    def _is_named(line, field):
+        if '|' not in line:
+            return False
+        match = FIELD_NAME.search(line)
+        return match is not None and match.group(1).upper() == field
+
+    def _sol_fields(self, field):
+        if field in SOL_VALUES:
+            number = SOL_VALUES[field]
+            if number >= len(self.lines):
+                return []
+            line = self.lines[number]
+            # Fixed format fields, the decimals of the file are kept
+            position = _position(number, line, line.find(':') + 1, len(line.rstrip('\r\n')), None)
+            return [] if position is None else [(None, position)]
+        if field not in SOL_LAYERS:
+            return []
+        number = SOL_LAYERS[field]
+        if number >= len(self.lines):
+            return []
+        line = self.lines[number]
+        end = len(line.rstrip('\r\n'))
+        fields = []
+        for layer, first in enumerate(range(SOL_FIRST_COLUMN, end, SOL_LAYER_WIDTH)):
+            position = _position(number, line, first, min(first + SOL_LAYER_WIDTH, end), MINIMUM_DECIMALS)
+            if position is not None:
+                fields.append((layer + 1, position))
+        return fields
+
+
+class ParameterEngine(object):
+    """
+    Applies parameter sets to the input files of a SWAT project (.hru, .gw, .mgt, .sol, .rte,
+    .bsn and any other file with "value | NAME" lines).
+
+    The files of each extension are read once, when a parameter of the extension is first
+    used, and the position of each value is kept. Relative and absolute changes are always
+    computed from the values of the files when they were read, so applying a parameter set
+    gives the same files no matter which sets were applied before. Files changed by the
+    previous set and not by the current one are restored.
+
+    Only the lines with new values are written, in place, when their length does not change.
+    Files linked to other folders (hardlinks or symlinks of workspaces) are replaced instead,
+    so the other folders are never changed.
+    """
+
+    def __init__(self, project_folder, workers=None):
+        """
+        Parameters
+        ----------
+        project_folder : str
+            project folder (TxtInOut) with the original input files
+        workers : int, optional
+            number of threads used to read and write the files (default is one thread)
+        """
+        self.project_folder = os.path.abspath(project_folder)
+        self.workers = workers
+        self.files = {}
+        self.templates = {}
+        self.written = {}
+        self._soils = {}
+
+    def index(self, extension):
+        """ Input files with the extension, read the first time they are needed """
+        extension = extension.lower()
+        if extension not in self.files:
+            names = [entry.name for entry in os.scandir(self.project_folder)
+                     if entry.is_file() and entry.name.lower().endswith('.' + extension)
+                     and not any(fnmatch.fnmatch(entry.name.lower(), p) for p in OUTPUT_PATTERNS)]
+            self.files[extension] = dict(zip(names, self._map(self._load, names)))
+            self.templates[extension] = {}
+            logger.debug("Indexed " + str(len(names)) + " ." + extension + " files")
+        return self.files[extension]
+
+    def apply(self, parameters, folder=None, workers=None):
+        """
+        Writes the input files with the parameter set
+
+        Parameters
+        ----------
+        parameters : dict or list of (str, float)
+            SUFI-2 parameter names and values, see ParameterChange. Parameters are applied in
+            order, so a later parameter changes the result of an earlier one in the same file
+        folder : str, optional
+            folder where the files are written, like a workspace of the project (default is
+            the project folder). Its files must be the original files or written by this engine
+        workers : int, optional
+            number of threads, overrides the engine default
+
+        Returns
+        -------
+        number of files written
+        """
+        items = parameters.items() if isinstance(parameters, dict) else parameters
+        changes = [ParameterChange(name, value) for name, value in items]
+        folder = self.project_folder if folder is None else os.path.abspath(folder)
+        patched = {}
+        for change in changes:
+            files = self.index(change.extension)
+            template = self.templates[change.extension]
+            found = False
+            for name, input_file in files.items():
+                if not self._matches(change, input_file):
+                    continue
+                positions = input_file.fields(change.field, change.layers, template)
+                if not positions:
+                    continue
+                found = True
+                values = patched.setdefault(name, {})
+                for position in positions:
+                    values[position] = change.new_value(values.get(position, position[4]))
+            if not found:
+                raise ValueError("Parameter not found in the ." + change.extension + " files: " + change.name)
+
+        written = self.written.setdefault(folder, {})
+        # Files of the previous parameter set that are not changed now go back to the original
+        jobs = [(self._file(name), values) for name, values in patched.items()]
+        jobs += [(self._file(name), {}) for name in written if name not in patched]
+        results = self._map(lambda job: self._write(folder, job[0], job[0].render(job[1])), jobs, workers)
+        count = sum(1 for changed in results if changed)
+        logger.debug("Parameter set applied to " + str(count) + " files: " + folder)
+        return count
+
+    def restore(self, folder=None):
+        """ Writes back the original values of all files changed by apply """
+        folder = self.project_folder if folder is None else os.path.abspath(folder)
+        files = [self._file(name) for name in self.written.get(folder, {})]
+        self._map(lambda input_file: self._write(folder, input_file, {}), files)
+        return len(files)
+
+    def write(self, filename, field, value):
+        """
+        Changes permanently a value in one input file of the project, or in all files of an
+        extension. The new value is the original value for the following parameter sets.
+
+        Parameters
+        ----------
+        filename : str
+            file name, like 000010001.mgt, or an extension, like .mgt, for all files
+        field : str
+            parameter name, like CN2 or SOL_AWC(1)
+        value : float
+            new value
+        """
+        match = FIELD.match(field.strip())
+        if match is None:
+            raise ValueError("Invalid parameter name: " + field)
+        field = match.group(1).upper()
+        layers = _numbers(match.group(2))
+        if filename.startswith('.'):
+            files = list(self.index(filename[1:]).values())
+        else:
+            input_file = self.index(os.path.splitext(filename)[1][1:]).get(filename)
+            if input_file is None:
+                raise ValueError("File not found in the project folder: " + filename)
+            files = [input_file]
+        for input_file in files:
+            positions = input_file.fields(field, layers)
+            if not positions:
+                raise ValueError("Parameter " + field + " not found in " + input_file.name)
+            lines = input_file.render({position: value for position in positions})
+            self._write(self.project_folder, input_file, lines)
+            self.written[self.project_folder].pop(input_file.name, None)
+            input_file.update(lines)
+
+    def _file(self, name):
+        return self.files[os.path.splitext(name)[1][1:].lower()][name]
+
+    def _load(self, name):
+        # latin-1 keeps one character for each byte, so lines can be patched at byte offsets
+        with open(os.path.join(self.project_folder, name), 'r', encoding='latin-1', newline='') as fo:
+            return InputFile(name, fo.readlines())
+
+    def _write(self, folder, input_file, lines):
+        """
+        Writes a file in folder, with the lines returned by render changed from the original
+        lines. Returns False when the file already had those lines
+        """
+        written = self.written.setdefault(folder, {})
+        current = written.get(input_file.name, {})
+        original = input_file.lines
+        changed = [i for i in set(current).union(lines) if lines.get(i, original[i]) != current.get(i, original[i])]
+        if changed:
+            path = os.path.join(folder, input_file.name)
+            status = os.lstat(path)
+            same_length = all(len(line) == len(original[i]) for state in (current, lines) for i, line in state.items())
+            if status.st_nlink > 1 or stat.S_ISLNK(status.st_mode):
+                # Linked to the project or to other workspaces, a new file replaces the link
+                temporary = path + '.tmp'
+                with open(temporary, 'w', encoding='latin-1', newline='') as fo:
+                    fo.write(input_file.text(lines))
+                os.replace(temporary, path)
+            elif same_length:
+                # Only the changed lines are written, in place
+                offsets = input_file.offsets()
+                descriptor = os.open(path, os.O_WRONLY | getattr(os, 'O_BINARY', 0))
+                try:
+                    for i in changed:
+                        os.lseek(descriptor, offsets[i], os.SEEK_SET)
+                        os.write(descriptor, lines.get(i, original[i]).encode('latin-1'))
+                finally:
+                    os.close(descriptor)
+            else:
+                with open(path, 'w', encoding='latin-1', newline='') as fo:
+                    fo.write(input_file.text(lines))
+        if lines:
+            written[input_file.name] = lines
+        else:
+            written.pop(input_file.name, None)
+        return len(changed) > 0
+
+    def _map(self, function, items, workers=None):
+        workers = self.workers if workers is None else workers
+        if workers is None or workers <= 1 or len(items) < 2:
+            return [function(item) for item in items]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(function, items))
+
+    def _matches(self, change, input_file):
+        """ Checks the filters of the change. Filters are ignored by files without that information """
+        info = input_file.info
+        if change.subbasins is not None and 'Subbasin' in info:
+            if int(info['Subbasin']) not in change.subbasins:
+                return False
+        if change.landuse is not None and 'Luse' in info:
+            if info['Luse'].upper() not in change.landuse:
+                return False
+        if change.slope is not None and 'Slope' in info:
+            if info['Slope'].upper() not in change.slope:
+                return False
+        if change.hydrogrp is not None or change.soltext is not None:
+            soil = self._soil(input_file.name)
+            if soil is not None:
+                if change.hydrogrp is not None and soil[0] not in change.hydrogrp:
+                    return False
+                if change.soltext is not None and soil[1] not in change.soltext:
+                    return False
+        return True
+
+    def _soil(self, name):
+        """ Hydrologic group and texture of the first layer of the .sol file of an HRU """
+        base = os.path.splitext(name)[0]
+        if base not in self._soils:
+            soil = None
+            path = os.path.join(self.project_folder, base + '.sol')
+            if 'Luse' in self._file(name).info and os.path.isfile(path):
+                with open(path, 'r') as fo:
+                    lines = [fo.readline() for i in range(SOL_TEXTURE + 1)]
+                group = lines[SOL_HYDROLOGIC_GROUP].split(':')[-1].strip().upper()
+                texture = lines[SOL_TEXTURE].split(':')[-1].strip().split('-')[0].upper()
+                soil = (group, texture)
+            self._soils[base] = soil
+        return self._soils[base]
+
+
+def _position(number, line, first, last, minimum_decimals):
+    """ Position tuple of the value between the columns first and last of the line, or None """
+    match = TOKEN.search(line, first, last)
+    if match is None:
+        return None
+    token = match.group()
+    try:
+        value = float(token)
+    except ValueError:
+        return None
+    decimals = None
+    if '.' in token:
+        decimals = len(token) - token.index('.') - 1
+        if minimum_decimals is not None:
+            decimals = max(decimals, minimum_decimals)
+    return number, first, match.end(), decimals, value
+
+
+def _format(value, decimals, width):
+    """ Value with the decimals, with less decimals if needed to fit in width """
+    if decimals is None:
+        return str(int(round(value)))
+    text = '%.*f' % (decimals, value)
+    while len(text) > width and decimals > 0:
+        decimals -= 1
+        text = '%.*f' % (decimals, value)
+    return text
+
+
+def _texts(text):
+    if text is None or text.strip() == '':
+        return None
+    return set(t.strip().upper() for t in text.split(','))
+
+
+def _numbers(text):
+    """ Set of numbers of a text like 1,3,5-8, or None when it is empty """
+    if text is None or text.strip() == '':
+        return None
+    numbers = set()
+    for part in text.split(','):
+        if '-' in part:
+            first, last = part.split('-')
+            numbers.update(range(int(first), int(last) + 1))
+        else:
+            numbers.add(int(part))
+    return numbers
@@ -0,0 +1,248 @@
+import os
+import json
+import zlib
+import logging
+from swatpython.lazyimport import LazyModule
+
+numpy = LazyModule('numpy')
+
+logger = logging.getLogger(__name__)
+
+# zlib level of the chunks: the lowest levels compress the shuffled values almost as well
+COMPRESSION_LEVEL = 1
+
+METADATA = 'store.json'
+
+
+class ResultStore(object):
+    """
+    Outputs of many runs in a folder, as one array (run, reach, time step, variable) split in
+    compressed chunks. A chunk holds one variable of runs_per_chunk runs and reaches_per_chunk
+    reaches, so reading the flow of one reach for all runs decompresses only the chunks of
+    that reach and variable. The bytes of the values are shuffled before compression, like
+    the shuffle filter of HDF5, so float series compress several times.
+
+    Runs are appended in order. The runs of an incomplete chunk are kept in memory until the
+    chunk is complete or flush is called, so the memory used is at most runs_per_chunk runs.
+    """
+
+    def __init__(self, path, reaches=None, variables=None, steps=None, dtype='float32', runs_per_chunk=16,
+                 reaches_per_chunk=8):
+        """
+        Parameters
+        ----------
+        path : str
+            folder of the store. An existing store is opened, the other parameters are only
+            checked
+        reaches : list of int
+            reaches stored, required for a new store
+        variables : list of str
+            columns stored, as in the header of output.rch (ex: 'FLOW_OUTcms'), required for a
+            new store
+        steps : int, optional
+            time steps of each run, taken from the first run by default
+        dtype : str
+            type of the stored values
+        runs_per_chunk : int
+            runs in each chunk
+        reaches_per_chunk : int
+            reaches in each chunk
+        """
+        self.path = path
+        metadata_path = os.path.join(path, METADATA)
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as fo:
+                metadata = json.load(fo)
+            given = {'reaches': None if reaches is None else [int(reach) for reach in reaches],
+                     'variables': None if variables is None else list(variables), 'steps': steps}
+            for name, value in given.items():
+                if value is not None and metadata[name] is not None and value != metadata[name]:
+                    raise ValueError("The store " + path + " has other " + name + ": " + str(metadata[name]))
+        else:
+            if not reaches or not variables:
+                raise ValueError("reaches and variables are required for a new store")
+            if runs_per_chunk < 1 or reaches_per_chunk < 1:
+                raise ValueError("Chunks must have at least one run and one reach")
+            metadata = {'reaches': [int(reach) for reach in reaches], 'variables': list(variables), 'steps': steps,
+                        'dtype': numpy.dtype(dtype).str, 'runs_per_chunk': runs_per_chunk,
+                        'reaches_per_chunk': reaches_per_chunk, 'runs': 0}
+            os.makedirs(path, exist_ok=True)
+        self.reaches = metadata['reaches']
+        self.variables = metadata['variables']
+        self.steps = metadata['steps']
+        self.dtype = numpy.dtype(metadata['dtype'])
+        self.runs_per_chunk = metadata['runs_per_chunk']
+        self.reaches_per_chunk = metadata['reaches_per_chunk']
+        self.runs = metadata['runs']
+        self._reach_index = {reach: i for i, reach in enumerate(self.reaches)}
+        self._pending = []
+        if not os.path.exists(metadata_path):
+            self._write_metadata()
+
+    @property
+    def shape(self):
+        """ Shape of the stored array: (runs, reaches, steps, variables) """
+        return self.runs, len(self.reaches), self.steps, len(self.variables)
+
+    def __len__(self):
+        return self.runs
+
+    def append(self, values):
+        """
+        Appends a run
+
+        Parameters
+        ----------
+        values : array (reaches, steps, variables)
+            outputs of the run, in the order of the reaches and variables of the store
+
+        Returns
+        -------
+        index of the run in the store
+        """
+        values = numpy.asarray(values, dtype=self.dtype)
+        if self.steps is None and values.ndim == 3:
+            self.steps = values.shape[1]
+        expected = (len(self.reaches), self.steps, len(self.variables))
+        if values.shape != expected:
+            raise ValueError("Run with shape " + str(values.shape) + ", the store has " + str(expected))
+        self._pending.append(values)
+        self.runs += 1
+        if self.runs % self.runs_per_chunk == 0:
+            self.flush()
+        return self.runs - 1
+
+    def append_output_rch(self, dataframe):
+        """
+        Appends a run from the DataFrame of read_output_rch, with the RCH column and the
+        variables of the store. Each reach must have one line per time step
+
+        Returns
+        -------
+        index of the run in the store
+        """
+        reaches = dataframe['RCH'].to_numpy()
+        selected = numpy.isin(reaches, self.reaches)
+        found = numpy.unique(reaches[selected]).tolist()
+        if len(found) != len(self.reaches):
+            raise ValueError("Reaches missing in the output: " + str(sorted(set(self.reaches) - set(found))))
+        values = dataframe[self.variables].to_numpy(dtype=self.dtype)[selected]
+        # Lines are ordered by time step and reach, the store by reach and time step
+        store_reaches = numpy.array(self.reaches)
+        sorter = numpy.argsort(store_reaches)
+        positions = sorter[numpy.searchsorted(store_reaches, reaches[selected], sorter=sorter)]
+        counts = numpy.bincount(positions, minlength=len(self.reaches))
+        if (counts != counts[0]).any():
+            raise ValueError("The reaches have different numbers of lines in the output")
+        order = numpy.argsort(positions, kind='stable')
+        return self.append(values[order].reshape(len(self.reaches), -1, len(self.variables)))
+
+    def read(self, variables=None, reaches=None, runs=None, steps=None):
+        """
+        Reads a part of the store, decompressing only the chunks that have it
+
+        Parameters
+        ----------
+        variables : list of str, optional
+            variables read, all by default
+        reaches : list of int, optional
+            reaches read, all by default
+        runs : slice or list of int, optional
+            runs read, all by default
+        steps : slice or list of int, optional
+            time steps read, all by default
+
+        Returns
+        -------
+        array (runs, reaches, steps, variables)
+        """
+        self.flush()
+        variables = self.variables if variables is None else list(variables)
+        reaches = self.reaches if reaches is None else list(reaches)
+        unknown = [name for name in variables if name not in self.variables]
+        unknown += [str(reach) for reach in reaches if reach not in self._reach_index]
+        if unknown:
+            raise ValueError("Not in the store: " + ", ".join(unknown))
+        runs = numpy.arange(self.runs)[slice(None) if runs is None else runs]
+        step_selection = slice(None) if steps is None else steps
+        step_count = len(numpy.arange(self.steps or 0)[step_selection])
+        result = numpy.empty((len(runs), len(reaches), step_count, len(variables)), dtype=self.dtype)
+        reach_positions = numpy.array([self._reach_index[reach] for reach in reaches], dtype=int)
+        run_blocks = runs // self.runs_per_chunk
+        reach_blocks = reach_positions // self.reaches_per_chunk
+        for run_block in numpy.unique(run_blocks):
+            run_rows = numpy.flatnonzero(run_blocks == run_block)
+            run_offsets = runs[run_rows] - run_block * self.runs_per_chunk
+            for reach_block in numpy.unique(reach_blocks):
+                reach_rows = numpy.flatnonzero(reach_blocks == reach_block)
+                reach_offsets = reach_positions[reach_rows] - reach_block * self.reaches_per_chunk
+                for v, variable in enumerate(variables):
+                    chunk = self._load(run_block, self.variables.index(variable), reach_block)
+                    result[run_rows[:, None], reach_rows, :, v] = \
+                        chunk[run_offsets[:, None], reach_offsets][..., step_selection]
+        return result
+
+    def series(self, variable, reach, runs=None):
+        """ Series of a variable at a reach for the runs, an array (runs, steps) """
+        return self.read([variable], [reach], runs=runs)[:, 0, :, 0]
+
+    def flush(self):
+        """ Writes the runs kept in memory """
+        if not self._pending:
+            return
+        data = numpy.stack(self._pending)
+        first = self.runs - len(data)
+        for run_block in range(first // self.runs_per_chunk, (self.runs - 1) // self.runs_per_chunk + 1):
+            block_start = run_block * self.runs_per_chunk
+            start = max(block_start, first)
+            end = min(block_start + self.runs_per_chunk, self.runs)
+            for v in range(len(self.variables)):
+                for reach_block in range(0, (len(self.reaches) - 1) // self.reaches_per_chunk + 1):
+                    reach_slice = slice(reach_block * self.reaches_per_chunk,
+                                        (reach_block + 1) * self.reaches_per_chunk)
+                    chunk = data[start - first:end - first, reach_slice, :, v]
+                    if start > block_start:
+                        # Incomplete chunk of a previous flush
+                        chunk = numpy.concatenate([self._load(run_block, v, reach_block), chunk])
+                    self._save(run_block, v, reach_block, chunk)
+        self._pending = []
+        self._write_metadata()
+        logger.debug("Stored " + str(len(data)) + " runs in: " + self.path)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _chunk_path(self, run_block, variable, reach_block):
+        return os.path.join(self.path, 'c' + str(run_block) + '.' + str(variable) + '.' + str(reach_block))
+
+    def _save(self, run_block, variable, reach_block, chunk):
+        chunk = numpy.ascontiguousarray(chunk, dtype=self.dtype)
+        # Byte shuffle: the first bytes of all values, then the second bytes...
+        shuffled = chunk.view(numpy.uint8).reshape(-1, self.dtype.itemsize).T.tobytes()
+        path = self._chunk_path(run_block, variable, reach_block)
+        with open(path + '.tmp', 'wb') as fo:
+            fo.write(zlib.compress(shuffled, COMPRESSION_LEVEL))
+        os.replace(path + '.tmp', path)
+
+    def _load(self, run_block, variable, reach_block):
+        """ Chunk as an array (runs, reaches, steps) """
+        with open(self._chunk_path(run_block, variable, reach_block), 'rb') as fo:
+            data = numpy.frombuffer(zlib.decompress(fo.read()), dtype=numpy.uint8)
+        reaches = len(self.reaches[reach_block * self.reaches_per_chunk:(reach_block + 1) * self.reaches_per_chunk])
+        values = data.reshape(self.dtype.itemsize, -1).T.copy().view(self.dtype)
+        return values.reshape(-1, reaches, self.steps)
+
+    def _write_metadata(self):
+        metadata = {'reaches': self.reaches, 'variables': self.variables, 'steps': self.steps,
+                    'dtype': self.dtype.str, 'runs_per_chunk': self.runs_per_chunk,
+                    'reaches_per_chunk': self.reaches_per_chunk, 'runs': self.runs - len(self._pending)}
+        path = os.path.join(self.path, METADATA)
+        with open(path + '.tmp', 'w') as fo:
+            json.dump(metadata, fo)
+        os.replace(path + '.tmp', path)
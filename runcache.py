@@ -0,0 +1,197 @@
+import os
+import time
+import shutil
+import fnmatch
+import hashlib
+import logging
+import tempfile
+from swatpython.workspace import OUTPUT_PATTERNS
+
+logger = logging.getLogger(__name__)
+
+# Size of the blocks read when hashing input files
+HASH_BLOCK = 1024 ** 2
+
+# Files modified less than this before they were hashed are hashed again on the next run, as
+# a rewrite in the same clock tick would not change their size or modification time
+RACY_NANOSECONDS = 2 * 10 ** 9
+
+
+class RunCache(object):
+    """
+    Disk cache of SWAT runs, addressed by the contents of the input files.
+
+    The key of a run is a hash of every input file of the project folder (all files except
+    the outputs), so the same parameter set gives the same key in any folder, even when it
+    was written by another process. An entry keeps a copy of the output files of the run;
+    on a hit they are copied back to the project folder instead of running SWAT. The digest
+    of each file is remembered with its size and modification time, so only the files that
+    changed since the previous run are read again. When the cache grows over max_size bytes,
+    the least recently used entries are removed.
+    """
+
+    def __init__(self, directory, max_size=10 * 1024 ** 3, output_patterns=None):
+        """
+        Parameters
+        ----------
+        directory : str
+            folder where the entries are stored. It is created if it does not exist
+        max_size : int
+            maximum size of the cache in bytes
+        output_patterns : list of str
+            patterns of the files written by SWAT, OUTPUT_PATTERNS by default
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_size = max_size
+        self.output_patterns = OUTPUT_PATTERNS if output_patterns is None else output_patterns
+        self.hits = 0
+        self.misses = 0
+        self._digests = {}
+
+    def is_output(self, filename) -> bool:
+        name = filename.lower()
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.output_patterns)
+
+    def key(self, folder, extra=None) -> str:
+        """
+        Key of a run in folder
+
+        Parameters
+        ----------
+        folder : str
+            project folder, with the input files of the run
+        extra : object
+            anything else that changes the results, like the executable. Its repr is hashed
+
+        Returns
+        -------
+        hexadecimal key
+        """
+        digest = hashlib.sha1(repr(extra).encode())
+        for entry in sorted(self._input_files(folder), key=lambda entry: entry.name):
+            digest.update(entry.name.encode() + b'\0' + self._file_digest(entry) + b'\0')
+        return digest.hexdigest()
+
+    def load(self, key, folder) -> bool:
+        """
+        Copies the outputs of the entry to folder
+
+        Parameters
+        ----------
+        key : str
+            key returned by key
+        folder : str
+            project folder
+
+        Returns
+        -------
+        True when the entry exists and was restored
+        """
+        entry = self._entry_path(key)
+        try:
+            names = os.listdir(entry)
+        except OSError:
+            self.misses += 1
+            logger.debug("Run cache miss: " + key)
+            return False
+        # Outputs of other runs are removed, so the folder looks as if SWAT had just run
+        for name in os.listdir(folder):
+            if self.is_output(name) and name not in names:
+                self._remove(os.path.join(folder, name))
+        for name in names:
+            shutil.copyfile(os.path.join(entry, name), os.path.join(folder, name))
+        # Modification time of the entry is used as last access for eviction
+        os.utime(entry)
+        self.hits += 1
+        logger.debug("Run cache hit: " + key)
+        return True
+
+    def store(self, key, folder):
+        """
+        Stores the outputs of the run in folder
+
+        Parameters
+        ----------
+        key : str
+            key computed before the run
+        folder : str
+            project folder, after a successful run
+        """
+        entry = self._entry_path(key)
+        if os.path.isdir(entry):
+            return
+        # Filled in a temporary folder first, so other processes never load a partial entry
+        temporary = tempfile.mkdtemp(dir=self.directory, suffix='.tmp')
+        try:
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                if self.is_output(name) and os.path.isfile(path):
+                    shutil.copyfile(path, os.path.join(temporary, name))
+            os.rename(temporary, entry)
+        except OSError:
+            shutil.rmtree(temporary, ignore_errors=True)
+            if not os.path.isdir(entry):
+                raise
+        logger.debug("Run stored in cache: " + key)
+        self.evict()
+
+    def evict(self):
+        """ Removes the least recently used entries until the cache fits in max_size """
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.tmp') or not entry.is_dir():
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+                size = sum(item.stat().st_size for item in os.scandir(entry.path))
+            except OSError:
+                continue
+            entries.append((mtime, size, entry.path))
+            total += size
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        """ Removes all entries """
+        for entry in os.scandir(self.directory):
+            if entry.is_dir():
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    def _input_files(self, folder):
+        for entry in os.scandir(folder):
+            if entry.is_file() and not self.is_output(entry.name) and not entry.name.endswith('.tmp'):
+                yield entry
+
+    def _file_digest(self, entry):
+        """ Digest of the contents of a file, read again only when the file changed """
+        path = entry.path
+        stat = entry.stat()
+        signature = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        known = self._digests.get(path)
+        if known is not None and known[0] == signature and known[1] - stat.st_mtime_ns > RACY_NANOSECONDS:
+            return known[2]
+        hashed_at = int(time.time() * 10 ** 9)
+        digest = hashlib.sha1()
+        with open(path, 'rb') as fo:
+            while True:
+                block = fo.read(HASH_BLOCK)
+                if not block:
+                    break
+                digest.update(block)
+        self._digests[path] = (signature, hashed_at, digest.digest())
+        return digest.digest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,299 @@
+import os
+import json
+import math
+import logging
+import numpy
+from swatpython.campaign import Campaign, FAILED
+
+logger = logging.getLogger(__name__)
+
+
+class ParameterSpace(object):
+    """
+    Ranges of the parameters of a sensitivity analysis, with the SUFI-2 parameter names
+    (see SWAT.apply_parameters). Samples are generated in the unit hypercube and scaled to
+    the ranges.
+    """
+
+    def __init__(self, bounds):
+        """
+        Parameters
+        ----------
+        bounds : dict or list of (str, (float, float))
+            name and (minimum, maximum) of each parameter, like {'r__CN2.mgt': (-0.2, 0.2)}
+        """
+        items = list(bounds.items()) if isinstance(bounds, dict) else list(bounds)
+        if not items:
+            raise ValueError("The parameter space is empty")
+        self.names = [name for name, _ in items]
+        self.lows = numpy.array([float(low) for _, (low, high) in items])
+        self.highs = numpy.array([float(high) for _, (low, high) in items])
+        if (self.highs < self.lows).any():
+            raise ValueError("Parameter maximum lower than its minimum")
+
+    def __len__(self):
+        return len(self.names)
+
+    def scale(self, unit):
+        """ Parameter values of samples in the unit hypercube, an array (samples, parameters) """
+        return self.lows + numpy.asarray(unit) * (self.highs - self.lows)
+
+    def parameter_sets(self, samples):
+        """ Dictionaries of parameter values of an array of samples, for SWAT.apply_parameters """
+        for row in samples:
+            yield dict(zip(self.names, (float(value) for value in row)))
+
+
+def latin_hypercube(space, count, seed=None):
+    """
+    Latin hypercube sample: each parameter range is divided in count intervals and each
+    interval is sampled once
+
+    Returns
+    -------
+    array (count, parameters)
+    """
+    random = numpy.random.RandomState(seed)
+    strata = numpy.argsort(random.random_sample((count, len(space))), axis=0)
+    return space.scale((strata + random.random_sample((count, len(space)))) / count)
+
+
+def morris_sample(space, trajectories, levels=4, seed=None):
+    """
+    One-at-a-time trajectories of the Morris method. Each trajectory has parameters + 1
+    samples and moves one parameter at a time by levels / (2 * (levels - 1)) of its range
+
+    Returns
+    -------
+    array (trajectories * (parameters + 1), parameters), trajectory after trajectory
+    """
+    random = numpy.random.RandomState(seed)
+    count = len(space)
+    delta = levels / (2.0 * (levels - 1))
+    unit = numpy.empty((trajectories, count + 1, count))
+    unit[:, 0] = random.randint(0, levels, (trajectories, count)) / (levels - 1.0)
+    direction = numpy.where(unit[:, 0] + delta <= 1, delta, -delta)
+    order = numpy.argsort(random.random_sample((trajectories, count)), axis=1)
+    rows = numpy.arange(trajectories)
+    for step in range(count):
+        unit[:, step + 1] = unit[:, step]
+        changed = order[:, step]
+        unit[rows, step + 1, changed] += direction[rows, changed]
+    return space.scale(unit.reshape(-1, count))
+
+
+def saltelli_sample(space, count, seed=None):
+    """
+    Samples of the Sobol indices estimators: the matrices A and B, with count random
+    samples each, followed by A with the column of each parameter taken from B
+
+    Returns
+    -------
+    array (count * (parameters + 2), parameters)
+    """
+    random = numpy.random.RandomState(seed)
+    a = random.random_sample((count, len(space)))
+    b = random.random_sample((count, len(space)))
+    blocks = [a, b]
+    for parameter in range(len(space)):
+        ab = a.copy()
+        ab[:, parameter] = b[:, parameter]
+        blocks.append(ab)
+    return space.scale(numpy.concatenate(blocks))
+
+
+def regression_indices(samples, results):
+    """
+    Standardized regression coefficients of the results on the parameters, with their
+    t-statistics and p-values, as in the global sensitivity of SUFI-2. The p-values use the
+    normal approximation of the t distribution, accurate for hundreds of samples. Samples
+    with missing results (NaN, like failed runs) are ignored
+
+    Parameters
+    ----------
+    samples : array (samples, parameters)
+    results : array (samples,) or (samples, outputs)
+
+    Returns
+    -------
+    dictionary with 'SRC', 't' and 'p', arrays (parameters,) or (parameters, outputs)
+    """
+    samples, results, single = _prepare(samples, results)
+    valid = numpy.isfinite(results).all(axis=1)
+    x = samples[valid]
+    y = results[valid]
+    x = (x - x.mean(axis=0)) / x.std(axis=0)
+    y = (y - y.mean(axis=0)) / y.std(axis=0)
+    design = numpy.column_stack([numpy.ones(len(x)), x])
+    coefficients, residuals, rank, singular = numpy.linalg.lstsq(design, y, rcond=None)
+    freedom = len(x) - design.shape[1]
+    variance = ((y - design.dot(coefficients)) ** 2).sum(axis=0) / freedom
+    covariance = numpy.linalg.pinv(design.T.dot(design)).diagonal()[1:, None]
+    src = coefficients[1:]
+    t = src / numpy.sqrt(covariance * variance)
+    p = numpy.vectorize(lambda value: math.erfc(abs(value) / math.sqrt(2)))(t)
+    return _finish({'SRC': src, 't': t, 'p': p}, single)
+
+
+def morris_indices(samples, results, parameters):
+    """
+    Elementary effects of the Morris method, for samples made by morris_sample
+
+    Parameters
+    ----------
+    samples : array (samples, parameters)
+    results : array (samples,) or (samples, outputs)
+    parameters : int
+        number of parameters
+
+    Returns
+    -------
+    dictionary with 'mu_star' (mean absolute effect), 'mu' and 'sigma', arrays (parameters,)
+    or (parameters, outputs). Trajectories with missing results are ignored
+    """
+    samples, results, single = _prepare(samples, results)
+    steps = parameters + 1
+    samples = samples.reshape(-1, steps, parameters)
+    results = results.reshape(len(samples), steps, -1)
+    valid = numpy.isfinite(results).all(axis=(1, 2))
+    samples, results = samples[valid], results[valid]
+    moves = numpy.diff(samples, axis=1)
+    changed = numpy.abs(moves).argmax(axis=2)
+    size = moves[numpy.arange(len(moves))[:, None], numpy.arange(parameters), changed]
+    effects = numpy.empty((len(samples), parameters, results.shape[2]))
+    rows = numpy.arange(len(samples))[:, None]
+    effects[rows, changed] = numpy.diff(results, axis=1) / size[:, :, None]
+    return _finish({'mu_star': numpy.abs(effects).mean(axis=0), 'mu': effects.mean(axis=0),
+                    'sigma': effects.std(axis=0, ddof=1)}, single)
+
+
+def sobol_indices(results, parameters):
+    """
+    First order and total Sobol indices, with the estimators of Saltelli (2010) and Jansen,
+    for the results of samples made by saltelli_sample
+
+    Parameters
+    ----------
+    results : array (samples,) or (samples, outputs)
+    parameters : int
+        number of parameters
+
+    Returns
+    -------
+    dictionary with 'S1' and 'ST', arrays (parameters,) or (parameters, outputs). Groups of
+    samples with missing results are ignored
+    """
+    results = numpy.asarray(results, dtype=float)
+    single = results.ndim == 1
+    results = results.reshape(parameters + 2, -1, 1 if single else results.shape[1])
+    valid = numpy.isfinite(results).all(axis=(0, 2))
+    results = results[:, valid]
+    a, b, ab = results[0], results[1], results[2:]
+    variance = numpy.concatenate([a, b]).var(axis=0)
+    first = (b * (ab - a)).mean(axis=1) / variance
+    total = 0.5 * ((a - ab) ** 2).mean(axis=1) / variance
+    return _finish({'S1': first, 'ST': total}, single)
+
+
+def run_samples(swat, space, samples, extract, path, max_workers=None, timeout=None, root=None):
+    """
+    Runs SWAT for each sample, in parallel, and returns the extracted results as arrays. The
+    runs are kept in a Campaign at path: each worker has its own copy of the project and
+    results are stored as the runs finish, so memory does not depend on the number of
+    samples, and an interrupted study continues from the unfinished runs
+
+    Parameters
+    ----------
+    swat : SWAT
+        swat object with the project folder
+    space : ParameterSpace
+    samples : array (samples, parameters)
+    extract : callable
+        receives the folder of a run and returns a dictionary of results, name to number or
+        array, see output_rch_extractor
+    path : str
+        SQLite file of the campaign. A new file gets the samples, an existing one must have
+        the same parameter sets, in the same order
+    max_workers : int, optional
+        simultaneous runs, the number of cpus by default
+    timeout : float, optional
+        maximum time in seconds of each run
+    root : str, optional
+        folder of the project copies, the system temporary folder by default
+
+    Returns
+    -------
+    dictionary with an array (samples, ...) for each result, NaN for the failed runs
+    """
+    with Campaign(path) as campaign:
+        counts = campaign.status()
+        total = sum(counts.values())
+        if total == 0:
+            campaign.add(space.parameter_sets(samples))
+        elif total != len(samples):
+            raise ValueError("The campaign " + path + " has " + str(total) + " runs, not " + str(len(samples)))
+        else:
+            _check_samples(campaign, space, samples)
+        counts = campaign.run(swat, extract, max_workers=max_workers, timeout=timeout, root=root)
+        if counts[FAILED]:
+            logger.warning(str(counts[FAILED]) + " of " + str(len(samples)) + " sensitivity runs failed")
+        return campaign_arrays(campaign, len(samples))
+
+
+def _check_samples(campaign, space, samples):
+    """ Raises ValueError when the runs of an existing campaign are not the samples """
+    rows = campaign.connection.execute("SELECT id, parameters FROM runs ORDER BY id")
+    for parameters, (run, stored) in zip(space.parameter_sets(samples), rows):
+        if json.loads(stored) != parameters:
+            raise ValueError("The campaign " + campaign.path + " has other parameter sets than the samples, "
+                             "first difference in run " + str(run))
+
+
+def campaign_arrays(campaign, count):
+    """ Results of the runs of a campaign as arrays (count, ...), NaN for the runs without them """
+    arrays = {}
+    first = campaign.connection.execute("SELECT MIN(id) FROM runs").fetchone()[0] or 1
+    names = [row[0] for row in campaign.connection.execute("SELECT DISTINCT name FROM results")]
+    for name in names:
+        array = None
+        for run, value in campaign.results(name):
+            if array is None:
+                array = numpy.full((count,) + numpy.shape(value), numpy.nan)
+            array[run - first] = value
+        arrays[name] = array
+    return arrays
+
+
+def output_rch_extractor(swat, columns, reaches=None):
+    """
+    Function for run_samples that reads only some columns and reaches of output.rch
+
+    Parameters
+    ----------
+    swat : SWAT
+    columns : list of str
+        columns of output.rch, like ['FLOW_OUTcms']
+    reaches : list of int, optional
+        reaches read, all by default
+
+    Returns
+    -------
+    callable that returns a dictionary with an array of each column, in the order of the file
+    """
+    def extract(folder):
+        frame = swat.wrapper.read_output_rch(os.path.join(folder, 'output.rch'), columns=columns, reaches=reaches)
+        return {column: frame[column].to_numpy(dtype=float) for column in columns}
+    return extract
+
+
+def _prepare(samples, results):
+    samples = numpy.asarray(samples, dtype=float)
+    results = numpy.asarray(results, dtype=float)
+    single = results.ndim == 1
+    return samples, results.reshape(len(results), -1), single
+
+
+def _finish(indices, single):
+    if single:
+        return {name: values[:, 0] for name, values in indices.items()}
+    return indices
@@ -0,0 +1,127 @@
+import os
+import re
+import shutil
+import fnmatch
+import logging
+import tempfile
+from swatpython.workspace import OUTPUT_PATTERNS
+
+logger = logging.getLogger(__name__)
+
+# Memory backed folder of linux, used by default for the staging area
+STAGING_ROOT = '/dev/shm'
+
+
+class StagingArea(object):
+    """
+    Copy of a project folder in a fast scratch folder, like a tmpfs, where SWAT runs without
+    touching the project storage. Before each run only the input files that changed in the
+    project since they were copied are copied again, so consecutive runs of a worker cost one
+    stat per file. After the run the requested output files are copied back to the project;
+    the others stay in the staging area until the next run.
+    """
+
+    def __init__(self, source, root=STAGING_ROOT, output_patterns=None):
+        """
+        Parameters
+        ----------
+        source : str
+            project folder
+        root : str
+            folder where the staging area is created, like /dev/shm
+        output_patterns : list of str
+            patterns of the files written by SWAT, OUTPUT_PATTERNS by default
+        """
+        if not os.path.isdir(root):
+            raise ValueError("Staging folder not found: " + root)
+        self.source = os.path.abspath(source)
+        self.root = root
+        self.path = tempfile.mkdtemp(prefix='swat_stage_', dir=root)
+        self.output_patterns = OUTPUT_PATTERNS if output_patterns is None else output_patterns
+        # One regular expression for all patterns, matched for every file before each run
+        self._output_match = re.compile('|'.join(fnmatch.translate(pattern) for pattern in self.output_patterns)).match
+        # Signature (size, modification time, inode) of each project file when it was copied
+        self.copied = {}
+
+    def is_output(self, filename) -> bool:
+        return self._output_match(filename.lower()) is not None
+
+    def stage(self):
+        """
+        Updates the staging area with the input files of the project and removes the outputs
+        of the previous run
+
+        Returns
+        -------
+        path of the staging area
+        """
+        inputs = set()
+        copied = 0
+        for entry in os.scandir(self.source):
+            if not entry.is_file() or self.is_output(entry.name):
+                continue
+            inputs.add(entry.name)
+            stat = entry.stat()
+            signature = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+            if self.copied.get(entry.name) == signature:
+                continue
+            shutil.copyfile(entry.path, os.path.join(self.path, entry.name))
+            self.copied[entry.name] = signature
+            copied += 1
+        for name in os.listdir(self.path):
+            if name not in inputs:
+                self._remove(name)
+        logger.debug("Staged " + str(copied) + " changed files in: " + self.path)
+        return self.path
+
+    def clear_outputs(self):
+        """ Removes the output files from the staging area """
+        for name in os.listdir(self.path):
+            if self.is_output(name):
+                self._remove(name)
+
+    def collect(self, names=None):
+        """
+        Copies output files of the staging area to the project folder
+
+        Parameters
+        ----------
+        names : list of str, optional
+            output files copied, like ['output.rch']. All output files by default
+
+        Returns
+        -------
+        list with the names of the files copied
+        """
+        if names is None:
+            names = [name for name in os.listdir(self.path) if self.is_output(name)]
+        collected = []
+        for name in names:
+            path = os.path.join(self.path, name)
+            if os.path.isfile(path):
+                shutil.copyfile(path, os.path.join(self.source, name))
+                collected.append(name)
+        return collected
+
+    def output_path(self, filename):
+        """ Path of an output file of the last run in the staging area, None if it is not there """
+        path = os.path.join(self.path, filename)
+        return path if os.path.isfile(path) else None
+
+    def cleanup(self):
+        """ Removes the staging area """
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.copied = {}
+
+    def _remove(self, name):
+        self.copied.pop(name, None)
+        try:
+            os.remove(os.path.join(self.path, name))
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.cleanup()
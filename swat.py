@@ -1,12 +1,20 @@
 import os
+import time
 import logging
-import shutil
-import subprocess
 import platform
 from swatpython.operationalsystem import OperationalSystem
-from swatpython.swatversion import SWATVersion
-from swatpython.swat2012rev670.swat2012rev670 import SWAT2012rev670
-from swatpython.swat2012rev637.swat2012rev637 import SWAT2012rev637
+from swatpython.swatversion import version_class
+from swatpython.ensemble import EnsembleRunner, AsyncRunner
+from swatpython.workspace import create_workspace
+from swatpython.outputcache import OutputCache
+from swatpython.runcache import RunCache
+from swatpython.telemetry import Telemetry, output_bytes
+from swatpython.staging import StagingArea, STAGING_ROOT
+from swatpython.parameters import ParameterEngine
+from swatpython.monitor import OutputMonitor, MONITOR_INTERVAL
+from swatpython.execution import kill
+from swatpython.filecio import write_run_values, read_run_values
+from swatpython.resultstore import ResultStore
 
 logger = logging.getLogger(__name__)
 
@@ -52,20 +60,22 @@ class SWAT(object):
         self.wrapper = None
         self.project_folder_path = None
         self.async_process = None
-
-        # Select the right class for the swat version
+        self.output_cache = None
+        self.run_cache = None
+        self.telemetry = Telemetry()
+        self.staging = None
+        self.staging_outputs = None
+        self.parameter_engine = None
+        self.async_runner = None
+        self.result_store = None
+
+        # Select the right class for the swat version, only its module is imported
         logger.info("Detected OS: " + self.operational_system + " " + self.architecture)
-        if version == SWATVersion.SWAT2012REV670:
-            if self.operational_system == OperationalSystem.LINUX.value:
-                self.wrapper = SWAT2012rev670(OperationalSystem.LINUX)
-            elif self.operational_system == OperationalSystem.WINDOWS.value:
-                self.wrapper = SWAT2012rev670(OperationalSystem.WINDOWS)
-
-        if version == SWATVersion.SWAT2012REV637:
-            if self.operational_system == OperationalSystem.LINUX.value:
-                self.wrapper = SWAT2012rev637(OperationalSystem.LINUX)
-            elif self.operational_system == OperationalSystem.WINDOWS.value:
-                self.wrapper = SWAT2012rev637(OperationalSystem.WINDOWS)
+        wrapper_class = version_class(version)
+        if self.operational_system == OperationalSystem.LINUX.value:
+            self.wrapper = wrapper_class(OperationalSystem.LINUX)
+        elif self.operational_system == OperationalSystem.WINDOWS.value:
+            self.wrapper = wrapper_class(OperationalSystem.WINDOWS)
 
 
         logger.info("Using SWATPython module: " + self.wrapper.get_version())
@@ -97,20 +107,487 @@ class SWAT(object):
             logger.error("Project folder nof found: " + path)
             raise ValueError("Project folder not found: " + path)
         self.project_folder_path = path
+        self.parameter_engine = None
+        if self.staging is not None:
+            self.set_staging(self.staging.root, self.staging_outputs)
         logger.info("Project folder found: " + path)
 
+    def set_output_cache(self, directory, max_size=1024 ** 3):
+        """ Enables the cache of parsed files
+
+        The readers of precipitation and output files store their results in directory,
+        in binary format. Reading the same file again loads the stored result, until the
+        file is modified. Set directory to None to disable the cache.
+
+        Parameters
+        ----------
+        directory : str
+            cache folder
+        max_size : int
+            maximum size of the cache in bytes. Least recently used entries are removed
+        """
+        if directory is None:
+            self.output_cache = None
+            return
+        self.output_cache = OutputCache(directory, max_size=max_size)
+        logger.info("Output cache enabled: " + directory)
+
+    def set_run_cache(self, directory, max_size=10 * 1024 ** 3):
+        """ Enables the cache of runs
+
+        run hashes the input files of the project folder and, when the same inputs were
+        already run, copies the stored output files to the folder instead of running SWAT.
+        Only runs that return 0 are stored. Set directory to None to disable the cache; the
+        hits and misses are counted in run_cache.hits and run_cache.misses.
+
+        Parameters
+        ----------
+        directory : str
+            cache folder
+        max_size : int
+            maximum size of the cache in bytes. Least recently used runs are removed
+        """
+        if directory is None:
+            self.run_cache = None
+            return
+        self.run_cache = RunCache(directory, max_size=max_size)
+        logger.info("Run cache enabled: " + directory)
+
+    def set_staging(self, root=STAGING_ROOT, collect=None):
+        """ Runs SWAT in a copy of the project folder in a fast scratch folder
+
+        SWAT reads and writes many small files, which is slow on network storage. With
+        staging, run, run_async and async_run copy the project to a folder under root, like
+        the memory backed /dev/shm, and run SWAT there. Only the input files changed since the
+        previous run are copied again. After run and run_async the output files in collect
+        are copied back to the project folder; the output readers read the others directly
+        from the staging folder, until the next run. Set root to None to disable staging.
+
+        Parameters
+        ----------
+        root : str
+            scratch folder where the staging folder is created
+        collect : list of str, optional
+            output files copied back to the project folder, like ['output.rch']. All output
+            files by default; an empty list keeps them only in the staging folder
+        """
+        if self.staging is not None:
+            self.staging.cleanup()
+            self.staging = None
+        self.staging_outputs = collect
+        if root is None:
+            return
+        if self.project_folder_path is None:
+            raise ValueError("Project folder not set")
+        self.staging = StagingArea(self.project_folder_path, root=root)
+        logger.info("Staging enabled: " + self.staging.path)
+
+    def set_result_store(self, path, reaches=None, variables=None, runs_per_chunk=16, reaches_per_chunk=8):
+        """ Appends outputs of output.rch to a ResultStore after each successful run
+
+        Every run of the project (see run) adds the variables of the reaches to the store, so
+        the results of thousands of runs stay in a few compressed files, and the series of a
+        reach for all runs is read without reading the others.
+
+        Parameters
+        ----------
+        path : str
+            folder of the store. An existing store gets the new runs. None disables the store
+        reaches : list of int
+            reaches stored, required for a new store
+        variables : list of str
+            columns of output.rch stored, like ['FLOW_OUTcms'], required for a new store
+        runs_per_chunk : int
+            runs in each chunk of a new store
+        reaches_per_chunk : int
+            reaches in each chunk of a new store
+
+        Returns
+        -------
+        ResultStore
+        """
+        if self.result_store is not None:
+            self.result_store.close()
+        if path is None:
+            self.result_store = None
+            return None
+        self.result_store = ResultStore(path, reaches=reaches, variables=variables, runs_per_chunk=runs_per_chunk,
+                                        reaches_per_chunk=reaches_per_chunk)
+        return self.result_store
+
+    def set_telemetry(self, sinks):
+        """ Enables the telemetry of runs, readers and writers
+
+        Each operation sends a record to the sinks with its name, start, duration and
+        attributes. Runs report the preparation time, the time of the executable, the
+        resources used by the SWAT process (CPU time, peak memory, I/O) and the size of the
+        output files. Readers report the file size and writers the files changed. Batch
+        runs send one record per run. Set sinks to None to disable it.
+
+        Parameters
+        ----------
+        sinks : list of TelemetrySink or callable
+            see swatpython.telemetry for LoggingSink, JsonLinesSink and CallbackSink. A
+            callable receives each record, a dictionary
+        """
+        self.telemetry.close()
+        self.telemetry = Telemetry(sinks)
+
+    def create_workspace(self, root=None, materialise=None, link_mode='hardlink'):
+        """ Creates a scratch copy of the project folder for an independent run
+
+        Input files are linked instead of copied, so the workspace is created in
+        milliseconds. Files listed in materialise are copied, as they will be edited.
+        The workspace can be used as a context manager to remove it afterwards.
+
+        Parameters
+        ----------
+        root : str, optional
+            folder where the workspace is created (default is the system temporary folder)
+        materialise : list of str, optional
+            file names that will be edited in the workspace
+        link_mode : str
+            'hardlink', 'symlink' or 'copy'
+
+        Returns
+        -------
+        Workspace
+        """
+        if self.project_folder_path is None:
+            raise ValueError("Project folder not set")
+        workspace = create_workspace(self.project_folder_path, root=root, link_mode=link_mode,
+                                     materialise=materialise)
+        return workspace
+
     def write(self, file, field, value):
-        """ escreve em arquivo do swat """
+        """ Changes a parameter of an input file of the project
 
-    def run(self):
-        """ executa o swat """
+        The value is written in the same columns of the old value. Use an extension, like
+        '.gw', to change the parameter in all files with that extension.
+
+        Parameters
+        ----------
+        file : str
+            file name, like '000010001.mgt', or an extension, like '.mgt'
+        field : str
+            parameter name, like 'CN2'. Layers of .sol parameters are selected with
+            'SOL_AWC(1)', all layers are changed otherwise
+        value : float
+            new value
+        """
+        logger.debug("Writing " + field + " in: " + file)
+        with self.telemetry.span('write', file=file, field=field):
+            self._parameters().write(file, field, value)
+
+    def apply_parameters(self, parameters, folder=None, workers=None):
+        """ Applies a parameter set to the input files, with the SUFI-2 parameter names
+
+        Names are like 'r__CN2.mgt' (relative change), 'a__GW_DELAY.gw' (absolute change) or
+        'v__ALPHA_BF.gw' (new value), optionally followed by the filters
+        __hydrogrp__soltext__landuse__subbasin__slope, like 'r__CN2.mgt______AGRL__1-5'.
+        Changes are computed from the original values of the project, so parameter sets can
+        be applied one after the other, as in a calibration.
+
+        Parameters
+        ----------
+        parameters : dict or list of (str, float)
+            parameter names and values
+        folder : str, optional
+            folder where the changed files are written, like a workspace (default is the
+            project folder)
+        workers : int, optional
+            number of threads used to write the files
+
+        Returns
+        -------
+        number of files written
+        """
+        with self.telemetry.span('apply_parameters', folder=folder or self.project_folder_path) as span:
+            span['files'] = self._parameters().apply(parameters, folder=folder, workers=workers)
+        return span['files']
+
+    def restore_parameters(self, folder=None):
+        """ Writes back the original values of the files changed by apply_parameters """
+        return self._parameters().restore(folder=folder)
+
+    def run(self, output='console', outputs=None, print_step=None, skip_years=None, print_hrus=None):
+        """ Runs SWAT in the project folder and waits until it finishes
+
+        SWAT prints one line for each simulated day. Use output to choose what is done with
+        it, 'discard' is the fastest option when the output is not needed.
+
+        SWAT also writes every variable of every reach, subbasin and HRU by default. outputs
+        and the other print options change file.cio only for this run, so SWAT writes just
+        what is needed; the file.cio is restored after the run. The values in effect are
+        recorded next to the outputs, in output.cio.json, and the readers use them to compute
+        the dates. Readers of the module (SWAT.wrapper) only find them when the output file is
+        read from its own folder; otherwise pass file_cio with the values of the run.
+
+        With the run cache enabled (see set_run_cache) the outputs of a run with the same
+        input files and print options are restored instead of running SWAT, together with
+        their output.cio.json, and the return code is 0.
+
+        Parameters
+        ----------
+        output : str, OutputHandler or list of OutputHandler
+            'console' copies the output to the console, 'discard' ignores it and any other str
+            is the path of a log file. See swatpython.execution for TailOutput, that keeps the
+            last lines for error reports, and ProgressOutput, that reports the simulated day
+            to a callback. Handlers can be combined in a list
+        outputs : dict
+            variables written in each output file, like {'rch': ['FLOW_OUT']}. The names are
+            listed in swatpython.outputvariables, with or without the units. At most 20 per file
+            (15 for output.sub)
+        print_step : str
+            'daily', 'monthly' or 'yearly'
+        skip_years : int
+            warm up years without output
+        print_hrus : list of int
+            HRUs written in output.hru, at most 20
+
+        Returns
+        -------
+        return code of SWAT
+        """
         logger.debug("Running SWAT in folder: " + self.project_folder_path)
-        self.wrapper.run(self.project_folder_path)
+        with self.telemetry.span('run', folder=self.project_folder_path) as span:
+            values = self.wrapper.print_settings(outputs=outputs, print_step=print_step, skip_years=skip_years,
+                                                 print_hrus=print_hrus)
+            key = None
+            if self.run_cache is not None:
+                executable = self.wrapper.get_executable()
+                stat = os.stat(executable)
+                key = self.run_cache.key(self.project_folder_path, (executable, stat.st_size, stat.st_mtime_ns,
+                                                                    sorted(values.items())))
+                span['cache_hit'] = self.run_cache.load(key, self.project_folder_path)
+                if span['cache_hit']:
+                    if self.staging is not None:
+                        self.staging.clear_outputs()
+                    self._store_results(span)
+                    return 0
+
+            folder = self._stage(span)
+            return_code = self._run(folder, output, values, span)
+            if self.staging is not None:
+                self._collect()
+            if key is not None and return_code == 0:
+                self.run_cache.store(key, folder)
+            if return_code == 0:
+                self._store_results(span)
+            return return_code
+
+    def _store_results(self, span):
+        """ Appends the outputs of the last run to the result store, when it is enabled """
+        if self.result_store is None:
+            return
+        dataframe = self.read_output_rch('output.rch', columns=self.result_store.variables,
+                                         reaches=self.result_store.reaches)
+        span['result_run'] = self.result_store.append_output_rch(dataframe)
+
+    def _stage(self, span):
+        """ Folder where SWAT runs: the project folder or the updated staging folder """
+        if self.staging is None:
+            return self.project_folder_path
+        start = time.perf_counter()
+        folder = self.staging.stage()
+        span['staging_time'] = time.perf_counter() - start
+        return folder
+
+    def _collect(self):
+        """ Copies the outputs of the staging folder to the project folder, with the file.cio values of the run """
+        if self.staging.collect(self.staging_outputs):
+            write_run_values(self.project_folder_path, read_run_values(self.staging.path))
+
+    def _run(self, folder, output, values, span):
+        """ Runs SWAT with the file.cio values changed during the run, recorded with the outputs """
+        write_run_values(folder, values)
+        if not values:
+            return self._execute(folder, output, span)
+
+        path = os.path.join(folder, 'file.cio')
+        with open(path, "rb") as fo:
+            original = fo.read()
+        try:
+            self.wrapper.write_file_cio(path, values)
+            return self._execute(folder, output, span)
+        finally:
+            temporary = path + '.tmp'
+            with open(temporary, "wb") as fo:
+                fo.write(original)
+            os.replace(temporary, path)
+
+    def _execute(self, folder, output, span):
+        """ Runs the executable, adding its time and resources to the telemetry span """
+        usage = {}
+        start = time.perf_counter()
+        return_code = self.wrapper.run(folder, output=output, usage=usage)
+        span['executable_time'] = time.perf_counter() - start
+        span['return_code'] = return_code
+        span.update(usage)
+        if self.telemetry.enabled:
+            span['output_bytes'] = output_bytes(folder)
+        return return_code
 
     def async_run(self):
-        """ executa o swat """
+        """ executa o swat. Com staging, as saidas ficam na pasta de staging (ver set_staging) """
         logger.debug("Running SWAT in folder: " + self.project_folder_path)
-        self.async_process = self.wrapper.async_run(self.project_folder_path)
+        folder = self.project_folder_path if self.staging is None else self.staging.stage()
+        write_run_values(folder, None)
+        self.async_process = self.wrapper.async_run(folder)
+
+    def run_monitored(self, predicate, columns=None, reaches=None, interval=MONITOR_INTERVAL):
+        """ Runs SWAT with async_run and stops it early when output.rch shows a hopeless run
+
+        output.rch is followed while SWAT writes it, parsing only the new lines. When the
+        predicate returns True the process in async_process is killed, which saves the rest of
+        the simulation for the bad parameter sets of a calibration.
+
+        Parameters
+        ----------
+        predicate : callable
+            receives a DataFrame with the lines of output.rch written so far and returns True
+            to stop the run. See swatpython.monitor.nse_below and pbias_beyond
+        columns : list of str, optional
+            columns read, as in read_output_rch. Fewer columns make each check cheaper
+        reaches : list of int, optional
+            reaches read
+        interval : float
+            time in seconds between checks
+
+        Returns
+        -------
+        OutputMonitor, with the return code, whether the run was stopped and the data read
+        """
+        folder = self.project_folder_path
+        if self.staging is None:
+            # An old output.rch would be read before SWAT truncates it
+            path = os.path.join(folder, 'output.rch')
+            if os.path.exists(path):
+                os.remove(path)
+        with self.telemetry.span('run_monitored', folder=folder) as span:
+            self.async_run()
+            if self.staging is not None:
+                folder = self.staging.path
+            follower = self.wrapper.follow_output_rch(os.path.join(folder, 'output.rch'), columns=columns,
+                                                      reaches=reaches)
+            monitor = OutputMonitor(follower, predicate)
+            try:
+                monitor.watch(self.async_process, interval)
+            except BaseException:
+                kill(self.async_process)
+                raise
+            span.update(return_code=monitor.return_code, stopped=monitor.stopped, rows=follower.rows)
+        if self.staging is not None:
+            self._collect()
+        return monitor
+
+    def run_ensemble(self, folders, max_workers=None, timeout=None):
+        """ Runs SWAT in many project folders at the same time
+
+        Each folder is executed in its own process, with at most max_workers processes
+        running at once. Results are returned as the runs finish, so they can be processed
+        while the remaining runs are still executing.
+
+        Parameters
+        ----------
+        folders : iterable of str
+            project folders, one independent copy of the project for each run
+        max_workers : int, optional
+            maximum number of simultaneous runs (default is the number of cpus)
+        timeout : float, optional
+            maximum time in seconds for each run. Runs exceeding it are killed
+
+        Returns
+        -------
+        generator of EnsembleResult
+        """
+        runner = EnsembleRunner(self.wrapper, max_workers=max_workers, timeout=timeout)
+        results = runner.run(folders)
+        try:
+            for result in results:
+                self._record_run('ensemble_run', result)
+                yield result
+        finally:
+            # Kills the runs still executing when the caller stops early
+            results.close()
+
+    def _record_run(self, name, result):
+        """ Sends the telemetry record of a run of a batch """
+        self.telemetry.record(name, result.wall_time, folder=result.folder, return_code=result.return_code,
+                              timed_out=result.timed_out, error=None if result.error is None else repr(result.error),
+                              **result.usage)
+
+    def set_max_async_runs(self, max_workers, timeout=None):
+        """ Sets the limits of run_async
+
+        Parameters
+        ----------
+        max_workers : int
+            maximum number of SWAT processes started by run_async at the same time
+        timeout : float, optional
+            maximum time in seconds for each run
+        """
+        self.async_runner = AsyncRunner(self.wrapper, max_workers=max_workers, timeout=timeout)
+
+    async def run_async(self, folder=None, output='discard', progress=None):
+        """ Coroutine that runs SWAT and waits until it finishes, without blocking the event loop
+
+        Runs wait for a free slot when set_max_async_runs runs are already executing (default
+        is the number of cpus). Cancelling the coroutine kills SWAT.
+
+        Parameters
+        ----------
+        folder : str, optional
+            folder where SWAT runs, like a workspace (default is the project folder)
+        output : str, OutputHandler or list of OutputHandler
+            what is done with the output, see run. The default is to discard it
+        progress : callable, optional
+            called with (year, day) while the simulation advances
+
+        Returns
+        -------
+        return code of SWAT. asyncio.TimeoutError is raised when the run exceeds the timeout
+        """
+        if self.async_runner is None:
+            self.async_runner = AsyncRunner(self.wrapper)
+        staged = folder is None and self.staging is not None
+        folder = self.project_folder_path if folder is None else folder
+        logger.debug("Running SWAT in folder: " + folder)
+        with self.telemetry.span('run_async', folder=folder) as span:
+            if staged:
+                folder = self._stage(span)
+            write_run_values(folder, None)
+            span['return_code'] = await self.async_runner.execute(folder, output=output, progress=progress)
+            if staged:
+                self._collect()
+        return span['return_code']
+
+    async def run_ensemble_async(self, folders, max_workers=None, timeout=None, output='discard', progress=None):
+        """ Coroutine that runs SWAT in many project folders, like run_ensemble
+
+        Parameters
+        ----------
+        folders : iterable of str
+            project folders, one independent copy of the project for each run
+        max_workers : int, optional
+            maximum number of simultaneous runs (default is the number of cpus)
+        timeout : float, optional
+            maximum time in seconds for each run. Runs exceeding it are killed
+        output : str, OutputHandler, list of OutputHandler or callable
+            what is done with the output of each run. A callable receives the folder and
+            returns the output, like a log file inside the folder
+        progress : callable, optional
+            called with (folder, year, day) while the simulations advance
+
+        Returns
+        -------
+        list of EnsembleResult, in the order of folders
+        """
+        runner = AsyncRunner(self.wrapper, max_workers=max_workers, timeout=timeout)
+        results = await runner.run_all(folders, output=output, progress=progress)
+        for result in results:
+            self._record_run('ensemble_run', result)
+        return results
 
     def async_is_running(self) -> bool:
         if self.async_process is None:
@@ -124,9 +601,9 @@ class SWAT(object):
         return self.async_process.poll()
 
     def sufi2_run_async_kill(self):
-        if self.sufi2_async_is_running():
+        if self.async_is_running():
             logger.debug("Found a async process running. Killing it!")
-            self.async_process.kill()
+            kill(self.async_process)
 
     def sufi2_async_wait(self):
         logger.debug("Waiting async")
@@ -136,26 +613,46 @@ class SWAT(object):
         path = os.path.join(self.project_folder_path, 'file.cio')
         return self.wrapper.read_file_cio(path)
 
-    def read_precipitation_daily(self, filename):
-        """Prints what the animals name is and what sound it makes.
-
-        If the argument `sound` isn't passed in, the default Animal
-        sound is used.
+    def write_file_cio(self, values):
+        """
+        Changes values of the file.cio of the project. Only the lines of the changed values
+        are rewritten, the rest of the file is kept as it is.
 
         Parameters
         ----------
-        sound : str, optional
-            The sound the animal makes (default is None)
+        values : dict
+            new values, with the keys returned by read_file_cio, like {'NBYR': 10, 'IPRINT': 1}
 
-        Raises
-        ------
-        NotImplementedError
-            If no sound is set for the animal or passed in as a
-            parameter.
+        Returns
+        -------
+        list with the keys that were changed
+        """
+        path = os.path.join(self.project_folder_path, 'file.cio')
+        logger.debug("Writing file: " + path)
+        with self.telemetry.span('write_file_cio', file=path) as span:
+            span['changed'] = self.wrapper.write_file_cio(path, values)
+        return span['changed']
+
+    def read_precipitation_daily(self, filename, dates=False, compact=False):
+        """ Reads a daily precipitation file of the project folder
+
+        Parameters
+        ----------
+        filename : str
+            file name inside the project folder
+        dates : bool
+            when True the index of the data is a DatetimeIndex built from year and day, so no
+            date conversion is needed to join it with other series
+        compact : bool
+            when True year and day are int32 and the gauges float32, about half the memory
+
+        Returns
+        -------
+        info, data : DataFrame with the gauge information and DataFrame with the data
         """
         path = os.path.join(self.project_folder_path, filename)
         logger.debug("Reading file: " + path)
-        return self.wrapper.read_precipitation_daily(path)
+        return self._read('read_precipitation_daily', path, dates=dates, compact=compact)
 
     def write_precipitation_daily(self, filename, info, dataframe):
         """Prints what the animals name is and what sound it makes.
@@ -176,35 +673,224 @@ class SWAT(object):
         """
         path = os.path.join(self.project_folder_path, filename)
         logger.debug("Writing file: " + path)
-        return self.wrapper.write_precipitation_daily(path,info,dataframe)
+        with self.telemetry.span('write_precipitation_daily', file=path, rows=len(dataframe)):
+            return self.wrapper.write_precipitation_daily(path,info,dataframe)
 
-    def read_precipitation_sub_daily(self, filename):
-        """Prints what the animals name is and what sound it makes.
-
-        If the argument `sound` isn't passed in, the default Animal
-        sound is used.
+    def read_precipitation_sub_daily(self, filename, chunksize=None, dates=False, compact=False):
+        """ Reads a sub daily precipitation file of the project folder
 
         Parameters
         ----------
-        sound : str, optional
-            The sound the animal makes (default is None)
-
-        Raises
-        ------
-        NotImplementedError
-            If no sound is set for the animal or passed in as a
-            parameter.
+        filename : str
+            file name inside the project folder
+        chunksize : int, optional
+            when informed, the data is read in chunks of at most chunksize lines
+        dates : bool
+            when True the index of the data is a DatetimeIndex with the date and time
+        compact : bool
+            when True the time columns are int32 and the gauges float32
+
+        Returns
+        -------
+        info, data : DataFrame with the gauge information and DataFrame with the data, or a
+            generator of DataFrames when chunksize is informed
         """
         path = os.path.join(self.project_folder_path, filename)
         logger.debug("Reading file: " + path)
-        return self.wrapper.read_precipitation_sub_daily(path)
+        if chunksize is not None:
+            return self.wrapper.read_precipitation_sub_daily(path, chunksize=chunksize, dates=dates, compact=compact)
+        return self._read('read_precipitation_sub_daily', path, dates=dates, compact=compact)
 
     def write_precipitation_sub_daily(self, filename, info, dataframe):
         path = os.path.join(self.project_folder_path, filename)
         logger.debug("Writing file: " + path)
-        return self.wrapper.write_precipitation_sub_daily(path,info,dataframe)
+        with self.telemetry.span('write_precipitation_sub_daily', file=path, rows=len(dataframe)):
+            return self.wrapper.write_precipitation_sub_daily(path,info,dataframe)
 
-    def read_output_rch(self, filename):
-        path = os.path.join(self.project_folder_path, filename)
+    def read_output_rch(self, filename, columns=None, reaches=None, start=None, end=None, dates=False,
+                        compact=False):
+        """ Reads an output.rch file of the project folder
+
+        Only the requested columns, reaches and dates are parsed, which is much faster than
+        filtering the full table.
+
+        Parameters
+        ----------
+        filename : str
+            file name inside the project folder
+        columns : list of str, optional
+            variables to read, as in the file header (ex: 'FLOW_OUTcms'). RCH, GIS and MON
+            are always returned
+        reaches : list of int, optional
+            reaches to read
+        start : date or str, optional
+            first date to read. Dates are computed with IYR, NYSKIP and IPRINT of file.cio,
+            or the ones of the run that wrote the file when run changed them
+        end : date or str, optional
+            last date to read
+        dates : bool
+            when True the index is a DatetimeIndex with the date of each line, computed from
+            the MON column with IYR, NYSKIP and IPRINT of file.cio. Yearly totals and the
+            average of the simulation get NaT
+        compact : bool
+            when True REACH is a category, the ids int32 and the values float32, about a third
+            of the memory
+
+        Returns
+        -------
+        DataFrame
+        """
+        path = self._output_path(filename)
+        logger.debug("Reading file: " + path)
+        file_cio = self._file_cio_for_dates(path, start, end, dates)
+        return self._read('read_output_rch', path, columns=columns, reaches=reaches, start=start, end=end,
+                          file_cio=file_cio, dates=dates, compact=compact)
+
+    def iter_output_rch(self, filename, chunksize=100000, columns=None, reaches=None, start=None, end=None,
+                        dates=False, compact=False):
+        """ Reads an output.rch file of the project folder in chunks
+
+        Each chunk has at most chunksize lines, so files larger than the memory can be
+        aggregated or filtered. The other parameters are the same of read_output_rch.
+
+        Parameters
+        ----------
+        filename : str
+            file name inside the project folder
+        chunksize : int
+            maximum number of lines of each chunk
+
+        Returns
+        -------
+        generator of DataFrame
+        """
+        path = self._output_path(filename)
+        logger.debug("Reading file in chunks: " + path)
+        file_cio = self._file_cio_for_dates(path, start, end, dates)
+        return self.wrapper.iter_output_rch(path, chunksize=chunksize, columns=columns, reaches=reaches,
+                                            start=start, end=end, file_cio=file_cio, dates=dates, compact=compact)
+
+    def read_output_sub(self, filename, columns=None, subbasins=None, start=None, end=None, dates=False):
+        """ Reads an output.sub file of the project folder
+
+        Ids are returned as category or int32 and values as float32. The other parameters
+        are the same of read_output_rch.
+
+        Parameters
+        ----------
+        filename : str
+            file name inside the project folder
+        subbasins : list of int, optional
+            subbasins to read
+
+        Returns
+        -------
+        DataFrame
+        """
+        path = self._output_path(filename)
+        logger.debug("Reading file: " + path)
+        file_cio = self._file_cio_for_dates(path, start, end, dates)
+        return self._read('read_output_sub', path, columns=columns, subbasins=subbasins, start=start, end=end,
+                          file_cio=file_cio, dates=dates)
+
+    def read_output_hru(self, filename, columns=None, hrus=None, subbasins=None, start=None, end=None,
+                        dates=False):
+        """ Reads an output.hru file of the project folder
+
+        Ids are returned as category or int32 and values as float32. For files larger than
+        the memory use iter_output_hru. The other parameters are the same of read_output_rch.
+
+        Parameters
+        ----------
+        filename : str
+            file name inside the project folder
+        hrus : list of int, optional
+            hrus to read
+        subbasins : list of int, optional
+            subbasins to read
+
+        Returns
+        -------
+        DataFrame
+        """
+        path = self._output_path(filename)
+        logger.debug("Reading file: " + path)
+        file_cio = self._file_cio_for_dates(path, start, end, dates)
+        return self._read('read_output_hru', path, columns=columns, hrus=hrus, subbasins=subbasins, start=start,
+                          end=end, file_cio=file_cio, dates=dates)
+
+    def iter_output_hru(self, filename, chunksize=100000, columns=None, hrus=None, subbasins=None, start=None,
+                        end=None, dates=False):
+        """ Reads an output.hru file of the project folder in chunks of at most chunksize lines
+
+        Returns
+        -------
+        generator of DataFrame
+        """
+        path = self._output_path(filename)
+        logger.debug("Reading file in chunks: " + path)
+        file_cio = self._file_cio_for_dates(path, start, end, dates)
+        return self.wrapper.iter_output_hru(path, chunksize=chunksize, columns=columns, hrus=hrus,
+                                            subbasins=subbasins, start=start, end=end, file_cio=file_cio, dates=dates)
+
+    def read_output_rsv(self, filename, columns=None, reservoirs=None, start=None, end=None, dates=False):
+        """ Reads an output.rsv file of the project folder
+
+        Ids are returned as category or int32 and values as float32. The other parameters
+        are the same of read_output_rch.
+
+        Parameters
+        ----------
+        filename : str
+            file name inside the project folder
+        reservoirs : list of int, optional
+            reservoirs to read
+
+        Returns
+        -------
+        DataFrame
+        """
+        path = self._output_path(filename)
         logger.debug("Reading file: " + path)
-        return self.wrapper.read_output_rch(path)
+        file_cio = self._file_cio_for_dates(path, start, end, dates)
+        return self._read('read_output_rsv', path, columns=columns, reservoirs=reservoirs, start=start, end=end,
+                          file_cio=file_cio, dates=dates)
+
+    def _parameters(self):
+        """ Parameter engine of the project folder, created when it is first used """
+        if self.project_folder_path is None:
+            raise ValueError("Project folder not set")
+        if self.parameter_engine is None:
+            self.parameter_engine = ParameterEngine(self.project_folder_path)
+        return self.parameter_engine
+
+    def _output_path(self, filename):
+        """ Path of an output file: in the staging folder when the last run left it there """
+        if self.staging is not None:
+            path = self.staging.output_path(filename)
+            if path is not None:
+                return path
+        return os.path.join(self.project_folder_path, filename)
+
+    def _file_cio_for_dates(self, path, start, end, dates=False):
+        """ file.cio values of the outputs in the folder of path, read only when a date interval or
+        the dates are requested. The values changed only for the run (see run) replace the file ones """
+        if start is None and end is None and not dates:
+            return None
+        file_cio = self.read_file_cio()
+        file_cio.update(read_run_values(os.path.dirname(path)))
+        return file_cio
+
+    def _read(self, reader, path, **arguments):
+        """ Calls a reader of the module, through the output cache when it is enabled """
+        function = getattr(self.wrapper, reader)
+        with self.telemetry.span(reader, file=path) as span:
+            if self.telemetry.enabled:
+                span['bytes'] = os.path.getsize(path)
+            if self.output_cache is None:
+                return function(path, **arguments)
+            hits = self.output_cache.hits
+            result = self.output_cache.load(path, self.wrapper.get_version() + '.' + reader, arguments,
+                                            lambda: function(path, **arguments))
+            span['cache_hit'] = self.output_cache.hits > hits
+            return result
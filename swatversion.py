@@ -1,3 +1,4 @@
+import importlib
 from enum import Enum
 
 
@@ -5,3 +6,18 @@ class SWATVersion(Enum):
     """ SWAT version - links to the relative path"""
     SWAT2012REV670 = 'swat2012_rev670'
     SWAT2012REV637 = 'swat2012_rev637'
+
+
+# Module and class of each version. They are imported only when a version is used
+VERSION_CLASSES = {
+    SWATVersion.SWAT2012REV670: ('swatpython.swat2012rev670.swat2012rev670', 'SWAT2012rev670'),
+    SWATVersion.SWAT2012REV637: ('swatpython.swat2012rev637.swat2012rev637', 'SWAT2012rev637'),
+}
+
+
+def version_class(version):
+    """ Class of the swatpython module of a SWATVersion, importing its module """
+    if version not in VERSION_CLASSES:
+        raise ValueError("SWAT version not supported: " + str(version))
+    module, name = VERSION_CLASSES[version]
+    return getattr(importlib.import_module(module), name)
@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import fnmatch
+import logging
+import threading
+from contextlib import contextmanager
+from swatpython.workspace import OUTPUT_PATTERNS
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetrySink(object):
+    """
+    Receives the records of the telemetry. A record is a dictionary with the name of the
+    span, its start (unix time), its duration in seconds and the attributes of the span
+    """
+
+    def write(self, record):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class LoggingSink(TelemetrySink):
+    """ Writes the records to a logger """
+
+    def __init__(self, level=logging.INFO, target=None):
+        """
+        Parameters
+        ----------
+        level : int
+            logging level of the records
+        target : logging.Logger, optional
+            logger used, the logger of this module by default
+        """
+        self.level = level
+        self.target = logger if target is None else target
+
+    def write(self, record):
+        attributes = ' '.join(key + '=' + str(value) for key, value in record.items()
+                              if key not in ('name', 'start', 'duration'))
+        self.target.log(self.level, record['name'] + ' %.3fs ' % record['duration'] + attributes)
+
+
+class JsonLinesSink(TelemetrySink):
+    """ Appends each record to a file as a line of JSON """
+
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path : str
+            file where the records are appended
+        """
+        self.path = path
+        self.file = open(path, 'a')
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, default=str) + '\n'
+        with self._lock:
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class CallbackSink(TelemetrySink):
+    """ Calls a function with each record """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def write(self, record):
+        self.callback(record)
+
+
+class Telemetry(object):
+    """
+    Timing spans and resource usage of the operations of SWAT: runs, readers and writers.
+    Nothing is recorded while there are no sinks.
+    """
+
+    def __init__(self, sinks=None):
+        """
+        Parameters
+        ----------
+        sinks : list of TelemetrySink or callable
+            where the records are sent. A callable receives each record
+        """
+        self.sinks = []
+        for sink in sinks or []:
+            self.add_sink(sink)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.sinks)
+
+    def add_sink(self, sink):
+        if not isinstance(sink, TelemetrySink):
+            sink = CallbackSink(sink)
+        self.sinks.append(sink)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        Measures the time of the block. The attributes are sent with the record, and more can
+        be added to the dictionary returned by the context manager
+
+        Parameters
+        ----------
+        name : str
+            name of the operation, like 'run' or 'read_output_rch'
+        """
+        start = time.time()
+        counter = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException as error:
+            attributes['error'] = repr(error)
+            raise
+        finally:
+            if self.sinks:
+                record = {'name': name, 'start': start, 'duration': time.perf_counter() - counter}
+                record.update(attributes)
+                self.emit(record)
+
+    def record(self, name, duration, **attributes):
+        """ Sends the record of an operation measured elsewhere, which ended now """
+        if self.sinks:
+            record = {'name': name, 'start': time.time() - duration, 'duration': duration}
+            record.update(attributes)
+            self.emit(record)
+
+    def emit(self, record):
+        """ Sends a record to all sinks. A failing sink does not stop the operation measured """
+        for sink in self.sinks:
+            try:
+                sink.write(record)
+            except Exception:
+                logger.exception("Telemetry sink failed: " + repr(sink))
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+def output_bytes(folder, output_patterns=None):
+    """ Total size of the output files of SWAT in folder """
+    patterns = OUTPUT_PATTERNS if output_patterns is None else output_patterns
+    total = 0
+    for entry in os.scandir(folder):
+        name = entry.name.lower()
+        if any(fnmatch.fnmatch(name, pattern) for pattern in patterns) and entry.is_file():
+            total += entry.stat().st_size
+    return total
@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import pytest
+from swatpython.ensemble import EnsembleRunner
+from swatpython.operationalsystem import OperationalSystem
+from swatpython.swat2012rev670.swat2012rev670 import SWAT2012rev670
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason="uses /proc")
+
+# Custom executable that starts a long child, like a wrapper script around SWAT
+WRAPPER = """#!/bin/sh
+if [ -f quick ]; then exit 0; fi
+sleep 30 &
+echo $! > child.pid
+wait
+"""
+
+
+def alive(pid):
+    """ True while the process exists and is not a zombie """
+    try:
+        with open('/proc/' + str(pid) + '/stat') as fo:
+            return fo.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+def child_pid(folder):
+    path = os.path.join(folder, 'child.pid')
+    deadline = time.monotonic() + 5
+    while not os.path.exists(path) or not open(path).read().strip():
+        assert time.monotonic() < deadline, "the executable did not start"
+        time.sleep(0.01)
+    return int(open(path).read())
+
+
+@pytest.fixture
+def wrapper(tmp_path):
+    executable = tmp_path / 'swat.sh'
+    executable.write_text(WRAPPER)
+    executable.chmod(0o755)
+    module = SWAT2012rev670(OperationalSystem.LINUX)
+    module.set_custom_swat(str(executable))
+    return module
+
+
+def test_timeout_kills_the_executable(wrapper, tmp_path):
+    folder = tmp_path / 'run'
+    folder.mkdir()
+    results = list(EnsembleRunner(wrapper, timeout=0.5).run([str(folder)]))
+    assert results[0].timed_out
+    assert not alive(child_pid(str(folder)))
+
+
+def test_closing_the_runner_kills_the_executable(wrapper, tmp_path):
+    quick, slow = tmp_path / 'quick', tmp_path / 'slow'
+    for folder in (quick, slow):
+        folder.mkdir()
+    (quick / 'quick').write_text('')
+    runs = EnsembleRunner(wrapper, max_workers=2).run([str(quick), str(slow)])
+    assert next(runs).folder == str(quick)
+    pid = child_pid(str(slow))
+    runs.close()
+    assert not alive(pid)
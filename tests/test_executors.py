@@ -0,0 +1,138 @@
+import os
+import sys
+import time
+import signal
+import threading
+import multiprocessing
+import pytest
+from multiprocessing import AuthenticationError
+from swatpython.executors import QueueExecutor, QueueWorker
+from swatpython.swat import SWAT
+from swatpython.swatversion import SWATVersion
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason="forks workers and uses /proc")
+
+AUTHKEY = b'secret'
+
+# Custom executable: the first run with GW_DELAY 999 records its worker and hangs, a run with
+# GW_DELAY 777 hangs in a child, like a wrapper script around SWAT, and the others are quick
+EXECUTABLE = """#!/bin/sh
+if grep -q '^ *777' 000010001.gw; then
+    sleep 30 &
+    echo $! > "%(child)s"
+    wait
+fi
+if grep -q '^ *999' 000010001.gw && [ ! -f "%(slow)s" ]; then
+    echo $PPID $$ > "%(slow)s.tmp"
+    mv "%(slow)s.tmp" "%(slow)s"
+    exec sleep 30
+fi
+exit 0
+"""
+
+GW = """ .gw file Subbasin:1 HRU:1 Luse:AGRL Soil: 1234 Slope: 0-9999
+          31.0000    | GW_DELAY : Groundwater delay [days]
+"""
+
+
+def alive(pid):
+    """ True while the process exists and is not a zombie """
+    try:
+        with open('/proc/' + str(pid) + '/stat') as fo:
+            return fo.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+def extract(folder):
+    with open(os.path.join(folder, '000010001.gw')) as fo:
+        return {'GW_DELAY': float(fo.readlines()[1].split()[0])}
+
+
+@pytest.fixture
+def swat(tmp_path):
+    executable = tmp_path / 'swat.sh'
+    executable.write_text(EXECUTABLE % {'slow': tmp_path / 'slow.pid', 'child': tmp_path / 'child.pid'})
+    executable.chmod(0o755)
+    project = tmp_path / 'project'
+    project.mkdir()
+    (project / '000010001.gw').write_text(GW)
+    swat = SWAT(SWATVersion.SWAT2012REV670)
+    swat.set_custom_swat(str(executable))
+    swat.set_project_folder(str(project))
+    return swat
+
+
+def serve(swat, address, root):
+    QueueWorker(swat, address, AUTHKEY, extract=extract, root=root).serve()
+
+
+def kill_slow_worker(path, killed):
+    """ Kills the worker running the hanging task, and the task, as soon as it starts """
+    deadline = time.monotonic() + 10
+    while not os.path.exists(path):
+        if time.monotonic() > deadline:
+            return
+        time.sleep(0.01)
+    worker, run = [int(pid) for pid in open(path).read().split()]
+    os.kill(worker, signal.SIGKILL)
+    killed.append(worker)
+    # The run is in its own session and outlives its worker
+    os.killpg(run, signal.SIGKILL)
+
+
+def test_task_of_a_killed_worker_is_requeued(swat, tmp_path):
+    context = multiprocessing.get_context('fork')
+    with QueueExecutor(('127.0.0.1', 0), authkey=AUTHKEY) as executor:
+        workers = [context.Process(target=serve, args=(swat, executor.address, str(tmp_path))) for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        killed = []
+        killer = threading.Thread(target=kill_slow_worker, args=(str(tmp_path / 'slow.pid'), killed))
+        killer.start()
+        try:
+            tasks = [(task, {'v__GW_DELAY.gw': delay}) for task, delay in enumerate([999, 10, 20, 30, 40, 50])]
+            results = {task: (result, values) for task, result, values in executor.map(tasks)}
+        finally:
+            killer.join()
+    assert len(killed) == 1
+    assert sorted(results) == list(range(6))
+    for task, delay in enumerate([999, 10, 20, 30, 40, 50]):
+        result, values = results[task]
+        assert result.success
+        assert values == {'GW_DELAY': delay}
+    # The worker left gets the stop of close
+    for worker in workers:
+        worker.join(10)
+        if worker.pid in killed:
+            assert worker.exitcode == -signal.SIGKILL
+        else:
+            assert worker.exitcode == 0
+    assert not any(alive(worker.pid) for worker in workers)
+
+
+def test_wrong_authkey_is_rejected(swat, tmp_path):
+    with QueueExecutor(('127.0.0.1', 0), authkey=AUTHKEY) as executor:
+        with pytest.raises(AuthenticationError):
+            QueueWorker(swat, executor.address, b'wrong', root=str(tmp_path)).serve()
+        assert executor.workers == 0
+        # The coordinator still accepts the right key
+        worker = threading.Thread(target=serve, args=(swat, executor.address, str(tmp_path)))
+        worker.start()
+        results = list(executor.map([(0, {'v__GW_DELAY.gw': 10})]))
+    worker.join(10)
+    assert not worker.is_alive()
+    assert results[0][2] == {'GW_DELAY': 10}
+
+
+def test_timeout_kills_the_executable(swat, tmp_path):
+    with QueueExecutor(('127.0.0.1', 0), authkey=AUTHKEY) as executor:
+        worker = QueueWorker(swat, executor.address, AUTHKEY, extract=extract, timeout=0.5, root=str(tmp_path))
+        thread = threading.Thread(target=worker.serve)
+        thread.start()
+        results = {task: (result, values) for task, result, values in
+                   executor.map([(0, {'v__GW_DELAY.gw': 777}), (1, {'v__GW_DELAY.gw': 10})])}
+    thread.join(10)
+    assert results[0][0].timed_out and results[0][1] is None
+    assert results[1][1] == {'GW_DELAY': 10}
+    assert not alive(int(open(str(tmp_path / 'child.pid')).read()))
@@ -0,0 +1,78 @@
+import os
+import shutil
+import pytest
+from swatpython.filecio import FileCioLayout, SWAT2012_FILE_CIO
+
+# file.cio written by ArcSWAT for SWAT2012, with CRLF line endings
+FILE_CIO = os.path.join(os.path.dirname(__file__), 'data', 'file.cio')
+
+layout = FileCioLayout(SWAT2012_FILE_CIO)
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / 'file.cio')
+    shutil.copyfile(FILE_CIO, path)
+    return path
+
+
+def read_lines(path):
+    with open(path, 'rb') as fo:
+        return fo.read().split(b'\r\n')
+
+
+def test_read(path):
+    values = layout.read(path)
+    assert values['NBYR'] == 10 and values['IYR'] == 2000 and values['NYSKIP'] == 3
+    assert values['REXP'] == 1.3
+    assert values['RFILE1_6'] == ['pcp1.pcp', 'pcp2.pcp'] and values['RFILE7_12'] == []
+    assert values['BSNFILE'] == 'basins.bsn' and values['SLRFILE'] == ''
+    assert values['IPDVAR'] == [0] * 20 and values['IPDVAB'] == [0] * 15
+    assert values['ICALEN'] == 0
+
+
+def test_unchanged_values_keep_the_file(path):
+    with open(path, 'rb') as fo:
+        original = fo.read()
+    assert layout.write(path, layout.read(path)) == []
+    with open(path, 'rb') as fo:
+        assert fo.read() == original
+
+
+def test_edits_keep_descriptions_and_line_endings(path):
+    original = read_lines(path)
+    codes = [1, 2, 6] + [0] * 17
+    values = {'BSNFILE': 'basins2.bsn', 'RFILE1_6': ['pcp1.pcp', 'pcp2.pcp', 'pcp3.pcp'], 'IPDVAR': codes,
+              'REXP': 1.25, 'NBYR': 12, 'CALFILE': 'calib.cal'}
+    assert sorted(layout.write(path, values)) == sorted(values)
+    lines = read_lines(path)
+    assert len(lines) == len(original) and lines[-1] == b''
+    changed = {number for number, (key, _) in enumerate(SWAT2012_FILE_CIO) if key in values}
+    for number, (line, old) in enumerate(zip(lines, original)):
+        if number not in changed:
+            assert line == old
+        elif b'|' in old:
+            # Same description, in the same column
+            assert line[line.index(b'|'):] == old[old.index(b'|'):]
+            assert line.index(b'|') == old.index(b'|')
+    assert lines[layout.lines['REXP'][0]] == b'           1.250    | REXP : Exponent for IDIST=1'
+    assert lines[layout.lines['NBYR'][0]] == b'              12    | NBYR : Number of years simulated'
+    assert lines[layout.lines['RFILE1_6'][0]] == b'pcp1.pcp     pcp2.pcp     pcp3.pcp'
+    assert lines[layout.lines['IPDVAR'][0]] == b'   1   2   6' + b'   0' * 17
+    assert b'\n' not in b''.join(lines)
+    new_values = layout.read(path)
+    for key, value in values.items():
+        assert new_values[key] == value
+
+
+def test_rejects_bad_values(path):
+    with open(path, 'rb') as fo:
+        original = fo.read()
+    with pytest.raises(ValueError, match='Unknown'):
+        layout.write(path, {'NBYR': 12, 'NOT_A_KEY': 1})
+    with pytest.raises(ValueError, match='12 characters'):
+        layout.write(path, {'BSNFILE': 'a_long_basin.bsn'})
+    with pytest.raises(ValueError, match='12 characters'):
+        layout.write(path, {'RFILE1_6': ['pcp1.pcp', 'precipitation.pcp']})
+    with open(path, 'rb') as fo:
+        assert fo.read() == original
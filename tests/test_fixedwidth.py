@@ -0,0 +1,79 @@
+import numpy
+import pandas as pd
+import pytest
+from swatpython.fixedwidth import render_int, render_fixed
+from swatpython.operationalsystem import OperationalSystem
+from swatpython.swat2012rev670.swat2012rev670 import SWAT2012rev670
+
+GAUGES = 6
+# 1999 to 2002, with a leap year
+DAYS = [(year, day) for year in range(1999, 2003) for day in range(1, (366 if year == 2000 else 365) + 1)]
+
+
+@pytest.fixture
+def module():
+    return SWAT2012rev670(OperationalSystem.LINUX)
+
+
+@pytest.fixture
+def info():
+    names = ['pcp' + str(i) for i in range(1, GAUGES + 1)]
+    return pd.DataFrame([['Station'] + names, ['Lati'] + [-23.5] * GAUGES, ['Long'] + [-47.1] * GAUGES,
+                         ['Elev'] + [600] * GAUGES])
+
+
+@pytest.fixture
+def dataframe(info):
+    """ Daily precipitation with gaps (nan and the -99 of SWAT), negatives and rounding ties """
+    random = numpy.random.default_rng(3)
+    values = numpy.round(random.gamma(0.4, 12.0, (len(DAYS), GAUGES)), 1)
+    values[random.random(values.shape) < 0.05] = -99.0
+    values[random.random(values.shape) < 0.02] = numpy.nan
+    values[:10, 0] = [-0.1, -9.9, -0.0, 0.25, 2.675, 999.9, 0.05, -0.05, 99.95, 12.35]
+    dataframe = pd.DataFrame(values, columns=list(info.iloc[0, 1:]))
+    dataframe.insert(0, 'day', [day for _, day in DAYS])
+    dataframe.insert(0, 'year', [year for year, _ in DAYS])
+    return dataframe
+
+
+def savetxt_precipitation_daily(module, filename, info, dataframe):
+    """ Writer used before the vectorized rendering """
+    with open(filename, "w") as fo:
+        param_count = module._write_precipitation_info(fo, info)
+        numpy.savetxt(fo, dataframe.to_numpy(), fmt="%4i%03i" + "%05.1f" * param_count)
+
+
+def test_same_bytes_as_savetxt(module, info, dataframe, tmp_path):
+    module.write_precipitation_daily(str(tmp_path / 'new.pcp'), info, dataframe)
+    savetxt_precipitation_daily(module, str(tmp_path / 'old.pcp'), info, dataframe)
+    assert (tmp_path / 'new.pcp').read_bytes() == (tmp_path / 'old.pcp').read_bytes()
+
+
+def test_round_trip(module, info, dataframe, tmp_path):
+    path = str(tmp_path / 'pcp1.pcp')
+    module.write_precipitation_daily(path, info, dataframe)
+    read_info, read_dataframe = module.read_precipitation_daily(path)
+    expected = dataframe.copy()
+    # The format has one decimal: the ties are rounded by python
+    expected.iloc[:10, 2] = [float('%.1f' % value) for value in dataframe.iloc[:10, 2]]
+    pd.testing.assert_frame_equal(read_dataframe, expected)
+    assert list(read_info.iloc[0]) == list(info.iloc[0])
+
+
+def test_render_like_python_format(dataframe):
+    values = dataframe.iloc[:, 2:].to_numpy().ravel()
+    for width, decimals, zero_pad in [(5, 1, True), (5, 1, False), (8, 3, False), (10, 2, True)]:
+        text_format = '%' + ('0' if zero_pad else '') + str(width) + '.' + str(decimals) + 'f'
+        expected = [(text_format % value).encode() for value in values]
+        assert [row.tobytes() for row in render_fixed(values, width, decimals, zero_pad)] == expected
+
+    days = dataframe['day'].to_numpy()
+    assert [row.tobytes() for row in render_int(days, 3, zero_pad=True)] == [b'%03i' % day for day in days]
+    assert [row.tobytes() for row in render_int(-days, 5)] == [b'%5i' % -day for day in days]
+
+
+def test_values_that_do_not_fit(dataframe):
+    assert render_fixed(numpy.array([1.0, 1000.0]), 5, 1) is None
+    assert render_fixed(numpy.array([-100.0]), 5, 1) is None
+    assert render_int(numpy.array([1000]), 3) is None
+    assert render_int(numpy.array([1.0, numpy.nan]), 4) is None
@@ -0,0 +1,85 @@
+import numpy
+import pytest
+from swatpython import metrics
+from swatpython.metrics import evaluate, nse, kge, pbias, r2, rsr
+
+WARMUP = 30
+
+
+def reference(simulated, observed):
+    """ Metrics of one run, computed directly from their definitions """
+    mask = numpy.isfinite(observed)
+    s, o = simulated[mask], observed[mask]
+    sse = ((s - o) ** 2).sum()
+    observed_ss = ((o - o.mean()) ** 2).sum()
+    r = numpy.corrcoef(s, o)[0, 1]
+    return {
+        'NSE': 1 - sse / observed_ss,
+        'KGE': 1 - numpy.sqrt((r - 1) ** 2 + (s.std() / o.std() - 1) ** 2 + (s.mean() / o.mean() - 1) ** 2),
+        'PBIAS': 100 * (o - s).sum() / o.sum(),
+        'R2': r ** 2,
+        'RSR': numpy.sqrt(sse) / numpy.sqrt(observed_ss),
+    }
+
+
+def ensemble(shape, seed):
+    """ Simulated runs around an observed series with gaps, and gaps in the warmup too """
+    random = numpy.random.default_rng(seed)
+    time = shape[-1]
+    observed = 10 + 5 * numpy.sin(numpy.arange(time) / 20.0) + random.gamma(2.0, 1.0, shape[1:])
+    observed[random.random(observed.shape) < 0.15] = numpy.nan
+    observed[..., :WARMUP // 2] = numpy.nan
+    scale = random.uniform(0.5, 1.5, shape[:-1] + (1,))
+    simulated = numpy.nan_to_num(observed, nan=10.0) * scale + random.normal(0, 2, shape)
+    return simulated, observed
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # Several chunks of runs, with a partial last one
+    monkeypatch.setattr(metrics, 'CHUNK_RUNS', 16)
+
+
+def test_runs_against_the_definitions():
+    simulated, observed = ensemble((50, 400), 1)
+    results = evaluate(simulated, observed, warmup=WARMUP)
+    for run in range(len(simulated)):
+        expected = reference(simulated[run, WARMUP:], observed[WARMUP:])
+        for name in metrics.METRICS:
+            assert results[name][run] == pytest.approx(expected[name], rel=1e-9, abs=1e-12), name
+
+
+def test_reaches_against_the_definitions():
+    simulated, observed = ensemble((37, 3, 300), 2)
+    results = evaluate(simulated, observed, warmup=WARMUP)
+    assert results['NSE'].shape == (37, 3)
+    for run in range(simulated.shape[0]):
+        for reach in range(simulated.shape[1]):
+            expected = reference(simulated[run, reach, WARMUP:], observed[reach, WARMUP:])
+            for name in metrics.METRICS:
+                assert results[name][run, reach] == pytest.approx(expected[name], rel=1e-9, abs=1e-12), name
+
+
+def test_single_metric_functions():
+    simulated, observed = ensemble((20, 200), 3)
+    results = evaluate(simulated, observed, warmup=WARMUP)
+    for name, function in [('NSE', nse), ('KGE', kge), ('PBIAS', pbias), ('R2', r2), ('RSR', rsr)]:
+        numpy.testing.assert_array_equal(function(simulated, observed, warmup=WARMUP), results[name])
+
+
+def test_series_without_information():
+    simulated = numpy.ones((4, 2, 10))
+    observed = numpy.array([numpy.full(10, numpy.nan), numpy.full(10, 3.0)])
+    results = evaluate(simulated, observed)
+    for name in ('NSE', 'KGE', 'R2', 'RSR'):
+        assert numpy.isnan(results[name]).all()
+    assert numpy.isnan(results['PBIAS'][:, 0]).all()
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        evaluate(numpy.ones(10), numpy.ones(10))
+    with pytest.raises(ValueError):
+        evaluate(numpy.ones((2, 10)), numpy.ones(9))
+    with pytest.raises(ValueError):
+        evaluate(numpy.ones((2, 10)), numpy.ones(10), metrics=['MSE'])
@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import pytest
+from swatpython.swat import SWAT
+from swatpython.swatversion import SWATVersion
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason="uses /proc")
+
+# Writes output.rch one day at a time and never finishes
+WRITER = """import time
+with open('output.rch', 'w') as fo:
+    fo.write(''.join(' SWAT line ' + str(i) + '\\n' for i in range(8)))
+    fo.write('       RCH      GIS   MON     AREAkm2 FLOW_OUTcms\\n')
+    day = 0
+    while True:
+        day += 1
+        fo.write('REACH %5d %8d %5d %11.4E %11.4E\\n' % (1, 1, day, 1.0, 0.5))
+        fo.flush()
+        time.sleep(0.01)
+"""
+
+# Custom executable that runs the writer in a child process, like a wrapper script around SWAT
+WRAPPER = """#!/bin/sh
+"%s" "%s" &
+echo $! > child.pid
+wait
+"""
+
+
+def alive(pid):
+    """ True while the process exists and is not a zombie """
+    try:
+        with open('/proc/' + str(pid) + '/stat') as fo:
+            return fo.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+def test_hopeless_run_is_killed(tmp_path):
+    writer = tmp_path / 'writer.py'
+    writer.write_text(WRITER)
+    executable = tmp_path / 'swat.sh'
+    executable.write_text(WRAPPER % (sys.executable, writer))
+    executable.chmod(0o755)
+    project = tmp_path / 'project'
+    project.mkdir()
+    swat = SWAT(SWATVersion.SWAT2012REV670)
+    swat.set_custom_swat(str(executable))
+    swat.set_project_folder(str(project))
+
+    start = time.monotonic()
+    monitor = swat.run_monitored(lambda data: len(data) >= 20, interval=0.05)
+    assert monitor.stopped
+    assert time.monotonic() - start < 10
+    assert len(monitor.data) >= 20
+    assert not alive(int(open(os.path.join(str(project), 'child.pid')).read()))
+    assert not swat.async_is_running()
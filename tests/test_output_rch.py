@@ -0,0 +1,81 @@
+import numpy
+import pandas as pd
+import pytest
+from swatpython.operationalsystem import OperationalSystem
+from swatpython.outputvariables import SWAT2012_RCH_VARIABLES
+from swatpython.swat2012rev670.swat2012rev670 import SWAT2012rev670
+
+# Layout of output.rch given to pandas.read_fwf before the fixed width parser
+WIDTHS = [7, 4, 9, 6] + [12] * 47
+
+# Daily printout of 2000 (leap year) and 2001
+FILE_CIO = {'IPRINT': 1, 'IYR': 2000, 'NYSKIP': 0}
+REACHES = 3
+
+
+@pytest.fixture(scope='module')
+def output_rch(tmp_path_factory):
+    """ output.rch of a daily run, with the averages of the simulation at the end, like SWAT writes it """
+    random = numpy.random.default_rng(7)
+    names = ['AREAkm2'] + [header for _, header in SWAT2012_RCH_VARIABLES]
+    lines = [' SWAT line ' + str(i) + '\n' for i in range(8)]
+    lines.append('       RCH      GIS   MON' + ''.join('%12s' % name for name in names) + '\n')
+    days = [day for year in (366, 365) for day in range(1, year + 1)]
+    for day in days:
+        for reach in range(1, REACHES + 1):
+            values = random.normal(0, 1, len(names)) * 10.0 ** random.integers(-30, 30, len(names))
+            lines.append('REACH %5d %8d %5d' % (reach, reach, day) + ''.join(' %11.4E' % v for v in values) + '\n')
+    for reach in range(1, REACHES + 1):
+        values = random.normal(0, 1, len(names))
+        lines.append('REACH %5d %8d %5.1f' % (reach, reach, 2.0) + ''.join(' %11.4E' % v for v in values) + '\n')
+    path = tmp_path_factory.mktemp('output') / 'output.rch'
+    path.write_text(''.join(lines))
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def module():
+    return SWAT2012rev670(OperationalSystem.LINUX)
+
+
+@pytest.fixture(scope='module')
+def expected(output_rch):
+    return pd.read_fwf(output_rch, widths=WIDTHS, header=8, index_col=None)
+
+
+def test_same_frame_as_read_fwf(module, output_rch, expected):
+    dataframe = module.read_output_rch(output_rch)
+    assert dataframe.shape == (REACHES * 732, 51)
+    pd.testing.assert_frame_equal(dataframe, expected)
+
+
+def test_chunks_match_the_full_read(module, output_rch, expected):
+    chunks = list(module.iter_output_rch(output_rch, chunksize=1000))
+    assert len(chunks) == 3
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+
+def test_columns_and_reaches(module, output_rch, expected):
+    dataframe = module.read_output_rch(output_rch, columns=['FLOW_OUTcms', 'TOT Nkg'], reaches=[1, 3])
+    selected = expected[expected['RCH'].isin([1, 3])][['RCH', 'GIS', 'MON', 'FLOW_OUTcms', 'TOT Nkg']]
+    pd.testing.assert_frame_equal(dataframe.reset_index(drop=True), selected.reset_index(drop=True))
+
+
+def test_dates(module, output_rch, expected):
+    dataframe = module.read_output_rch(output_rch, file_cio=FILE_CIO, dates=True)
+    daily = expected.iloc[:-REACHES]
+    year = 2000 + (daily.index >= REACHES * 366)
+    dates = pd.to_datetime(year.astype(str), format='%Y') + pd.to_timedelta(daily['MON'] - 1, unit='D')
+    assert list(dataframe.index[:-REACHES]) == list(dates)
+    assert dataframe.index[-REACHES:].isna().all()
+    pd.testing.assert_frame_equal(dataframe.reset_index(drop=True), expected)
+
+
+def test_date_interval(module, output_rch, expected):
+    dataframe = module.read_output_rch(output_rch, reaches=[2], start='2000-12-30', end='2001-01-02',
+                                       file_cio=FILE_CIO)
+    rows = expected[(expected['RCH'] == 2) & expected.index.isin(range(REACHES * 364, REACHES * 368))]
+    assert list(dataframe['MON']) == [365, 366, 1, 2]
+    # Without the lines of averages MON has only integers
+    rows = rows.astype({'MON': 'int64'})
+    pd.testing.assert_frame_equal(dataframe.reset_index(drop=True), rows.reset_index(drop=True))
@@ -0,0 +1,187 @@
+import os
+import pytest
+from swatpython.parameters import ParameterEngine, ParameterChange, _format
+from swatpython.workspace import create_workspace
+
+TITLE = " .%s file Subbasin:%d HRU:1 Luse:%s Soil: %s Slope: 0-9999 4/22/2015 12:00:00 AM ArcSWAT 2012.10_2.16"
+
+GW = """          1000.0000    | SHALLST : Initial depth of water in the shallow aquifer [mm]
+          31.0000    | GW_DELAY : Groundwater delay [days]
+           0.0480    | ALPHA_BF : BaseFlow alpha factor [days]
+        1000.0000    | GWQMN : Threshold depth of water in the shallow aquifer required for return flow to occur [mm]
+           0.0200    | GW_REVAP : Groundwater "revap" coefficient
+"""
+
+MGT = """ NMGT:0
+Initial Plant Growth Parameters
+           0    | IGRO: Land cover status: 0-none growing; 1-growing
+General Management Parameters
+           0    | BIOMIX: Biological mixing efficiency
+           %5.2f    | CN2: Initial SCS CN II value
+           0.00    | USLE_P: USLE equation support practice
+"""
+
+SOL = """ Soil Name: %s
+ Soil Hydrologic Group: %s
+ Maximum rooting depth(m) :     1500.00
+ Porosity fraction from which anions are excluded: 0.500
+ Crack volume potential of soil: 0.500
+ Texture 1                : %s
+ Depth                [mm]:      200.00     1500.00
+ Bulk Density Moist [g/cc]:        1.40        1.55
+ Ave. AW Incl. Rock Frag  :        0.18        0.15
+ Ksat. (est.)      [mm/hr]:       12.50        3.20
+ Organic Carbon [weight %%]:        1.20        0.40
+ Clay           [weight %%]:       20.00       30.00
+ Silt           [weight %%]:       60.00       50.00
+ Sand           [weight %%]:       20.00       20.00
+ Rock Fragments [vol. %%]  :        0.00        0.00
+ Soil Albedo (Moist)      :        0.10        0.10
+ Erosion K                :        0.32        0.32
+ Salinity (EC, Form 5)    :        0.00        0.00
+ Soil pH                  :        0.00        0.00
+ Soil CaCo3               :        0.00        0.00
+"""
+
+# Subbasin, land use, soil, hydrologic group, texture and CN2 of the HRUs of the project
+HRUS = [(1, 'AGRL', '1234', 'B', 'SIL-SIL-CL', 77.0), (2, 'FRST', '5678', 'C', 'CL-CL', 70.0)]
+
+
+def crlf(text):
+    return text.replace('\n', '\r\n').encode('latin-1')
+
+
+@pytest.fixture
+def project(tmp_path):
+    """ Project folder with one HRU in each of two subbasins, with the CRLF lines of ArcSWAT """
+    folder = tmp_path / 'project'
+    folder.mkdir()
+    for subbasin, landuse, soil, group, texture, cn2 in HRUS:
+        base = '%05d0001' % subbasin
+        (folder / (base + '.gw')).write_bytes(crlf(TITLE % ('gw', subbasin, landuse, soil) + '\n' + GW))
+        (folder / (base + '.mgt')).write_bytes(crlf(TITLE % ('mgt', subbasin, landuse, soil) + '\n' + MGT % cn2))
+        (folder / (base + '.sol')).write_bytes(crlf(TITLE % ('Sol', subbasin, landuse, soil) + '\n' +
+                                                    SOL % (soil, group, texture)))
+    (folder / 'basins.bsn').write_bytes(crlf("Basin data           .bsn file 4/22/2015 ArcSWAT\n"
+                                             "           1.000    | SFTMP : Snowfall temperature [deg C]\n"))
+    return str(folder)
+
+
+def contents(folder):
+    return {name: open(os.path.join(folder, name), 'rb').read() for name in sorted(os.listdir(folder))}
+
+
+def lines(folder, name):
+    with open(os.path.join(folder, name), 'rb') as fo:
+        return fo.read().split(b'\r\n')
+
+
+def changed_lines(before, after):
+    """ Numbers of the lines that differ, after checking that only lines changed """
+    old, new = before.split(b'\r\n'), after.split(b'\r\n')
+    assert len(old) == len(new)
+    return [i for i, (a, b) in enumerate(zip(old, new)) if a != b]
+
+
+def test_methods(project):
+    engine = ParameterEngine(project)
+    parameters = {'v__GW_DELAY.gw': 45, 'r__CN2.mgt': -0.1, 'a__ALPHA_BF.gw': 0.01, 'v__SFTMP.bsn': -1.5}
+    assert engine.apply(parameters) == 5
+    assert lines(project, '000010001.gw')[2] == b'          45.0000    | GW_DELAY : Groundwater delay [days]'
+    assert lines(project, '000010001.gw')[3] == b'           0.0580    | ALPHA_BF : BaseFlow alpha factor [days]'
+    assert lines(project, '000010001.mgt')[6] == b'         69.3000    | CN2: Initial SCS CN II value'
+    assert lines(project, '000020001.mgt')[6] == b'         63.0000    | CN2: Initial SCS CN II value'
+    assert lines(project, 'basins.bsn')[1] == b'         -1.5000    | SFTMP : Snowfall temperature [deg C]'
+
+
+def test_changes_are_computed_from_the_original_files(project):
+    original = contents(project)
+    engine = ParameterEngine(project)
+    engine.apply({'r__CN2.mgt': 0.1})
+    engine.apply({'r__CN2.mgt': 0.1})
+    assert lines(project, '000010001.mgt')[6] == b'         84.7000    | CN2: Initial SCS CN II value'
+    # Files of the previous set that the new set does not change are restored
+    engine.apply({'v__GW_DELAY.gw': 10})
+    assert open(os.path.join(project, '000010001.mgt'), 'rb').read() == original['000010001.mgt']
+    engine.restore()
+    assert contents(project) == original
+
+
+def test_only_the_changed_values_are_rewritten(project):
+    original = contents(project)
+    ParameterEngine(project).apply({'v__GW_DELAY.gw': 45.25, 'r__SOL_AWC(2).sol': 0.5})
+    new = contents(project)
+    for name in original:
+        expected = {'gw': [2], 'sol': [9]}.get(name.rsplit('.', 1)[1], [])
+        assert changed_lines(original[name], new[name]) == expected
+
+
+def test_filters(project):
+    engine = ParameterEngine(project)
+    # Land use
+    engine.apply({'v__CN2.mgt______FRST': 60})
+    assert lines(project, '000010001.mgt')[6].split()[0] == b'77.00'
+    assert lines(project, '000020001.mgt')[6].split()[0] == b'60.0000'
+    # Subbasin
+    engine.apply({'v__GW_DELAY.gw________1': 60})
+    assert lines(project, '000010001.gw')[2].split()[0] == b'60.0000'
+    assert lines(project, '000020001.gw')[2].split()[0] == b'31.0000'
+    # Hydrologic group and texture, from the .sol file of the HRU
+    engine.apply({'v__ALPHA_BF.gw__C': 0.5, 'v__GWQMN.gw____SIL': 500})
+    assert [lines(project, name)[3].split()[0] for name in ('000010001.gw', '000020001.gw')] == [b'0.0480', b'0.5000']
+    assert [lines(project, name)[4].split()[0] for name in ('000010001.gw', '000020001.gw')] == [b'500.0000',
+                                                                                                 b'1000.0000']
+    # Files without the information ignore the filter
+    engine.apply({'v__SFTMP.bsn________2': 0})
+    assert lines(project, 'basins.bsn')[1].split()[0] == b'0.0000'
+
+
+def test_sol_layers(project):
+    original = lines(project, '000010001.sol')
+    engine = ParameterEngine(project)
+    engine.apply({'v__SOL_AWC(2).sol': 0.2, 'r__SOL_K().sol': 0.5, 'v__SOL_ZMX.sol': 1200})
+    new = lines(project, '000010001.sol')
+    # Layers have 12 columns after column 27, the other layer keeps its bytes
+    assert new[9] == b' Ave. AW Incl. Rock Frag  :        0.18      0.2000'
+    assert new[9][:39] == original[9][:39]
+    assert new[10] == b' Ksat. (est.)      [mm/hr]:     18.7500      4.8000'
+    # Fixed values keep the decimals of the file
+    assert new[3] == b' Maximum rooting depth(m) :     1200.00'
+    engine.apply({'v__SOL_BD(1,2).sol': 1.5})
+    assert lines(project, '000010001.sol')[8] == b' Bulk Density Moist [g/cc]:      1.5000      1.5000'
+    with pytest.raises(ValueError):
+        ParameterChange('v__CN2(1).mgt', 1)
+
+
+def test_workspace_files_are_replaced(project, tmp_path):
+    original = contents(project)
+    for link_mode in ('hardlink', 'symlink'):
+        workspace = create_workspace(project, root=str(tmp_path), link_mode=link_mode)
+        engine = ParameterEngine(project)
+        engine.apply({'v__GW_DELAY.gw': 45, 'v__SOL_AWC(1).sol': 0.3}, folder=workspace.path)
+        path = os.path.join(workspace.path, '000010001.gw')
+        assert not os.path.islink(path) and os.stat(path).st_nlink == 1
+        assert lines(workspace.path, '000010001.gw')[2].split()[0] == b'45.0000'
+        assert lines(workspace.path, '000020001.sol')[9].split()[-2] == b'0.3000'
+        # Files not changed are still linked
+        assert os.path.samefile(os.path.join(workspace.path, '000010001.mgt'),
+                                os.path.join(project, '000010001.mgt'))
+        assert contents(project) == original
+        engine.restore(workspace.path)
+        assert contents(workspace.path) == original
+        workspace.cleanup()
+
+
+def test_format():
+    assert _format(45.0, 4, 17) == '45.0000'
+    # Fewer decimals when the value does not fit
+    assert _format(1234.56789, 4, 8) == '1234.568'
+    assert _format(123456.7, 4, 6) == '123457'
+    assert _format(2.6, None, 5) == '3'
+
+
+def test_unknown_parameter(project):
+    with pytest.raises(ValueError, match='not found'):
+        ParameterEngine(project).apply({'v__NOT_A_PARAMETER.gw': 1})
+    with pytest.raises(ValueError, match='Invalid'):
+        ParameterEngine(project).apply({'x__CN2.mgt': 1})
@@ -0,0 +1,70 @@
+import os
+import numpy
+import pytest
+from swatpython.resultstore import ResultStore
+
+REACHES = [3, 1, 7, 2, 9]
+VARIABLES = ['FLOW_OUTcms', 'SED_OUTtons']
+STEPS = 7
+
+
+def runs(count, dtype, seed=0):
+    """ Random runs (runs, reaches, steps, variables), with the values that fit in dtype """
+    random = numpy.random.default_rng(seed)
+    return random.gamma(2.0, 50.0, (count, len(REACHES), STEPS, len(VARIABLES))).astype(dtype)
+
+
+@pytest.mark.parametrize('dtype', ['float32', 'float64'])
+def test_round_trip(tmp_path, dtype):
+    path = str(tmp_path / 'store')
+    # 4 runs and 3 reaches in each chunk: 11 runs and 5 reaches end in partial chunks
+    expected = runs(11, dtype)
+    with ResultStore(path, REACHES, VARIABLES, dtype=dtype, runs_per_chunk=4, reaches_per_chunk=3) as store:
+        for i, values in enumerate(expected[:6]):
+            assert store.append(values) == i
+        # The partial chunk written here is completed by the next runs
+        store.flush()
+        for values in expected[6:]:
+            store.append(values)
+        assert store.shape == (11, 5, STEPS, 2)
+        data = store.read()
+        assert data.dtype == numpy.dtype(dtype)
+        numpy.testing.assert_array_equal(data, expected)
+    assert sorted(os.listdir(path)) == sorted(['store.json'] + ['c%d.%d.%d' % (run_block, variable, reach_block)
+                                                                for run_block in range(3) for variable in range(2)
+                                                                for reach_block in range(2)])
+
+    store = ResultStore(path)
+    assert len(store) == 11 and store.dtype == numpy.dtype(dtype)
+    numpy.testing.assert_array_equal(store.read(), expected)
+    # Selections across the chunks, in any order
+    selected = store.read(variables=['SED_OUTtons'], reaches=[9, 3, 2], runs=[10, 0, 5, 4], steps=slice(2, 6))
+    numpy.testing.assert_array_equal(selected, expected[[10, 0, 5, 4]][:, [4, 0, 3]][:, :, 2:6][..., [1]])
+    numpy.testing.assert_array_equal(store.series('FLOW_OUTcms', 7, runs=slice(3, 9)), expected[3:9, 2, :, 0])
+
+    # A reopened store continues its last partial chunk
+    more = runs(3, dtype, seed=1)
+    for values in more:
+        store.append(values)
+    store.close()
+    numpy.testing.assert_array_equal(ResultStore(path).read(), numpy.concatenate([expected, more]))
+
+
+def test_runs_are_stored_as_the_dtype(tmp_path):
+    values = runs(1, 'float64')
+    store = ResultStore(str(tmp_path / 'store'), REACHES, VARIABLES, dtype='float32')
+    store.append(values[0])
+    numpy.testing.assert_array_equal(store.read(), values.astype('float32'))
+
+
+def test_invalid_arguments(tmp_path):
+    path = str(tmp_path / 'store')
+    with pytest.raises(ValueError):
+        ResultStore(path)
+    store = ResultStore(path, REACHES, VARIABLES, steps=STEPS)
+    with pytest.raises(ValueError, match='shape'):
+        store.append(numpy.zeros((len(REACHES), STEPS + 1, len(VARIABLES))))
+    with pytest.raises(ValueError, match='other reaches'):
+        ResultStore(path, [1, 2], VARIABLES)
+    with pytest.raises(ValueError, match='Not in the store'):
+        store.read(reaches=[4])
@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+import pytest
+from swatpython.runcache import RunCache, RACY_NANOSECONDS
+from swatpython.swat import SWAT
+from swatpython.swatversion import SWATVersion
+
+# Custom executable that copies an input to output.rch and counts its runs outside the project
+EXECUTABLE = """#!%s
+with open('parameters.txt') as fo:
+    parameters = fo.read()
+with open('output.rch', 'w') as fo:
+    fo.write(parameters)
+with open('../runs.txt', 'a') as fo:
+    fo.write('run\\n')
+"""
+
+
+def runs(tmp_path):
+    path = tmp_path / 'runs.txt'
+    return len(path.read_text().splitlines()) if path.exists() else 0
+
+
+def rewrite(path, text):
+    """ Changes the file keeping its size, inode and modification time """
+    stat = os.stat(path)
+    with open(path, 'r+') as fo:
+        fo.write(text)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.stat(path).st_size == stat.st_size
+
+
+@pytest.fixture
+def project(tmp_path):
+    folder = tmp_path / 'project'
+    folder.mkdir()
+    (folder / 'parameters.txt').write_text('CN2 77.0\n')
+    (folder / 'basins.bsn').write_text('basin\n')
+    return str(folder)
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="the custom executable is a script")
+def test_identical_runs_are_served_from_the_cache(project, tmp_path):
+    executable = tmp_path / 'swat.py'
+    executable.write_text(EXECUTABLE % sys.executable)
+    executable.chmod(0o755)
+    swat = SWAT(SWATVersion.SWAT2012REV670)
+    swat.set_custom_swat(str(executable))
+    swat.set_project_folder(project)
+    swat.set_run_cache(str(tmp_path / 'cache'))
+    output = os.path.join(project, 'output.rch')
+
+    assert swat.run(output='discard') == 0
+    assert runs(tmp_path) == 1 and swat.run_cache.misses == 1
+    os.remove(output)
+    assert swat.run(output='discard') == 0
+    assert runs(tmp_path) == 1 and swat.run_cache.hits == 1
+    assert open(output).read() == 'CN2 77.0\n'
+
+    # One byte of one input
+    with open(os.path.join(project, 'parameters.txt'), 'w') as fo:
+        fo.write('CN2 78.0\n')
+    assert swat.run(output='discard') == 0
+    assert runs(tmp_path) == 2 and swat.run_cache.misses == 2
+    assert open(output).read() == 'CN2 78.0\n'
+
+    # The first parameter set again, and the executable is part of the key
+    with open(os.path.join(project, 'parameters.txt'), 'w') as fo:
+        fo.write('CN2 77.0\n')
+    assert swat.run(output='discard') == 0
+    assert runs(tmp_path) == 2 and swat.run_cache.hits == 2
+    os.utime(str(executable), ns=(0, 0))
+    assert swat.run(output='discard') == 0
+    assert runs(tmp_path) == 3
+
+
+def test_key_depends_only_on_the_inputs(project, tmp_path):
+    cache = RunCache(str(tmp_path / 'cache'))
+    key = cache.key(project, 'swat')
+    with open(os.path.join(project, 'output.rch'), 'w') as fo:
+        fo.write('output\n')
+    assert cache.key(project, 'swat') == key
+    assert cache.key(project, 'other executable') != key
+    # Same contents in another folder, as written by another process
+    other = tmp_path / 'other'
+    other.mkdir()
+    for name in ('parameters.txt', 'basins.bsn'):
+        (other / name).write_bytes(open(os.path.join(project, name), 'rb').read())
+    assert RunCache(str(tmp_path / 'cache')).key(str(other), 'swat') == key
+
+
+def test_racy_files_are_hashed_again(project, tmp_path):
+    cache = RunCache(str(tmp_path / 'cache'))
+    path = os.path.join(project, 'parameters.txt')
+    key = cache.key(project)
+    # Rewritten in the same clock tick as the first hash: size, inode and time do not change
+    rewrite(path, 'CN2 78.0\n')
+    assert cache.key(project) != key
+
+
+def test_old_files_are_not_read_again(project, tmp_path):
+    cache = RunCache(str(tmp_path / 'cache'))
+    path = os.path.join(project, 'parameters.txt')
+    old = int(time.time() * 10 ** 9) - 10 * RACY_NANOSECONDS
+    os.utime(path, ns=(old, old))
+    key = cache.key(project)
+    # Only the signature is checked for a file modified well before it was hashed
+    rewrite(path, 'CN2 78.0\n')
+    assert cache.key(project) == key
+    # A new cache reads it
+    assert RunCache(str(tmp_path / 'cache')).key(project) != key
@@ -0,0 +1,68 @@
+import os
+import pytest
+from swatpython.sensitivity import ParameterSpace, latin_hypercube, run_samples
+from swatpython.swat import SWAT
+from swatpython.swatversion import SWATVersion
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason="the custom executable is a script")
+
+# Custom executable that only counts its runs, outside the workspaces
+EXECUTABLE = """#!/bin/sh
+echo run >> "%s"
+"""
+
+GW = """ .gw file Subbasin:1 HRU:1 Luse:AGRL Soil: 1234 Slope: 0-9999
+          31.0000    | GW_DELAY : Groundwater delay [days]
+           0.0480    | ALPHA_BF : BaseFlow alpha factor [days]
+"""
+
+
+@pytest.fixture
+def swat(tmp_path):
+    executable = tmp_path / 'swat.sh'
+    executable.write_text(EXECUTABLE % (tmp_path / 'runs.txt'))
+    executable.chmod(0o755)
+    project = tmp_path / 'project'
+    project.mkdir()
+    (project / '000010001.gw').write_text(GW)
+    swat = SWAT(SWATVersion.SWAT2012REV670)
+    swat.set_custom_swat(str(executable))
+    swat.set_project_folder(str(project))
+    return swat
+
+
+def extract(folder):
+    """ Values written in the workspace by the parameter set of the run """
+    with open(os.path.join(folder, '000010001.gw')) as fo:
+        lines = fo.readlines()
+    return {'GW_DELAY': float(lines[1].split()[0]), 'ALPHA_BF': float(lines[2].split()[0])}
+
+
+def runs(tmp_path):
+    return len((tmp_path / 'runs.txt').read_text().splitlines())
+
+
+def test_campaign_is_resumed_only_with_the_same_samples(swat, tmp_path):
+    space = ParameterSpace({'v__GW_DELAY.gw': (10, 100), 'v__ALPHA_BF.gw': (0.01, 0.9)})
+    samples = latin_hypercube(space, 6, seed=1)
+    path = str(tmp_path / 'study.sqlite')
+    root = str(tmp_path)
+
+    results = run_samples(swat, space, samples, extract, path, max_workers=2, root=root)
+    assert runs(tmp_path) == 6
+    assert results['GW_DELAY'] == pytest.approx(samples[:, 0], abs=1e-4)
+    assert results['ALPHA_BF'] == pytest.approx(samples[:, 1], abs=1e-4)
+
+    # The same study continues: there is nothing left to run
+    again = run_samples(swat, space, samples, extract, path, max_workers=2, root=root)
+    assert runs(tmp_path) == 6
+    assert (again['GW_DELAY'] == results['GW_DELAY']).all()
+
+    with pytest.raises(ValueError, match='other parameter sets'):
+        run_samples(swat, space, latin_hypercube(space, 6, seed=2), extract, path, root=root)
+    other_space = ParameterSpace({'v__GW_DELAY.gw': (10, 100), 'r__ALPHA_BF.gw': (0.01, 0.9)})
+    with pytest.raises(ValueError, match='other parameter sets'):
+        run_samples(swat, other_space, samples, extract, path, root=root)
+    with pytest.raises(ValueError, match='has 6 runs'):
+        run_samples(swat, space, samples[:5], extract, path, root=root)
+    assert runs(tmp_path) == 6
@@ -0,0 +1,94 @@
+import os
+import sys
+import pytest
+from swatpython.swat import SWAT
+from swatpython.swatversion import SWATVersion
+from swatpython.filecio import SWAT2012_FILE_CIO, SKIP, INT, FLOAT, FILES, INTS, read_run_values
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason="the custom executable is a script")
+
+# Custom executable that writes a monthly output.rch of one year, like SWAT with IPRINT = 0
+EXECUTABLE = """#!%s
+with open('output.rch', 'w') as fo:
+    fo.write(''.join(' SWAT line ' + str(i) + '\\n' for i in range(8)))
+    fo.write('       RCH      GIS   MON     AREAkm2 FLOW_OUTcms\\n')
+    for month in range(1, 13):
+        fo.write('REACH %%5d %%8d %%5d %%11.4E %%11.4E\\n' %% (1, 1, month, 1.0, month))
+"""
+
+# Values of the file.cio of the project: daily printout of 2000 and 2001
+FILE_CIO = {'NBYR': 2, 'IYR': 2000, 'IDAF': 1, 'IDAL': 365, 'IPRINT': 1, 'NYSKIP': 0}
+
+
+def file_cio_lines():
+    lines = []
+    for key, kind in SWAT2012_FILE_CIO:
+        if kind == SKIP:
+            lines.append('title')
+        elif kind in (INT, FLOAT):
+            lines.append('%16s    | %s' % (FILE_CIO.get(key, 0), key))
+        elif kind == FILES:
+            lines.append('pcp1.pcp     ')
+        elif kind == INTS:
+            lines.append('   0' * 20)
+        else:
+            lines.append('%-20s| %s' % ('file.dat', key))
+    return ''.join(line + '\r\n' for line in lines)
+
+
+@pytest.fixture
+def swat(tmp_path):
+    executable = tmp_path / 'swat.py'
+    executable.write_text(EXECUTABLE % sys.executable)
+    executable.chmod(0o755)
+    project = tmp_path / 'project'
+    project.mkdir()
+    (project / 'file.cio').write_text(file_cio_lines())
+    swat = SWAT(SWATVersion.SWAT2012REV670)
+    swat.set_custom_swat(str(executable))
+    swat.set_project_folder(str(project))
+    return swat
+
+
+def test_run_records_the_print_settings(swat, tmp_path):
+    folder = swat.project_folder_path
+    assert swat.run(output='discard', print_step='monthly', skip_years=1) == 0
+    assert read_run_values(folder) == {'IPRINT': 0, 'NYSKIP': 1}
+    assert swat.read_file_cio()['IPRINT'] == 1
+
+    assert swat.run(output='discard') == 0
+    assert read_run_values(folder) == {}
+
+
+def test_run_cache_restores_the_print_settings(swat, tmp_path):
+    folder = swat.project_folder_path
+    swat.set_run_cache(str(tmp_path / 'cache'))
+    assert swat.run(output='discard', print_step='monthly', skip_years=1) == 0
+    assert swat.run(output='discard') == 0
+    assert read_run_values(folder) == {}
+
+    assert swat.run(output='discard', print_step='monthly', skip_years=1) == 0
+    assert swat.run_cache.hits == 1
+    assert read_run_values(folder) == {'IPRINT': 0, 'NYSKIP': 1}
+
+
+def test_staging_collects_the_print_settings(swat, tmp_path):
+    folder = swat.project_folder_path
+    swat.set_staging(str(tmp_path), collect=['output.rch'])
+    assert swat.run(output='discard', print_step='monthly', skip_years=1) == 0
+    assert read_run_values(folder) == {'IPRINT': 0, 'NYSKIP': 1}
+    assert swat.run(output='discard') == 0
+    assert read_run_values(folder) == {}
+
+
+def test_dates_use_the_print_settings_of_the_run(swat):
+    assert swat.run(output='discard', print_step='monthly', skip_years=1) == 0
+    dataframe = swat.read_output_rch('output.rch', dates=True)
+    assert list(dataframe.index.month) == list(range(1, 13))
+    assert set(dataframe.index.year) == {2001}
+
+    dataframe = swat.read_output_rch('output.rch', start='2001-06-01', end='2001-08-31')
+    assert list(dataframe['FLOW_OUTcms']) == [6, 7, 8]
+
+    dataframe = swat.wrapper.read_output_rch(os.path.join(swat.project_folder_path, 'output.rch'), dates=True)
+    assert list(dataframe.index.month) == list(range(1, 13))
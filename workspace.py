@@ -0,0 +1,149 @@
+import os
+import fnmatch
+import shutil
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# Files written by SWAT during a run, as opened by the SWAT2012 executables: the output files
+# (output2.* with ISPROJ=1, outputb.* with binary output), the .out files (hyd.out, septic.out,
+# bmp-*.out...), the CSWAT files and the database files. They are never linked into a workspace,
+# otherwise SWAT would write through the link into the original project. Files named by the
+# save commands of fig.fig, other than the usual watout.dat, must be added by the caller.
+OUTPUT_PATTERNS = ['output.*', 'output2.*', 'outputb.*', '*.out', 'input.std', 'fin.fin', 'watout.dat', 'chan.deg',
+                   'cswat_*.txt', 'rch.dat', 'sub.dat', 'hru.dat', 'rsv.dat', 'swat.qst']
+
+
+class Workspace(object):
+    """
+    Scratch copy of a SWAT project folder for a single run.
+
+    Input files are hardlinked (or symlinked when hardlinks are not possible) from the
+    project folder, so creating a workspace costs one link per file instead of a full copy.
+    Files that are going to be edited must be materialised first, which replaces the link
+    with a private copy, so the original project is never modified.
+    """
+
+    def __init__(self, source, path, link_mode='hardlink', output_patterns=None):
+        """
+        Parameters
+        ----------
+        source : str
+            project folder (TxtInOut) used as template
+        path : str
+            workspace folder. It is created if it does not exist
+        link_mode : str
+            'hardlink', 'symlink' or 'copy'
+        output_patterns : list of str, optional
+            glob patterns of the files written by SWAT, that are not linked
+        """
+        if link_mode not in ('hardlink', 'symlink', 'copy'):
+            raise ValueError("Invalid link mode: " + str(link_mode))
+        self.source = os.path.abspath(source)
+        self.path = os.path.abspath(path)
+        self.link_mode = link_mode
+        self.output_patterns = OUTPUT_PATTERNS if output_patterns is None else output_patterns
+        self.materialised = set()
+
+    def is_output(self, filename) -> bool:
+        name = filename.lower()
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.output_patterns)
+
+    def create(self, materialise=None):
+        """
+        Creates the workspace folder linking all input files of the project
+
+        Parameters
+        ----------
+        materialise : list of str, optional
+            file names that are copied instead of linked, because they will be edited
+        """
+        materialise = set(materialise or [])
+        os.makedirs(self.path, exist_ok=True)
+        mode = self.link_mode
+        for entry in os.scandir(self.source):
+            if entry.is_dir() or self.is_output(entry.name):
+                continue
+            destination = os.path.join(self.path, entry.name)
+            if entry.name in materialise or mode == 'copy':
+                shutil.copyfile(entry.path, destination)
+                self.materialised.add(entry.name)
+                continue
+            if mode == 'hardlink':
+                try:
+                    os.link(entry.path, destination)
+                    continue
+                except OSError:
+                    # Different file systems or no hardlink support
+                    logger.debug("Hardlink not possible, falling back to symlink: " + self.path)
+                    mode = 'symlink'
+            try:
+                os.symlink(entry.path, destination)
+            except OSError:
+                logger.debug("Symlink not possible, falling back to copy: " + self.path)
+                mode = 'copy'
+                shutil.copyfile(entry.path, destination)
+                self.materialised.add(entry.name)
+        logger.debug("Workspace created: " + self.path)
+        return self
+
+    def materialise(self, filename):
+        """
+        Replaces the link of a file by a private copy, so it can be safely edited.
+
+        Parameters
+        ----------
+        filename : str
+            file name inside the workspace
+
+        Returns
+        -------
+        path to the file inside the workspace
+        """
+        destination = os.path.join(self.path, filename)
+        if filename in self.materialised:
+            return destination
+        source = os.path.join(self.source, filename)
+        temporary = destination + '.tmp'
+        shutil.copyfile(source, temporary)
+        os.replace(temporary, destination)
+        self.materialised.add(filename)
+        return destination
+
+    def cleanup(self):
+        """ Removes the workspace folder and everything SWAT wrote inside it """
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path)
+            logger.debug("Workspace removed: " + self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.cleanup()
+
+
+def create_workspace(source, root=None, prefix='swat_', link_mode='hardlink', materialise=None):
+    """
+    Creates a new workspace for the project in source, inside a new unique folder under root
+
+    Parameters
+    ----------
+    source : str
+        project folder
+    root : str, optional
+        folder where the workspace is created (default is the system temporary folder)
+    prefix : str
+        prefix of the workspace folder name
+    link_mode : str
+        'hardlink', 'symlink' or 'copy'
+    materialise : list of str, optional
+        file names that are copied instead of linked
+
+    Returns
+    -------
+    Workspace
+    """
+    path = tempfile.mkdtemp(prefix=prefix, dir=root)
+    return Workspace(source, path, link_mode=link_mode).create(materialise=materialise)